@@ -15,17 +15,22 @@ from flask import Flask, render_template, redirect, request, session, flash, jso
 from flask_sqlalchemy import SQLAlchemy
 from models.usuario import Usuario
 from werkzeug.security import generate_password_hash, check_password_hash
-from config import Config
+from config import obter_config
 from extensions import db
 from functools import wraps
 import os
+import sys
+import click
 from werkzeug.utils import secure_filename
 
 app = Flask(__name__)
-app.config.from_object(Config)
+app.config.from_object(obter_config())
 app.secret_key = 'chave_secreta'  # mudar para algo seguro
 db.init_app(app)
 
+from services.sqlite_perfil import configurar_sqlite
+configurar_sqlite(app)
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -65,6 +70,37 @@ from models.categoria import Categoria
 from models.avaliacao import Avaliacao
 from models.visualizacao import Visualizacao
 from models.newsletter import Newsletter
+from services.esquema import atualizar_esquema
+from services.busca_texto import criar_indice_fts
+from services.autocomplete import indice_autocomplete
+from services.contador_visualizacoes import TABELA_CONTAGENS, contador_visualizacoes
+from services.fila_visualizacoes import fila_visualizacoes
+from services.versoes_tabelas import versoes_tabelas
+from services.cache import cache_respostas
+from services.imagens import ErroImagem, processador_imagens, remover_arquivos
+from services.assets import manifesto_assets
+from services.compressao import compressao_respostas
+from services.instrumentacao import instrumentacao_consultas, orcamento_consultas
+from services.json_rapido import json_rapido
+from services.condicional import condicional
+from services.streaming import pedido_stream, resposta_stream, resposta_stream_secoes, serializar_em_blocos
+from services.paginacao import CursorInvalido, paginar_requisicao, pedido_paginado
+from services.projecoes import LISTAGEM_PRODUTOS
+from services.tabelas_admin import ConsultaInvalida, consultar_tabela
+from services.importacao import (
+    FORMATOS, LOTE_IMPORTACAO, ErroImportacao, formato_do_arquivo, importar_produtos, ler_registros, linhas_exportacao
+)
+
+versoes_tabelas.init_app(app)
+cache_respostas.init_app(app)
+indice_autocomplete.init_app(app)
+contador_visualizacoes.init_app(app)
+fila_visualizacoes.init_app(app)
+processador_imagens.init_app(app)
+manifesto_assets.init_app(app)
+compressao_respostas.init_app(app)
+instrumentacao_consultas.init_app(app)
+json_rapido.init_app(app)
 
 # Adicionar função ao contexto dos templates
 @app.context_processor
@@ -77,6 +113,7 @@ from routes.api_avaliacoes import api_avaliacoes
 from routes.api_visualizacoes import api_visualizacoes
 from routes.api_newsletter import api_newsletter
 from routes.api_busca import api_busca
+from routes.api_admin import api_admin
 
 app.register_blueprint(api_produtos)
 app.register_blueprint(api_categorias)
@@ -85,21 +122,60 @@ app.register_blueprint(api_avaliacoes)
 app.register_blueprint(api_visualizacoes)
 app.register_blueprint(api_newsletter)
 app.register_blueprint(api_busca)
+app.register_blueprint(api_admin)
+
+def com_imagem_padrao(produto_dict):
+    # Garantir que a imagem tenha um valor padrão
+    produto_dict['imagem'] = produto_dict['imagem'] or '/static/images/placeholder.jpeg'
+    if 'imagens_variantes' in produto_dict:
+        produto_dict['imagens_variantes'] = {
+            variante: url or produto_dict['imagem'] for variante, url in produto_dict['imagens_variantes'].items()
+        }
+    return produto_dict
 
 @app.route('/api/produtos')
+@orcamento_consultas(4)
+@condicional('produto', 'usuario', TABELA_CONTAGENS)
+@cache_respostas.resposta('produto', 'usuario', TABELA_CONTAGENS)
 def api_produtos_list():
     try:
-        produtos = Produto.query.all()
-        produtos_data = []
-        for produto in produtos:
-            produto_dict = produto.to_dict()
-            # Garantir que a imagem tenha um valor padrão
-            produto_dict['imagem'] = produto.imagem or '/static/images/placeholder.jpeg'
-            produtos_data.append(produto_dict)
+        # Paginação por cursor opcional (?cursor=, ?limite=, ?ordenacao=)
+        proximo_cursor = None
+        paginado = pedido_paginado(request.args)
+        if paginado:
+            try:
+                produtos, proximo_cursor = paginar_requisicao(LISTAGEM_PRODUTOS.aplicar(Produto.query), request.args)
+            except CursorInvalido as e:
+                return jsonify({'error': str(e)}), 400
+        elif pedido_stream():
+            # Catálogo inteiro em streaming (?stream=1 ou NDJSON), bloco a bloco
+            return resposta_stream(lambda: (
+                com_imagem_padrao(produto_dict)
+                for produto_dict in serializar_em_blocos(
+                    LISTAGEM_PRODUTOS.aplicar(Produto.query), LISTAGEM_PRODUTOS.serializar_lista
+                )
+            ))
+        else:
+            produtos = LISTAGEM_PRODUTOS.aplicar(Produto.query).all()
+
+        produtos_data = [com_imagem_padrao(p) for p in LISTAGEM_PRODUTOS.serializar_lista(produtos)]
+
+        if paginado:
+            return jsonify({
+                'produtos': produtos_data,
+                'proximo_cursor': proximo_cursor,
+                'tem_mais': proximo_cursor is not None
+            })
         return jsonify(produtos_data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/cache')
+@admin_required
+def api_cache_metricas():
+    """Contadores de hit/miss do cache de respostas"""
+    return jsonify(cache_respostas.metricas())
+
 @app.route('/')
 def index():
     return redirect('/produtos')
@@ -169,9 +245,9 @@ def logout():
 @app.route('/produtos')
 @login_required
 def produtos():
-    with app.app_context():
-        produtos = Produto.query.options(db.joinedload(Produto.proprietario)).all()
-    return render_template('produtos.html', produtos=produtos)
+    # A grade é preenchida pelo search.js (/api/busca/produtos); o template
+    # não lista produtos, então a página não consulta o catálogo
+    return render_template('produtos.html')
 
 
 @app.route('/produto/<int:id>')
@@ -181,12 +257,11 @@ def produto(id):
     cliente `addToCart(id)` já exposto globalmente em `static/js/app.js`.
     """
     produto = Produto.query.get_or_404(id)
-    # Optional: increment view count in DB for analytics
+    # Contador de visualizações: acumulado em memória e gravado em lote
     try:
-        produto.visualizacoes = (produto.visualizacoes or 0) + 1
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
+        contador_visualizacoes.incrementar(produto.id)
+    except Exception as e:
+        app.logger.warning(f'Erro ao contar visualização do produto {id}: {e}')
 
     return render_template('produto.html', produto=produto)
 
@@ -207,14 +282,25 @@ def perfil():
 @admin_required
 def sql():
     # SQL admin page — only accessible to admin users (enforced by admin_required)
-    with app.app_context():
-        produtos = Produto.query.all()
-        usuarios = Usuario.query.all()
-    return render_template('sql.html', produtos=produtos, usuarios=usuarios)
+    # Os registros vêm paginados de /api/tables/<tabela> (static/js/sql.js)
+    return render_template('sql.html')
 
 def create_db_and_add_samples():
     with app.app_context():
         db.create_all()
+        # Versões compartilhadas das tabelas (ETags/cache entre processos)
+        versoes_tabelas.registrar_tabelas()
+
+        # Bancos antigos: adicionar colunas novas e preencher o resumo de avaliações
+        adicionadas = atualizar_esquema()
+        if ('produto', 'soma_notas') in adicionadas or ('produto', 'total_avaliacoes') in adicionadas:
+            Produto.recalcular_avaliacoes()
+
+        # Índice de texto completo da busca (ignorado se o SQLite não tiver FTS5)
+        criar_indice_fts()
+
+        # Índice em memória do autocomplete
+        indice_autocomplete.reconstruir()
 
         # Criar usuário de exemplo
         if Usuario.query.count() == 0:
@@ -274,6 +360,66 @@ def create_db_and_add_samples():
             db.session.add_all(categorias)
             db.session.commit()
 
+@app.cli.command('recalcular-avaliacoes')
+def recalcular_avaliacoes_command():
+    """Recalcula soma_notas/total_avaliacoes de todos os produtos"""
+    Produto.recalcular_avaliacoes()
+    print(f'Resumo de avaliações recalculado para {Produto.query.count()} produtos.')
+
+@app.cli.command('reindexar-busca')
+def reindexar_busca_command():
+    """Recria o índice FTS5 da busca de produtos"""
+    if criar_indice_fts(reconstruir=True):
+        print('Índice de busca reconstruído.')
+    else:
+        print('FTS5 indisponível neste SQLite; a busca usará LIKE.')
+
+@app.cli.command('importar-produtos')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(FORMATOS), help='Padrão: pela extensão do arquivo')
+@click.option('--lote', default=LOTE_IMPORTACAO, show_default=True, help='Registros por transação')
+def importar_produtos_command(arquivo, formato, lote):
+    """Importa produtos (upsert pelo nome) de um CSV ou JSONL"""
+    try:
+        formato = formato_do_arquivo(arquivo, formato)
+    except ErroImportacao as e:
+        raise click.UsageError(str(e))
+
+    def progresso(resumo):
+        print(f"\r{resumo['gravados']} gravados, {resumo['invalidos']} inválidos...", end='', flush=True)
+
+    with open(arquivo, encoding='utf-8-sig', newline='') as entrada:
+        resumo = importar_produtos(ler_registros(entrada, formato), tamanho_lote=lote, progresso=progresso)
+    print(f"\rImportação concluída: {resumo['gravados']} produtos gravados em {resumo['blocos']} blocos, "
+          f"{resumo['invalidos']} linhas inválidas, {resumo['categorias_criadas']} categorias criadas.")
+    for erro in resumo['erros']:
+        print(f"  linha {erro['linha']}: {erro['erro']}")
+
+@app.cli.command('exportar-produtos')
+@click.argument('saida', default='-')
+@click.option('--formato', type=click.Choice(FORMATOS), help='Padrão: pela extensão do arquivo (jsonl na saída padrão)')
+def exportar_produtos_command(saida, formato):
+    """Exporta o catálogo para CSV ou JSONL ("-" = saída padrão)"""
+    try:
+        formato = formato or ('jsonl' if saida == '-' else formato_do_arquivo(saida))
+    except ErroImportacao as e:
+        raise click.UsageError(str(e))
+
+    destino = sys.stdout if saida == '-' else open(saida, 'w', encoding='utf-8', newline='')
+    try:
+        for linha in linhas_exportacao(formato):
+            destino.write(linha)
+    finally:
+        if destino is not sys.stdout:
+            destino.close()
+
+@app.cli.command('compilar-assets')
+def compilar_assets_command():
+    """Indexa os arquivos estáticos e grava as versões gzip/brotli"""
+    resumo = manifesto_assets.compilar()
+    print(f"{resumo['arquivos']} arquivos indexados, {resumo['comprimidos']} versões comprimidas em "
+          f"{os.path.join(app.instance_path, 'assets')}.")
+
 @app.route('/api/update_db', methods=['POST'])
 @admin_required
 def update_db():
@@ -512,22 +658,21 @@ def upload_profile_photo():
         if not usuario:
             return jsonify({'success': False, 'error': 'Usuário não encontrado'})
 
-        # Criar nome do arquivo: id.png
-        filename = f"{usuario.id}.png"
-
-        # Caminho completo
-        pic_dir = os.path.join(app.static_folder, 'pic')
-        filepath = os.path.join(pic_dir, filename)
+        # Gravar o original com nome pelo conteúdo; a versão reduzida em
+        # WebP é gerada em segundo plano e substitui foto_perfil quando pronta
+        filename, imagem_hash = processador_imagens.salvar_foto_perfil(file)
 
-        # Garantir que o diretório existe
-        os.makedirs(pic_dir, exist_ok=True)
-
-        # Salvar arquivo
-        file.save(filepath)
+        # Foto antiga (original e versão reduzida): removida do disco após o
+        # commit, se nenhum outro usuário a usa
+        antigos = []
+        if usuario.foto_perfil and not usuario.foto_perfil.startswith(imagem_hash):
+            antigos = processador_imagens.arquivos_da_foto_perfil(usuario.foto_perfil, usuario.id)
 
         # Atualizar foto_perfil no banco
         usuario.foto_perfil = filename
         db.session.commit()
+        remover_arquivos(antigos)
+        processador_imagens.processar_foto_perfil(usuario.id, filename, imagem_hash)
 
         return jsonify({
             'success': True,
@@ -566,45 +711,32 @@ def upload_product_image(produto_id):
         if not produto:
             return jsonify({'success': False, 'error': 'Produto não encontrado'})
 
-        # Excluir imagem antiga se existir
-        if produto.imagem:
-            # Remover o prefixo /static/ para obter o caminho relativo
-            relative_path = produto.imagem.replace('/static/', '', 1)
-            old_filepath = os.path.join(app.static_folder, relative_path)
-            if os.path.exists(old_filepath):
-                try:
-                    os.remove(old_filepath)
-                except Exception as e:
-                    print(f"Erro ao excluir imagem antiga: {e}")
-
-        # Determinar extensão do arquivo
-        _, ext = os.path.splitext(file.filename.lower())
-        if not ext:
-            ext = '.png'  # Default para PNG
-
-        # Criar nome do arquivo baseado no ID do produto
-        filename = f"{produto_id}{ext}"
-
-        # Caminho completo
-        images_dir = os.path.join(app.static_folder, 'images')
-        filepath = os.path.join(images_dir, filename)
-
-        # Garantir que o diretório existe
-        os.makedirs(images_dir, exist_ok=True)
+        # Gravar o original com nome pelo conteúdo (arquivos iguais são
+        # reaproveitados); as variantes WebP são geradas em segundo plano
+        image_path, imagem_hash = processador_imagens.salvar_imagem_produto(file)
 
-        # Salvar arquivo
-        file.save(filepath)
+        # Imagem antiga: removida do disco após o commit, se nenhum outro
+        # produto a usa
+        antigos = []
+        if produto.imagem and produto.imagem != image_path:
+            antigos = processador_imagens.arquivos_da_imagem(produto.imagem, produto_id)
 
         # Atualizar imagem do produto no banco
-        produto.imagem = f"/static/images/{filename}"
+        produto.imagem = image_path
+        produto.imagem_hash = None
         db.session.commit()
+        remover_arquivos(antigos)
+        processador_imagens.processar_produto(produto_id, image_path, imagem_hash)
 
         return jsonify({
             'success': True,
-            'image_path': f"/static/images/{filename}",
-            'filename': filename
+            'image_path': image_path,
+            'filename': os.path.basename(image_path)
         })
 
+    except ErroImagem as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)})
@@ -718,7 +850,8 @@ def delete_produto(id):
         # Excluir registros relacionados antes de excluir o produto
         # (favorites removed) no longer deleting favorites entries
 
-        # Excluir avaliações relacionadas ao produto
+        # Excluir avaliações relacionadas ao produto (o resumo de avaliações
+        # fica na própria linha do produto e é removido junto com ela)
         Avaliacao.query.filter_by(produto_id=id).delete()
 
         # Excluir visualizações relacionadas ao produto (se existir)
@@ -727,19 +860,13 @@ def delete_produto(id):
         except:
             pass  # Tabela pode não existir
 
-        # Excluir imagem física se existir
-        if produto.imagem and produto.imagem.startswith('/static/images/'):
-            # Remover o prefixo /static/ para obter o caminho relativo
-            relative_path = produto.imagem.replace('/static/', '', 1)
-            image_path = os.path.join(app.static_folder, relative_path)
-            if os.path.exists(image_path):
-                try:
-                    os.remove(image_path)
-                except Exception as e:
-                    print(f"Erro ao excluir imagem {image_path}: {e}")
+        # Imagem física (e variantes): removida após o commit, se nenhum
+        # outro produto usa o mesmo arquivo
+        arquivos_imagem = processador_imagens.arquivos_da_imagem(produto.imagem, id)
 
         db.session.delete(produto)
         db.session.commit()
+        remover_arquivos(arquivos_imagem)
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -784,7 +911,8 @@ def delete_usuario(id):
             return jsonify({'success': False, 'error': 'Usuário não encontrado'})
         
         # Deletar registros relacionados antes de deletar o usuário
-        # Deletar avaliações do usuário
+        # Deletar avaliações do usuário, descontando-as do resumo dos produtos
+        Produto.descontar_avaliacoes_usuario(id)
         Avaliacao.query.filter_by(usuario_id=id).delete()
         
         # (favorites removed) no longer deleting favorites entries
@@ -806,23 +934,44 @@ def delete_usuario(id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)})
 
+# Colunas de /api/tables: lidas direto do banco, sem montar objetos do ORM
+# (o hash da senha não sai do servidor)
+COLUNAS_TABELA_PRODUTO = (Produto.id, Produto.nome, Produto.preco, Produto.imagem, Produto.proprietario_id)
+COLUNAS_TABELA_USUARIO = (Usuario.id, Usuario.nome, Usuario.email, Usuario.idade, Usuario.endereco,
+                          Usuario.telefone, Usuario.foto_perfil)
+
+def linhas_tabela(colunas, **opcoes):
+    consulta = db.select(*colunas).execution_options(**opcoes)
+    return (dict(linha) for linha in db.session.execute(consulta).mappings())
+
 @app.route('/api/tables')
+@orcamento_consultas(5)
 @admin_required
+@condicional('produto', 'usuario', TABELA_CONTAGENS)
 def api_tables():
-    with app.app_context():
-        produtos = Produto.query.all()
-        usuarios = Usuario.query.all()
-    
-    # Converter para dict
-    produtos_data = [{'id': p.id, 'nome': p.nome, 'preco': p.preco, 'imagem': p.imagem, 'proprietario_id': p.proprietario_id} for p in produtos]
-    usuarios_data = [{'id': u.id, 'nome': u.nome, 'email': u.email, 'senha': u.senha, 'idade': u.idade, 'endereco': u.endereco, 'telefone': u.telefone, 'foto_perfil': u.foto_perfil} for u in usuarios]
-    
+    if pedido_stream():
+        return resposta_stream_secoes([
+            ('produto', lambda: linhas_tabela(COLUNAS_TABELA_PRODUTO, yield_per=500)),
+            ('usuario', lambda: linhas_tabela(COLUNAS_TABELA_USUARIO, yield_per=500))
+        ])
+
     tables = {
-        'produto': produtos_data,
-        'usuario': usuarios_data
+        'produto': list(linhas_tabela(COLUNAS_TABELA_PRODUTO)),
+        'usuario': list(linhas_tabela(COLUNAS_TABELA_USUARIO))
     }
     return jsonify(tables)
 
+@app.route('/api/tables/<tabela>')
+@orcamento_consultas(5)
+@admin_required
+@condicional('produto', 'usuario', TABELA_CONTAGENS)
+def api_tabela(tabela):
+    """Página de uma tabela do painel SQL (colunas, filtros, ordenação)"""
+    try:
+        return jsonify(consultar_tabela(tabela, request.args))
+    except ConsultaInvalida as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 @app.route('/adicionar_produto', methods=['GET', 'POST'])
 @login_required
 def adicionar_produto():
@@ -834,6 +983,7 @@ def adicionar_produto():
 
         # Processar upload de imagem
         imagem_path = '/static/images/placeholder.jpeg'  # Padrão
+        imagem_hash = None
         if 'imagem' in request.files:
             file = request.files['imagem']
             if file.filename != '':
@@ -850,22 +1000,12 @@ def adicionar_produto():
                     flash('Arquivo muito grande. Máximo 5MB permitido.')
                     return redirect('/adicionar_produto')
 
-                # Determinar extensão
-                _, ext = os.path.splitext(file.filename.lower())
-                if not ext:
-                    ext = '.png'
-
-                # Gerar nome único baseado no timestamp e ID do usuário
-                import time
-                filename = f"{int(time.time())}_{session['user_id']}{ext}"
-                filepath = os.path.join(app.static_folder, 'images', filename)
-
-                # Garantir que o diretório existe
-                os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-                # Salvar arquivo
-                file.save(filepath)
-                imagem_path = f"/static/images/{filename}"
+                # Nome pelo conteúdo; variantes WebP geradas após o commit
+                try:
+                    imagem_path, imagem_hash = processador_imagens.salvar_imagem_produto(file)
+                except ErroImagem as e:
+                    flash(f'{e}.')
+                    return redirect('/adicionar_produto')
 
         novo_produto = Produto(
             nome=nome,
@@ -882,6 +1022,8 @@ def adicionar_produto():
 
         db.session.add(novo_produto)
         db.session.commit()
+        if imagem_hash:
+            processador_imagens.processar_produto(novo_produto.id, imagem_path, imagem_hash)
 
         flash('Produto adicionado com sucesso!')
         return redirect('/produtos')
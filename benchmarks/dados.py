@@ -0,0 +1,161 @@
+# benchmarks/dados.py
+# Catálogo sintético para os benchmarks
+#
+# Cria um banco SQLite temporário com o esquema completo (o mesmo caminho de
+# create_db_and_add_samples: tabelas, colunas novas, FTS5 e autocomplete) e o
+# popula com usuários, categorias, produtos, avaliações e visualizações em
+# quantidades configuráveis. Os dados são gerados com uma semente fixa, então
+# duas execuções na mesma escala produzem o mesmo catálogo, e gravados com
+# INSERTs em executemany (milhares de linhas por comando).
+
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+# Quantidades por escala
+ESCALAS = {
+    'pequena': {'usuarios': 50, 'categorias': 10, 'produtos': 500, 'avaliacoes': 2000, 'visualizacoes': 5000},
+    'media': {'usuarios': 500, 'categorias': 25, 'produtos': 5000, 'avaliacoes': 25000, 'visualizacoes': 50000},
+    'grande': {'usuarios': 5000, 'categorias': 50, 'produtos': 50000, 'avaliacoes': 250000, 'visualizacoes': 500000},
+}
+
+LOTE_INSERCAO = 5000
+SEMENTE = 42
+
+_NOMES = ['Teclado', 'Mouse', 'Monitor', 'Headset', 'Cadeira', 'Webcam', 'Notebook', 'SSD', 'Placa de Vídeo', 'Gabinete']
+_ADJETIVOS = ['Gamer', 'Pro', 'Compacto', 'Sem Fio', 'RGB', 'Ergonômico', 'Ultra', 'Slim', 'Mecânico', 'Plus']
+
+
+def carregar_app(caminho_banco=None):
+    """Importa o app apontando para `caminho_banco` (um arquivo temporário se
+    omitido). Deve ser chamado antes de qualquer outra importação do app,
+    que lê a URI do banco na importação. Retorna (módulo app, caminho)."""
+    if caminho_banco is None:
+        arquivo = tempfile.NamedTemporaryFile(prefix='benchmark_', suffix='.sqlite', delete=False)
+        arquivo.close()
+        caminho_banco = arquivo.name
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(caminho_banco)
+    import app as aplicacao
+    return aplicacao, caminho_banco
+
+
+def _inserir(conn, tabela, linhas):
+    for inicio in range(0, len(linhas), LOTE_INSERCAO):
+        conn.execute(tabela.insert(), linhas[inicio:inicio + LOTE_INSERCAO])
+
+
+def _usuarios(quantidade, senha):
+    return [
+        {'nome': f'Cliente {i}', 'email': f'cliente{i}@benchmark.local', 'senha': senha,
+         'idade': 18 + i % 50, 'endereco': f'Rua {i}, {i % 900 + 1}', 'telefone': f'1199{i:07d}',
+         'foto_perfil': 'default.png', 'is_admin': False}
+        for i in range(quantidade)
+    ]
+
+
+def _produtos(quantidade, usuario_ids, rng, agora):
+    return [
+        {'nome': f'{_NOMES[i % len(_NOMES)]} {_ADJETIVOS[(i // len(_NOMES)) % len(_ADJETIVOS)]} {i}',
+         'preco': round(rng.uniform(10, 5000), 2),
+         'descricao': f'Descrição do item {i}: {rng.choice(_ADJETIVOS).lower()} e {rng.choice(_ADJETIVOS).lower()}',
+         'imagem': '/static/images/placeholder.jpeg',
+         # Um quarto dos produtos com galeria de 1 a 3 imagens
+         'imagens': [f'/static/images/galeria/{i}-{n}.webp' for n in range(1 + i % 3)] if i % 4 == 0 else None,
+         'proprietario_id': rng.choice(usuario_ids),
+         'destaque': i % 20 == 0,
+         'ativo': i % 50 != 0,
+         'data_criacao': agora - timedelta(minutes=i),
+         'visualizacoes': int(rng.paretovariate(1.2)) % 10000}
+        for i in range(quantidade)
+    ]
+
+
+def _pares_unicos(quantidade, produto_ids, usuario_ids, rng):
+    quantidade = min(quantidade, len(produto_ids) * len(usuario_ids))
+    pares = set()
+    while len(pares) < quantidade:
+        pares.add((rng.choice(produto_ids), rng.choice(usuario_ids)))
+    return sorted(pares)
+
+
+def popular_catalogo(escala='pequena', semente=SEMENTE, **quantidades):
+    """Cria o esquema e grava o catálogo sintético da `escala` (quantidades
+    individuais podem ser sobrescritas: produtos=..., avaliacoes=..., etc.).
+    Deve rodar dentro de um app context. Retorna o resumo com os ids gerados
+    usados pelos cenários."""
+    from app import create_db_and_add_samples
+    from extensions import db
+    from models.avaliacao import Avaliacao
+    from models.categoria import Categoria, produto_categoria
+    from models.produto import Produto
+    from models.usuario import Usuario
+    from models.visualizacao import Visualizacao
+    from services.autocomplete import indice_autocomplete
+    from services.busca_texto import criar_indice_fts
+    from werkzeug.security import generate_password_hash
+
+    quantidades = {**ESCALAS[escala], **quantidades}
+    rng = random.Random(semente)
+    agora = datetime(2025, 1, 1)
+
+    create_db_and_add_samples()
+    senha = generate_password_hash('benchmark')
+
+    with db.engine.begin() as conn:
+        _inserir(conn, Usuario.__table__, _usuarios(quantidades['usuarios'], senha))
+        usuario_ids = [id for (id,) in conn.execute(
+            db.select(Usuario.id).where(Usuario.email.like('%@benchmark.local'))
+        )]
+
+        _inserir(conn, Categoria.__table__, [
+            {'nome': f'Categoria {i}', 'descricao': f'Categoria sintética {i}', 'ordem': 100 + i}
+            for i in range(quantidades['categorias'])
+        ])
+        categoria_ids = [id for (id,) in conn.execute(
+            db.select(Categoria.id).where(Categoria.nome.like('Categoria %'))
+        )]
+
+        primeiro_produto = (conn.execute(db.select(db.func.max(Produto.id))).scalar() or 0) + 1
+        _inserir(conn, Produto.__table__, _produtos(quantidades['produtos'], usuario_ids, rng, agora))
+        produto_ids = list(range(primeiro_produto, primeiro_produto + quantidades['produtos']))
+
+        # Cada produto em 1 a 3 categorias
+        _inserir(conn, produto_categoria, [
+            {'produto_id': produto_id, 'categoria_id': categoria_id}
+            for produto_id in produto_ids
+            for categoria_id in rng.sample(categoria_ids, min(len(categoria_ids), 1 + produto_id % 3))
+        ])
+
+        # Uma avaliação por par produto/usuário, como nas rotas
+        _inserir(conn, Avaliacao.__table__, [
+            {'produto_id': produto_id, 'usuario_id': usuario_id, 'nota': rng.randint(1, 5),
+             'comentario': f'Comentário {n}' if n % 3 else None,
+             'data_criacao': agora - timedelta(hours=n % 5000), 'util': n % 7}
+            for n, (produto_id, usuario_id) in enumerate(
+                _pares_unicos(quantidades['avaliacoes'], produto_ids, usuario_ids, rng)
+            )
+        ])
+
+        _inserir(conn, Visualizacao.__table__, [
+            {'produto_id': rng.choice(produto_ids), 'usuario_id': rng.choice(usuario_ids),
+             'data_visualizacao': agora - timedelta(minutes=n % 100000), 'tempo_visualizacao': n % 120}
+            for n in range(quantidades['visualizacoes'])
+        ])
+
+    Produto.recalcular_avaliacoes()
+    criar_indice_fts(reconstruir=True)
+    indice_autocomplete.reconstruir()
+
+    return {
+        'escala': escala,
+        'quantidades': quantidades,
+        'usuario_ids': usuario_ids,
+        'produto_ids': produto_ids,
+        'categoria_ids': categoria_ids,
+    }
@@ -0,0 +1,407 @@
+# benchmarks/rotas.py
+# Benchmark de latência e vazão das rotas mais usadas da loja
+#
+# Popula um catálogo sintético (benchmarks/dados.py) e executa cada cenário de
+# duas formas:
+#   - cliente: requisições sequenciais pelo test client do Flask (mede o custo
+#     da aplicação sem rede);
+#   - threads: um servidor WSGI multi-thread local (werkzeug) recebendo
+#     requisições HTTP de vários threads clientes ao mesmo tempo.
+# Para cada cenário registra p50/p95/p99/máximo, vazão (req/s), erros e o
+# número de consultas SQL por requisição (lido do cabeçalho Server-Timing).
+#
+# O resultado sai em JSON, para comparar commits:
+#   python benchmarks/rotas.py --escala media --saida base.json
+#   (alterações)
+#   python benchmarks/rotas.py --escala media --comparar base.json
+# Com --comparar, o script termina com código 1 se o p95 de algum cenário
+# piorar além de --tolerancia (padrão 20%) ou se as consultas aumentarem.
+#
+# --json escolhe o backend do provedor JSON (services/json_rapido.py); para
+# medir o ganho do orjson nas rotas que mais serializam:
+#   python benchmarks/rotas.py --sem-cache --cenarios api_produtos,api_tables --json padrao --saida padrao.json
+#   python benchmarks/rotas.py --sem-cache --cenarios api_produtos,api_tables --json orjson --comparar padrao.json
+
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from dados import ESCALAS, SEMENTE, carregar_app, popular_catalogo
+
+_SERVER_TIMING_CONSULTAS = re.compile(r'db;desc="(\d+) consultas"')
+_BUSCAS = [quote(termo) for termo in
+           ('teclado', 'mouse gamer', 'monitor', 'rgb', 'sem fio', 'headset pro', 'ssd', 'cadeira')]
+
+
+# Cenários ---------------------------------------------------------------------
+
+class Cenario:
+    """Uma rota exercitada: `gerar(rng)` devolve (método, url, corpo JSON);
+    `login` é False, True (usuário comum) ou 'admin'"""
+
+    def __init__(self, nome, gerar, login=False):
+        self.nome = nome
+        self.gerar = gerar
+        self.login = login
+
+
+def cenarios(catalogo):
+    produtos = catalogo['produto_ids']
+    categorias = catalogo['categoria_ids']
+    # Avaliações novas: pares (produto, usuário) em sequência, para que cada
+    # POST seja aceito (um usuário avalia um produto uma única vez). Depois de
+    # len(produtos) requisições, somando os dois modos, os POSTs repetem pares
+    # e passam a contar como erros: use uma escala maior ou --produtos
+    proximas_avaliacoes = itertools.count()
+    trava = threading.Lock()
+
+    def avaliacao(rng):
+        with trava:
+            n = next(proximas_avaliacoes)
+        return 'POST', '/api/avaliacoes/', {
+            'produto_id': produtos[n % len(produtos)], 'nota': rng.randint(1, 5), 'comentario': 'Benchmark'
+        }
+
+    return [
+        Cenario('pagina_produtos', lambda rng: ('GET', '/produtos', None), login=True),
+        Cenario('pagina_produto', lambda rng: ('GET', f'/produto/{rng.choice(produtos)}', None), login=True),
+        Cenario('api_produtos', lambda rng: ('GET', '/api/produtos', None)),
+        Cenario('api_produtos_cursor', lambda rng: (
+            'GET', f'/api/produtos?cursor=&limite=20&ordenacao={rng.choice(["recentes", "preco_asc", "nome"])}', None
+        )),
+        Cenario('busca_produtos', lambda rng: (
+            'GET', f'/api/busca/produtos?q={rng.choice(_BUSCAS)}&pagina={rng.randint(1, 3)}', None
+        )),
+        Cenario('busca_filtros', lambda rng: (
+            'GET', f'/api/busca/produtos?categoria_id={rng.choice(categorias)}'
+                   f'&preco_min={rng.randint(0, 500)}&preco_max={rng.randint(1000, 5000)}&ordenacao=preco_asc', None
+        )),
+        Cenario('busca_sugestoes', lambda rng: ('GET', f'/api/busca/sugestoes?q={rng.choice(_BUSCAS)[:3]}', None)),
+        Cenario('busca_autocomplete', lambda rng: ('GET', f'/api/busca/autocomplete?q={rng.choice(_BUSCAS)[:2]}', None)),
+        Cenario('busca_destaques', lambda rng: ('GET', '/api/busca/destaques', None)),
+        Cenario('busca_populares', lambda rng: ('GET', '/api/busca/populares', None)),
+        Cenario('avaliacoes_produto', lambda rng: ('GET', f'/api/avaliacoes/produto/{rng.choice(produtos)}', None)),
+        Cenario('criar_avaliacao', avaliacao, login=True),
+        Cenario('registrar_visualizacao', lambda rng: (
+            'POST', f'/api/visualizacoes/produto/{rng.choice(produtos)}', {'tempo': rng.randint(1, 60)}
+        ), login=True),
+        Cenario('api_tables', lambda rng: ('GET', '/api/tables', None), login='admin'),
+        Cenario('api_tabela', lambda rng: (
+            'GET', f'/api/tables/{rng.choice(["produto", "usuario"])}?pagina={rng.randint(1, 3)}&por_pagina=200', None
+        ), login='admin'),
+    ]
+
+
+# Estatísticas -----------------------------------------------------------------
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return None
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return round(ordenados[indice], 3)
+
+
+def _resumo(latencias, consultas, erros, duracao):
+    ordenados = sorted(latencias)
+    return {
+        'requisicoes': len(latencias),
+        'erros': erros,
+        'p50_ms': _percentil(ordenados, 50),
+        'p95_ms': _percentil(ordenados, 95),
+        'p99_ms': _percentil(ordenados, 99),
+        'max_ms': round(ordenados[-1], 3) if ordenados else None,
+        'media_ms': round(sum(ordenados) / len(ordenados), 3) if ordenados else None,
+        'req_por_s': round(len(latencias) / duracao, 1) if duracao > 0 else None,
+        'consultas_media': round(sum(consultas) / len(consultas), 2) if consultas else None,
+        'consultas_max': max(consultas) if consultas else None,
+    }
+
+
+def _consultas(cabecalho):
+    encontrado = _SERVER_TIMING_CONSULTAS.search(cabecalho or '')
+    return int(encontrado.group(1)) if encontrado else None
+
+
+# Execução: test client ------------------------------------------------------
+
+def executar_cliente(app, cenario, usuario_id, requisicoes, aquecimento, rng):
+    cliente = app.test_client()
+    if cenario.login:
+        with cliente.session_transaction() as sessao:
+            sessao['user_id'] = usuario_id
+
+    latencias, consultas, erros = [], [], 0
+    inicio_cenario = None
+    for i in range(aquecimento + requisicoes):
+        if i == aquecimento:
+            inicio_cenario = time.perf_counter()
+        metodo, url, corpo = cenario.gerar(rng)
+        inicio = time.perf_counter()
+        resposta = cliente.open(url, method=metodo, json=corpo)
+        resposta.get_data()
+        decorrido = (time.perf_counter() - inicio) * 1000
+        if i < aquecimento:
+            continue
+        latencias.append(decorrido)
+        if resposta.status_code >= 400:
+            erros += 1
+        quantidade = _consultas(resposta.headers.get('Server-Timing'))
+        if quantidade is not None:
+            consultas.append(quantidade)
+    return _resumo(latencias, consultas, erros, time.perf_counter() - inicio_cenario)
+
+
+# Execução: servidor multi-thread ----------------------------------------------
+
+def _cookie_sessao(app, usuario_id):
+    serializador = app.session_interface.get_signing_serializer(app)
+    return f"{app.config['SESSION_COOKIE_NAME']}={serializador.dumps({'user_id': usuario_id})}"
+
+
+def executar_threads(app, porta, cenario, usuario_id, requisicoes, aquecimento, threads, semente):
+    cookie = _cookie_sessao(app, usuario_id) if cenario.login else None
+    resultados = []
+    trava = threading.Lock()
+    barreira = threading.Barrier(threads + 1)
+
+    def trabalhador(indice):
+        rng = random.Random(semente + indice)
+        locais = []
+
+        def enviar():
+            metodo, url, corpo = cenario.gerar(rng)
+            cabecalhos = {'Accept-Encoding': 'gzip'}
+            dados = None
+            if corpo is not None:
+                dados = json.dumps(corpo)
+                cabecalhos['Content-Type'] = 'application/json'
+            if cookie:
+                cabecalhos['Cookie'] = cookie
+            conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+            inicio = time.perf_counter()
+            try:
+                conexao.request(metodo, url, body=dados, headers=cabecalhos)
+                resposta = conexao.getresponse()
+                resposta.read()
+                return ((time.perf_counter() - inicio) * 1000, resposta.status,
+                        _consultas(resposta.getheader('Server-Timing')))
+            except (OSError, http.client.HTTPException):
+                return (time.perf_counter() - inicio) * 1000, 599, None
+            finally:
+                conexao.close()
+
+        for _ in range(aquecimento):
+            enviar()
+        barreira.wait()
+        for _ in range(requisicoes // threads + (indice < requisicoes % threads)):
+            locais.append(enviar())
+        with trava:
+            resultados.extend(locais)
+
+    trabalhadores = [threading.Thread(target=trabalhador, args=(i,)) for i in range(threads)]
+    for trabalhador_thread in trabalhadores:
+        trabalhador_thread.start()
+    barreira.wait()
+    inicio = time.perf_counter()
+    for trabalhador_thread in trabalhadores:
+        trabalhador_thread.join()
+    duracao = time.perf_counter() - inicio
+
+    return _resumo(
+        [r[0] for r in resultados],
+        [r[2] for r in resultados if r[2] is not None],
+        sum(1 for r in resultados if r[1] >= 400),
+        duracao
+    )
+
+
+def _servidor(app):
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # sem log de acesso
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, name='benchmark-wsgi', daemon=True).start()
+    return servidor
+
+
+def _usuarios(app):
+    """Usuários logados dos cenários ({True: comum, 'admin': administrador}).
+    O comum não tem avaliações no catálogo, para que cada POST de avaliação
+    (um produto novo por requisição) seja aceito"""
+    from extensions import db
+    from models.usuario import Usuario
+    from werkzeug.security import generate_password_hash
+
+    with app.app_context():
+        comum = Usuario(nome='Benchmark', email='benchmark@benchmark.local', idade=30,
+                        senha=generate_password_hash('benchmark'))
+        admin = Usuario(nome='Benchmark Admin', email='benchmark-admin@benchmark.local', idade=30,
+                        senha=generate_password_hash('benchmark'), is_admin=True)
+        db.session.add_all([comum, admin])
+        db.session.commit()
+        return {True: comum.id, 'admin': admin.id}
+
+
+# Comparação -------------------------------------------------------------------
+
+def comparar(atual, base, tolerancia):
+    """Imprime a diferença por cenário; retorna a lista de regressões"""
+    regressoes = []
+    for modo, cenarios_atuais in atual['modos'].items():
+        cenarios_base = base.get('modos', {}).get(modo, {})
+        print(f'\n[{modo}]  {"cenário":<24}{"p95 base":>10}{"p95 atual":>11}{"Δ p95":>9}{"req/s Δ":>10}{"consultas":>12}')
+        for nome, resultado in cenarios_atuais.items():
+            anterior = cenarios_base.get(nome)
+            if not anterior or not anterior.get('p95_ms') or not resultado.get('p95_ms'):
+                print(f'        {nome:<24}{"-":>10}{resultado.get("p95_ms") or "-":>11}')
+                continue
+            delta = resultado['p95_ms'] / anterior['p95_ms'] - 1
+            vazao = (resultado['req_por_s'] / anterior['req_por_s'] - 1) if anterior.get('req_por_s') else 0
+            consultas = f'{anterior.get("consultas_max")}→{resultado.get("consultas_max")}'
+            print(f'        {nome:<24}{anterior["p95_ms"]:>10.2f}{resultado["p95_ms"]:>11.2f}'
+                  f'{delta:>+9.0%}{vazao:>+10.0%}{consultas:>12}')
+            if delta > tolerancia:
+                regressoes.append(f'{modo}/{nome}: p95 {delta:+.0%}')
+            if (resultado.get('consultas_max') or 0) > (anterior.get('consultas_max') or 0):
+                regressoes.append(f'{modo}/{nome}: consultas {consultas}')
+    return regressoes
+
+
+# Principal ----------------------------------------------------------------------
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de latência das rotas da loja')
+    parser.add_argument('--escala', choices=ESCALAS, default='pequena')
+    parser.add_argument('--produtos', type=int, help='Sobrescreve a quantidade de produtos da escala')
+    parser.add_argument('--requisicoes', type=int, default=200, help='Requisições medidas por cenário')
+    parser.add_argument('--aquecimento', type=int, default=10, help='Requisições descartadas por cenário')
+    parser.add_argument('--threads', type=int, default=8, help='Threads clientes no modo threads')
+    parser.add_argument('--modos', default='cliente,threads', help='cliente, threads ou ambos')
+    parser.add_argument('--cenarios', help='Nomes separados por vírgula (padrão: todos)')
+    parser.add_argument('--sem-cache', action='store_true', help='Desliga o cache de respostas')
+    parser.add_argument('--json', choices=('orjson', 'padrao'), default='orjson',
+                        help='Backend do provedor JSON (orjson só se instalado)')
+    parser.add_argument('--banco', help='Arquivo SQLite (padrão: temporário, removido no final)')
+    parser.add_argument('--semente', type=int, default=SEMENTE)
+    parser.add_argument('--saida', help='Grava o resultado JSON neste arquivo (padrão: saída padrão)')
+    parser.add_argument('--comparar', help='Resultado JSON anterior para comparação')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='Piora aceita no p95 (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    aplicacao, caminho_banco = carregar_app(args.banco)
+    app = aplicacao.app
+    app.config['CACHE_HABILITADO'] = not args.sem_cache
+    # Orçamentos estouram só no log: o benchmark mede, não interrompe
+    app.config['CONSULTAS_ORCAMENTO_ESTRITO'] = False
+    app.logger.disabled = True
+
+    from services.contador_visualizacoes import contador_visualizacoes
+    from services.fila_visualizacoes import fila_visualizacoes
+    from services.json_rapido import ProvedorJSON
+
+    app.json = ProvedorJSON(app, rapido=args.json == 'orjson')
+    try:
+        extras = {'produtos': args.produtos} if args.produtos else {}
+        inicio = time.perf_counter()
+        with app.app_context():
+            catalogo = popular_catalogo(args.escala, args.semente, **extras)
+        carga_s = time.perf_counter() - inicio
+        print(f'Catálogo {args.escala} ({catalogo["quantidades"]}) criado em {carga_s:.1f}s', file=sys.stderr)
+
+        usuarios = _usuarios(app)
+        selecionados = cenarios(catalogo)
+        if args.cenarios:
+            nomes = set(args.cenarios.split(','))
+            selecionados = [c for c in selecionados if c.nome in nomes]
+        modos = [m.strip() for m in args.modos.split(',') if m.strip()]
+
+        resultado = {
+            'meta': {
+                'commit': _commit(),
+                'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'plataforma': platform.platform(),
+                'escala': args.escala,
+                'quantidades': catalogo['quantidades'],
+                'requisicoes': args.requisicoes,
+                'threads': args.threads,
+                'cache': not args.sem_cache,
+                'json': 'orjson' if app.json.rapido else 'padrao',
+                'carga_s': round(carga_s, 2),
+            },
+            'modos': {},
+        }
+
+        if 'cliente' in modos:
+            rng = random.Random(args.semente)
+            resultado['modos']['cliente'] = {}
+            for cenario in selecionados:
+                resultado['modos']['cliente'][cenario.nome] = executar_cliente(
+                    app, cenario, usuarios.get(cenario.login), args.requisicoes, args.aquecimento, rng
+                )
+                print(f'cliente  {cenario.nome}: {resultado["modos"]["cliente"][cenario.nome]}', file=sys.stderr)
+
+        if 'threads' in modos:
+            servidor = _servidor(app)
+            try:
+                resultado['modos']['threads'] = {}
+                for cenario in selecionados:
+                    resultado['modos']['threads'][cenario.nome] = executar_threads(
+                        app, servidor.server_port, cenario, usuarios.get(cenario.login),
+                        args.requisicoes, args.aquecimento, args.threads, args.semente
+                    )
+                    print(f'threads  {cenario.nome}: {resultado["modos"]["threads"][cenario.nome]}', file=sys.stderr)
+            finally:
+                servidor.shutdown()
+    finally:
+        fila_visualizacoes.encerrar()
+        contador_visualizacoes.encerrar()
+        if not args.banco:
+            for sufixo in ('', '-wal', '-shm'):
+                if os.path.exists(caminho_banco + sufixo):
+                    os.unlink(caminho_banco + sufixo)
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto + '\n')
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        regressoes = comparar(resultado, base, args.tolerancia)
+        if regressoes:
+            print('\nRegressões:\n  ' + '\n  '.join(regressoes))
+            return 1
+        print('\nSem regressões.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
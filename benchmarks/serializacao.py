@@ -0,0 +1,212 @@
+# benchmarks/serializacao.py
+# Microbenchmark da serialização dos modelos (to_dict e serializar_lista)
+#
+# Para cada caso (Produto, Avaliacao, Visualizacao e Usuario, objeto a objeto
+# e em lote, e a projeção da listagem de produtos) e cada fixture (poucos e
+# muitos objetos), carrega os dados numa sessão nova, fora da medição, e mede
+# só a serialização:
+#   - us_por_objeto: menor tempo entre as repetições (o menos afetado por
+#     ruído da máquina, como no timeit), em microssegundos por objeto, e a
+#     mediana em us_por_objeto_mediana;
+#   - consultas: comandos SQL disparados pela serialização (lazy loads);
+#   - bytes_por_objeto / pico_por_objeto: memória retida pelo resultado e
+#     pico durante a serialização (tracemalloc, numa execução separada).
+#
+# A base fica em benchmarks/base_serializacao.json. Consultas e memória são
+# estáveis entre máquinas; o tempo não, então regrave a base na máquina onde
+# a comparação roda (--atualizar-base).
+#
+#   python benchmarks/serializacao.py                      # compara com a base
+#   python benchmarks/serializacao.py --atualizar-base     # regrava a base
+#
+# Termina com código 1 se algum caso ficar mais lento além de --tolerancia,
+# alocar mais memória além de --tolerancia-memoria ou fizer mais consultas.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from dados import SEMENTE, carregar_app, popular_catalogo
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'base_serializacao.json')
+
+# Objetos serializados por fixture
+FIXTURES = {'pequena': 10, 'grande': 1000}
+
+# Catálogo com objetos suficientes para a fixture grande de cada modelo
+CATALOGO = {'usuarios': 1000, 'categorias': 10, 'produtos': 2000, 'avaliacoes': 5000, 'visualizacoes': 5000}
+
+
+def casos():
+    """(nome, carregar(quantidade), função que serializa a lista carregada)"""
+    from models.avaliacao import Avaliacao
+    from models.produto import Produto
+    from models.usuario import Usuario
+    from models.visualizacao import Visualizacao
+    from services.projecoes import LISTAGEM_PRODUTOS
+
+    def linhas_listagem(quantidade):
+        return LISTAGEM_PRODUTOS.aplicar(Produto.query.order_by(Produto.id)).limit(quantidade).all()
+
+    return [
+        ('produto.to_dict', _objetos(Produto), lambda objetos: [p.to_dict() for p in objetos]),
+        ('Produto.serializar_lista', _objetos(Produto), Produto.serializar_lista),
+        ('LISTAGEM_PRODUTOS.serializar_lista', linhas_listagem, LISTAGEM_PRODUTOS.serializar_lista),
+        ('avaliacao.to_dict', _objetos(Avaliacao), lambda objetos: [a.to_dict() for a in objetos]),
+        ('Avaliacao.serializar_lista', _objetos(Avaliacao), Avaliacao.serializar_lista),
+        ('visualizacao.to_dict', _objetos(Visualizacao), lambda objetos: [v.to_dict() for v in objetos]),
+        ('Visualizacao.serializar_lista', _objetos(Visualizacao), Visualizacao.serializar_lista),
+        ('usuario.to_dict', _objetos(Usuario), lambda objetos: [u.to_dict() for u in objetos]),
+    ]
+
+
+def _objetos(modelo):
+    return lambda quantidade: modelo.query.order_by(modelo.id).limit(quantidade).all()
+
+
+def _carregar(carregar, quantidade):
+    """Dados numa sessão nova: identity map vazio, como numa requisição"""
+    from extensions import db
+
+    db.session.remove()
+    return carregar(quantidade)
+
+
+def medir(carregar, serializar, quantidade, repeticoes):
+    from services.instrumentacao import contar_consultas
+
+    tempos, consultas = [], []
+    for _ in range(repeticoes):
+        objetos = _carregar(carregar, quantidade)
+        gc.collect()
+        with contar_consultas() as contagem:
+            inicio = time.perf_counter()
+            serializar(objetos)
+            tempos.append(time.perf_counter() - inicio)
+        consultas.append(contagem.total)
+
+    # Memória numa execução à parte: o tracemalloc deixa tudo mais lento
+    objetos = _carregar(carregar, quantidade)
+    gc.collect()
+    tracemalloc.start()
+    resultado = serializar(objetos)
+    retidos, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+
+    quantidade = len(objetos)
+    return {
+        'objetos': quantidade,
+        'us_por_objeto': round(min(tempos) / quantidade * 1e6, 2),
+        'us_por_objeto_mediana': round(statistics.median(tempos) / quantidade * 1e6, 2),
+        'consultas': max(consultas),
+        'consultas_por_objeto': round(max(consultas) / quantidade, 3),
+        'bytes_por_objeto': round(retidos / quantidade),
+        'pico_por_objeto': round(pico / quantidade),
+    }
+
+
+def comparar(atual, base, tolerancia, tolerancia_memoria):
+    """Imprime a diferença por caso; retorna a lista de regressões"""
+    regressoes = []
+    print(f'{"caso":<38}{"fixture":>9}{"us/obj":>9}{"Δ tempo":>9}{"bytes/obj":>11}{"Δ mem":>8}{"consultas":>11}')
+    for chave, resultado in atual['casos'].items():
+        caso, fixture = chave.rsplit('@', 1)
+        anterior = base.get('casos', {}).get(chave)
+        if not anterior:
+            print(f'{caso:<38}{fixture:>9}{resultado["us_por_objeto"]:>9.2f}{"novo":>9}')
+            continue
+        delta_tempo = resultado['us_por_objeto'] / anterior['us_por_objeto'] - 1
+        delta_memoria = (resultado['pico_por_objeto'] / anterior['pico_por_objeto'] - 1
+                         if anterior['pico_por_objeto'] else 0)
+        consultas = f'{anterior["consultas"]}→{resultado["consultas"]}'
+        print(f'{caso:<38}{fixture:>9}{resultado["us_por_objeto"]:>9.2f}{delta_tempo:>+9.0%}'
+              f'{resultado["bytes_por_objeto"]:>11}{delta_memoria:>+8.0%}{consultas:>11}')
+        if delta_tempo > tolerancia:
+            regressoes.append(f'{chave}: tempo {delta_tempo:+.0%}')
+        if delta_memoria > tolerancia_memoria:
+            regressoes.append(f'{chave}: memória {delta_memoria:+.0%}')
+        if resultado['consultas'] > anterior['consultas']:
+            regressoes.append(f'{chave}: consultas {consultas}')
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Microbenchmark da serialização dos modelos')
+    parser.add_argument('--repeticoes', type=int, default=15, help='Repetições de cada caso')
+    parser.add_argument('--casos', help='Nomes separados por vírgula (padrão: todos)')
+    parser.add_argument('--saida', help='Grava o resultado JSON neste arquivo')
+    parser.add_argument('--comparar', default=BASE, help='Resultado anterior (padrão: a base)')
+    parser.add_argument('--atualizar-base', action='store_true', help='Grava o resultado como nova base')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Piora aceita no tempo (0.25 = 25%%)')
+    parser.add_argument('--tolerancia-memoria', type=float, default=0.1, help='Piora aceita no pico de memória')
+    args = parser.parse_args(argv)
+
+    aplicacao, caminho_banco = carregar_app()
+    app = aplicacao.app
+    app.logger.disabled = True
+
+    from services.contador_visualizacoes import contador_visualizacoes
+    from services.fila_visualizacoes import fila_visualizacoes
+
+    resultado = {
+        'meta': {
+            'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'repeticoes': args.repeticoes,
+            'fixtures': FIXTURES,
+        },
+        'casos': {},
+    }
+    try:
+        with app.app_context():
+            popular_catalogo('pequena', SEMENTE, **CATALOGO)
+            selecionados = casos()
+            if args.casos:
+                nomes = set(args.casos.split(','))
+                selecionados = [c for c in selecionados if c[0] in nomes]
+            for nome, carregar, serializar in selecionados:
+                for fixture, quantidade in FIXTURES.items():
+                    medida = medir(carregar, serializar, quantidade, args.repeticoes)
+                    resultado['casos'][f'{nome}@{fixture}'] = medida
+                    print(f'{nome}@{fixture}: {medida}', file=sys.stderr)
+    finally:
+        fila_visualizacoes.encerrar()
+        contador_visualizacoes.encerrar()
+        for sufixo in ('', '-wal', '-shm'):
+            if os.path.exists(caminho_banco + sufixo):
+                os.unlink(caminho_banco + sufixo)
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False) + '\n'
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+    if args.atualizar_base:
+        with open(BASE, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+        print(f'Base gravada em {BASE}')
+        return 0
+
+    if not os.path.exists(args.comparar):
+        print(f'Sem base para comparar ({args.comparar}); use --atualizar-base')
+        return 0
+    with open(args.comparar, encoding='utf-8') as arquivo:
+        base = json.load(arquivo)
+    regressoes = comparar(resultado, base, args.tolerancia, args.tolerancia_memoria)
+    if regressoes:
+        print('\nRegressões:\n  ' + '\n  '.join(regressoes))
+        return 1
+    print('\nSem regressões.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,7 +5,57 @@
 # 1. Criar uma classe 'Config'.
 # 2. Dentro de 'Config', definir a variável 'SQLALCHEMY_DATABASE_URI' para apontar para um arquivo SQLite chamado 'db.sqlite' na pasta raiz.
 # 3. Definir 'SQLALCHEMY_TRACK_MODIFICATIONS' como False.
+#
+# Perfis: APP_ENV=prod seleciona ProdConfig (WAL, pragmas ajustados e pool de
+# conexões para servidores multi-thread); qualquer outro valor usa DevConfig.
+# DATABASE_URL substitui o banco padrão.
+
+import os
+
 
 class Config:
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///db.sqlite'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///db.sqlite')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # PRAGMAs aplicados a cada nova conexão SQLite (ver services/sqlite_perfil.py)
+    SQLITE_PRAGMAS = {
+        'busy_timeout': 5000,  # ms esperando o lock de escrita antes de "database is locked"
+    }
+
+
+class DevConfig(Config):
+    pass
+
+
+class ProdConfig(Config):
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',       # leitores não bloqueiam o escritor (e vice-versa)
+        'synchronous': 'NORMAL',     # seguro com WAL; fsync só nos checkpoints
+        'busy_timeout': 5000,
+        'cache_size': -64000,        # 64 MB de cache de páginas por conexão
+        'mmap_size': 268435456,      # 256 MB de leitura via mmap
+        'temp_store': 'MEMORY',      # ordenações/tabelas temporárias em memória
+    }
+
+    # Pool para servidores multi-thread: uma conexão por thread de trabalho,
+    # com folga para picos. check_same_thread=False permite que a conexão
+    # devolvida ao pool seja usada por outro thread.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': 30,
+        'pool_recycle': 3600,
+        'connect_args': {'check_same_thread': False, 'timeout': 5},
+    }
+
+
+PERFIS = {
+    'dev': DevConfig,
+    'prod': ProdConfig,
+}
+
+
+def obter_config(ambiente=None):
+    """Classe de configuração do ambiente (APP_ENV, padrão 'dev')"""
+    ambiente = ambiente or os.environ.get('APP_ENV', 'dev')
+    return PERFIS.get(ambiente, DevConfig)
@@ -20,6 +20,10 @@ class Avaliacao(db.Model):
     # Constraints
     __table_args__ = (
         db.UniqueConstraint('produto_id', 'usuario_id', name='unique_usuario_produto_avaliacao'),
+        # avaliações de um produto ordenadas por data
+        db.Index('ix_avaliacao_produto_data', 'produto_id', 'data_criacao'),
+        # avaliações de um usuário (exclusão de conta, resumo de avaliações)
+        db.Index('ix_avaliacao_usuario', 'usuario_id'),
     )
 
     def __repr__(self):
@@ -39,4 +43,22 @@ class Avaliacao(db.Model):
                 'nome': self.usuario.nome,
                 'foto_perfil': self.usuario.foto_perfil
             }
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def serializar_lista(avaliacoes):
+        """Serializa avaliações carregando os autores em lote, com um número
+        constante de consultas (to_dict aninha o usuário de cada avaliação)"""
+        from models.produto import LOTE_IN
+        from models.usuario import Usuario
+
+        avaliacoes = list(avaliacoes)
+        # Mesma estratégia de Produto.serializar_lista: os autores ficam no
+        # identity map e o lazy load de muitos-para-um não vai ao banco
+        autores = []
+        usuario_ids = list({a.usuario_id for a in avaliacoes if 'usuario' not in a.__dict__})
+        for inicio in range(0, len(usuario_ids), LOTE_IN):
+            bloco = usuario_ids[inicio:inicio + LOTE_IN]
+            autores.extend(Usuario.query.filter(Usuario.id.in_(bloco)).all())
+
+        return [a.to_dict() for a in avaliacoes]
@@ -18,7 +18,9 @@ class Categoria(db.Model):
     def __repr__(self):
         return f'<Categoria {self.nome}>'
 
-    def to_dict(self):
+    def to_dict(self, produtos_count=None):
+        if produtos_count is None:
+            produtos_count = Categoria.contar_produtos([self.id]).get(self.id, 0)
         return {
             'id': self.id,
             'nome': self.nome,
@@ -26,11 +28,62 @@ class Categoria(db.Model):
             'cor': self.cor,
             'icone': self.icone,
             'ordem': self.ordem,
-            'produtos_count': len(self.produtos) if self.produtos else 0
+            'produtos_count': produtos_count
         }
 
+    @staticmethod
+    def contar_produtos(categoria_ids=None):
+        """Quantidade de produtos por categoria numa única consulta agrupada
+        (sem carregar os produtos); categorias vazias não aparecem"""
+        consulta = db.select(
+            produto_categoria.c.categoria_id, db.func.count()
+        ).group_by(produto_categoria.c.categoria_id)
+        if categoria_ids is not None:
+            consulta = consulta.where(produto_categoria.c.categoria_id.in_(categoria_ids))
+        return dict(db.session.execute(consulta).all())
+
+    @staticmethod
+    def serializar_lista(categorias):
+        """Serializa categorias com as contagens vindas de uma só consulta"""
+        categorias = list(categorias)
+        contagens = Categoria.contar_produtos()
+        return [c.to_dict(contagens.get(c.id, 0)) for c in categorias]
+
+    @staticmethod
+    def contem_produto(categoria_id, produto_id):
+        """Testa a associação pela chave primária, sem carregar a coleção"""
+        return db.session.execute(
+            db.select(produto_categoria.c.produto_id).where(
+                produto_categoria.c.produto_id == produto_id,
+                produto_categoria.c.categoria_id == categoria_id
+            )
+        ).first() is not None
+
+    @staticmethod
+    def adicionar_produto(categoria_id, produto_id):
+        """Insere a associação direto na tabela; retorna False se já existia"""
+        if Categoria.contem_produto(categoria_id, produto_id):
+            return False
+        db.session.execute(
+            db.insert(produto_categoria).values(produto_id=produto_id, categoria_id=categoria_id)
+        )
+        return True
+
+    @staticmethod
+    def remover_produto(categoria_id, produto_id):
+        """Remove a associação direto na tabela; retorna False se não existia"""
+        resultado = db.session.execute(
+            db.delete(produto_categoria).where(
+                produto_categoria.c.produto_id == produto_id,
+                produto_categoria.c.categoria_id == categoria_id
+            )
+        )
+        return resultado.rowcount > 0
+
 # Tabela de relacionamento many-to-many entre Produto e Categoria
 produto_categoria = db.Table('produto_categoria',
     db.Column('produto_id', db.Integer, db.ForeignKey('produto.id'), primary_key=True),
-    db.Column('categoria_id', db.Integer, db.ForeignKey('categoria.id'), primary_key=True)
+    db.Column('categoria_id', db.Integer, db.ForeignKey('categoria.id'), primary_key=True),
+    # A chave primária começa por produto_id; este índice atende buscas por categoria
+    db.Index('ix_produto_categoria_categoria', 'categoria_id', 'produto_id')
 )
\ No newline at end of file
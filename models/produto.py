@@ -10,6 +10,13 @@
 
 from extensions import db
 from datetime import datetime
+from sqlalchemy.ext.mutable import MutableList
+from sqlalchemy.orm import validates
+from models.tipos import ListaImagens, validar_galeria
+from services.imagens import urls_variantes
+
+# Tamanho máximo das listas IN usadas nas cargas em lote (limite de variáveis do SQLite)
+LOTE_IN = 500
 
 class Produto(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -17,36 +24,45 @@ class Produto(db.Model):
     preco = db.Column(db.Float, nullable=False)
     descricao = db.Column(db.Text)
     imagem = db.Column(db.String(255), nullable=True)  # Imagem principal
-    imagens = db.Column(db.Text)  # JSON com lista de imagens adicionais
+    imagens = db.Column(MutableList.as_mutable(ListaImagens()))  # Galeria de imagens adicionais (JSON em TEXT)
+    imagem_hash = db.Column(db.String(64), nullable=True)  # Variantes WebP prontas (services/imagens.py)
     proprietario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=True)
     destaque = db.Column(db.Boolean, default=False)  # Produto em destaque
     ativo = db.Column(db.Boolean, default=True)  # Produto ativo/inativo
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     visualizacoes = db.Column(db.Integer, default=0)  # Contador de visualizações
+    # Resumo das avaliações mantido pelas rotas de escrita (ver ajustar_avaliacoes)
+    soma_notas = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_avaliacoes = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relacionamento com Usuario
     proprietario = db.relationship('Usuario', backref='produtos', lazy=True)
 
+    # Índices das listagens e da busca (todas filtram por ativo)
+    __table_args__ = (
+        db.Index('ix_produto_ativo_destaque_data', 'ativo', 'destaque', 'data_criacao'),
+        db.Index('ix_produto_ativo_visualizacoes', 'ativo', 'visualizacoes'),
+        db.Index('ix_produto_ativo_preco', 'ativo', 'preco'),
+        db.Index('ix_produto_ativo_nome', 'ativo', 'nome'),
+        db.Index('ix_produto_ativo_data', 'ativo', 'data_criacao'),
+    )
+
     def __repr__(self):
         return f'<Produto {self.nome}>'
 
-    def to_dict(self):
-        # Parse das imagens adicionais
-        imagens_lista = []
-        if self.imagens:
-            try:
-                import json
-                imagens_lista = json.loads(self.imagens)
-            except:
-                imagens_lista = []
+    @validates('imagens')
+    def _validar_imagens(self, chave, valor):
+        return validar_galeria(valor)
 
+    def to_dict(self):
         return {
             'id': self.id,
             'nome': self.nome,
             'preco': self.preco,
             'descricao': self.descricao,
             'imagem': self.imagem,
-            'imagens': imagens_lista,
+            'imagens': list(self.imagens or ()),
+            'imagens_variantes': self.variantes_imagem(),
             'proprietario_id': self.proprietario_id,
             'destaque': self.destaque,
             'ativo': self.ativo,
@@ -57,17 +73,94 @@ class Produto(db.Model):
             'total_avaliacoes': self.get_total_avaliacoes()
         }
 
+    def variantes_imagem(self):
+        """URLs das variantes (thumb, card, full) da imagem principal"""
+        return urls_variantes(self.imagem, self.imagem_hash)
+
+    @staticmethod
+    def serializar_lista(produtos):
+        """Serializa uma lista de produtos carregando os proprietários em lote,
+        com um número constante de consultas."""
+        from models.usuario import Usuario
+
+        produtos = list(produtos)
+        if not produtos:
+            return []
+
+        # Carrega os proprietários ainda não presentes no identity map; o lazy
+        # load de muitos-para-um passa a ser resolvido sem ir ao banco. A lista
+        # mantém referências fortes, já que o identity map é fraco.
+        proprietarios = []
+        proprietario_ids = list({
+            p.proprietario_id for p in produtos
+            if p.proprietario_id is not None and 'proprietario' not in p.__dict__
+        })
+        for inicio in range(0, len(proprietario_ids), LOTE_IN):
+            bloco = proprietario_ids[inicio:inicio + LOTE_IN]
+            proprietarios.extend(Usuario.query.filter(Usuario.id.in_(bloco)).all())
+
+        return [p.to_dict() for p in produtos]
+
+    @staticmethod
+    def media_avaliacao(soma_notas, total_avaliacoes):
+        """Média das notas a partir do resumo (soma_notas, total_avaliacoes)"""
+        if not total_avaliacoes:
+            return 0
+        return round((soma_notas or 0) / total_avaliacoes, 1)
+
     def get_media_avaliacao(self):
         """Retorna a média das avaliações"""
-        if not hasattr(self, 'avaliacoes') or not self.avaliacoes:
-            return 0
-        avaliacoes = self.avaliacoes.all()
-        if not avaliacoes:
-            return 0
-        return round(sum(a.nota for a in avaliacoes) / len(avaliacoes), 1)
+        return Produto.media_avaliacao(self.soma_notas, self.total_avaliacoes)
 
     def get_total_avaliacoes(self):
         """Retorna o total de avaliações"""
-        if not hasattr(self, 'avaliacoes') or not self.avaliacoes:
-            return 0
-        return self.avaliacoes.count()
\ No newline at end of file
+        return self.total_avaliacoes or 0
+
+    @staticmethod
+    def ajustar_avaliacoes(produto_id, delta_soma, delta_total):
+        """Aplica um delta ao resumo de avaliações com um UPDATE atômico.
+        Deve ser chamado na mesma transação que grava a avaliação."""
+        db.session.execute(
+            db.update(Produto)
+            .where(Produto.id == produto_id)
+            .values(
+                soma_notas=Produto.soma_notas + delta_soma,
+                total_avaliacoes=Produto.total_avaliacoes + delta_total
+            )
+        )
+
+    @staticmethod
+    def descontar_avaliacoes_usuario(usuario_id):
+        """Remove do resumo as avaliações de um usuário (antes de excluí-las)"""
+        from models.avaliacao import Avaliacao
+
+        do_usuario = db.and_(Avaliacao.produto_id == Produto.id, Avaliacao.usuario_id == usuario_id)
+        db.session.execute(
+            db.update(Produto)
+            .where(Produto.id.in_(
+                db.select(Avaliacao.produto_id).where(Avaliacao.usuario_id == usuario_id)
+            ))
+            .values(
+                soma_notas=Produto.soma_notas - db.select(db.func.coalesce(db.func.sum(Avaliacao.nota), 0))
+                    .where(do_usuario).scalar_subquery(),
+                total_avaliacoes=Produto.total_avaliacoes - db.select(db.func.count(Avaliacao.id))
+                    .where(do_usuario).scalar_subquery()
+            ),
+            execution_options={'synchronize_session': False}
+        )
+
+    @staticmethod
+    def recalcular_avaliacoes():
+        """Recalcula do zero o resumo de avaliações de todos os produtos"""
+        from models.avaliacao import Avaliacao
+
+        db.session.execute(
+            db.update(Produto).values(
+                soma_notas=db.select(db.func.coalesce(db.func.sum(Avaliacao.nota), 0))
+                    .where(Avaliacao.produto_id == Produto.id).scalar_subquery(),
+                total_avaliacoes=db.select(db.func.count(Avaliacao.id))
+                    .where(Avaliacao.produto_id == Produto.id).scalar_subquery()
+            ),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
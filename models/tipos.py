@@ -0,0 +1,76 @@
+# models/tipos.py
+# Tipos de coluna compartilhados pelos modelos
+#
+# ListaImagens guarda a galeria de imagens adicionais de um produto como JSON
+# numa coluna TEXT (o mesmo formato já gravado em produto.imagens, sem
+# migração). O JSON é lido uma vez, quando a linha é carregada, e o atributo
+# do modelo já é a lista: to_dict e as projeções não voltam a fazer parse.
+# Na leitura o tipo é tolerante (JSON inválido ou itens que não são texto
+# viram lista vazia/são descartados, com aviso no log); na escrita a galeria
+# é validada e um valor inválido levanta GaleriaInvalida.
+
+import json
+import logging
+from sqlalchemy.types import Text, TypeDecorator
+
+GALERIA_MAXIMO = 20        # imagens adicionais por produto
+TAMANHO_MAXIMO_URL = 255   # mesmo limite da coluna imagem
+_PREFIXOS_URL = ('/', 'http://', 'https://')
+
+logger = logging.getLogger(__name__)
+
+
+class GaleriaInvalida(ValueError):
+    pass
+
+
+def validar_galeria(valor):
+    """Normaliza a galeria para uma lista de URLs. Aceita lista/tupla ou o
+    JSON de uma lista; None e '' viram lista vazia."""
+    if valor is None or valor == '':
+        return []
+    if isinstance(valor, str):
+        try:
+            valor = json.loads(valor)
+        except ValueError:
+            raise GaleriaInvalida('imagens deve ser uma lista de URLs')
+    if not isinstance(valor, (list, tuple)):
+        raise GaleriaInvalida('imagens deve ser uma lista de URLs')
+    if len(valor) > GALERIA_MAXIMO:
+        raise GaleriaInvalida(f'Máximo de {GALERIA_MAXIMO} imagens adicionais')
+
+    galeria = []
+    for url in valor:
+        if not isinstance(url, str) or not url.strip():
+            raise GaleriaInvalida('Cada imagem deve ser uma URL não vazia')
+        url = url.strip()
+        if len(url) > TAMANHO_MAXIMO_URL:
+            raise GaleriaInvalida(f'URL de imagem com mais de {TAMANHO_MAXIMO_URL} caracteres')
+        if not url.startswith(_PREFIXOS_URL):
+            raise GaleriaInvalida(f'URL de imagem inválida: {url}')
+        galeria.append(url)
+    return galeria
+
+
+class ListaImagens(TypeDecorator):
+    """Lista de URLs gravada como JSON em TEXT"""
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, valor, dialect):
+        galeria = validar_galeria(valor)
+        return json.dumps(galeria, separators=(',', ':')) if galeria else None
+
+    def process_result_value(self, valor, dialect):
+        if not valor:
+            return []
+        try:
+            galeria = json.loads(valor)
+        except ValueError:
+            logger.warning('Galeria de imagens com JSON inválido ignorada: %.80r', valor)
+            return []
+        if not isinstance(galeria, list):
+            logger.warning('Galeria de imagens que não é uma lista ignorada: %.80r', valor)
+            return []
+        return [url for url in galeria if isinstance(url, str) and url]
@@ -15,6 +15,12 @@ class Usuario(db.Model, UserMixin):
     # Campo para armazenar lista de IDs de produtos favoritos como JSON
     favoritos = db.Column(db.Text, default='[]')
 
+    __table_args__ = (
+        # Busca por prefixo do painel SQL (LIKE 'texto%' só usa índice NOCASE)
+        db.Index('ix_usuario_nome_nocase', db.collate(nome, 'NOCASE')),
+        db.Index('ix_usuario_email_nocase', db.collate(email, 'NOCASE')),
+    )
+
     def __repr__(self):
         return f'<Usuario {self.nome}>'
 
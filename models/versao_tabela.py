@@ -0,0 +1,19 @@
+# models/versao_tabela.py
+# Versão de cada tabela, compartilhada por todos os processos
+#
+# Incrementada na mesma transação que altera a tabela (services/versoes_tabelas.py).
+# Workers do servidor e comandos da CLI usam o mesmo banco, então uma escrita
+# feita por qualquer um deles muda as ETags e o cache de todos.
+
+from extensions import db
+from datetime import datetime
+
+class VersaoTabela(db.Model):
+    __tablename__ = 'versao_tabela'
+
+    tabela = db.Column(db.String(64), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    modificado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # UTC, com microssegundos
+
+    def __repr__(self):
+        return f'<VersaoTabela {self.tabela} v{self.versao}>'
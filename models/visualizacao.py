@@ -15,15 +15,40 @@ class Visualizacao(db.Model):
     usuario = db.relationship('Usuario', backref=db.backref('historico_visualizacoes', lazy='dynamic'))
     produto = db.relationship('Produto', backref=db.backref('registros_visualizacao', lazy='dynamic'))
 
+    # Índices das consultas frequentes
+    __table_args__ = (
+        # "visualizou nos últimos 30 minutos" e última visualização do par
+        db.Index('ix_visualizacao_usuario_produto_data', 'usuario_id', 'produto_id', 'data_visualizacao'),
+        # histórico e recentes do usuário, ordenados por data
+        db.Index('ix_visualizacao_usuario_data', 'usuario_id', 'data_visualizacao'),
+        # exclusão das visualizações de um produto
+        db.Index('ix_visualizacao_produto', 'produto_id'),
+    )
+
     def __repr__(self):
         return f'<Visualizacao {self.usuario.nome} -> {self.produto.nome}>'
 
-    def to_dict(self):
+    def to_dict(self, produto_dict=None):
+        if produto_dict is None and self.produto:
+            produto_dict = self.produto.to_dict()
         return {
             'id': self.id,
             'usuario_id': self.usuario_id,
             'produto_id': self.produto_id,
             'data_visualizacao': self.data_visualizacao.isoformat() if self.data_visualizacao else None,
             'tempo_visualizacao': self.tempo_visualizacao,
-            'produto': self.produto.to_dict() if self.produto else None
-        }
\ No newline at end of file
+            'produto': produto_dict
+        }
+
+    @staticmethod
+    def serializar_lista(visualizacoes):
+        """Serializa visualizações carregando os produtos aninhados em lote"""
+        from models.produto import Produto, LOTE_IN
+
+        visualizacoes = list(visualizacoes)
+        ids = list({v.produto_id for v in visualizacoes})
+        produtos = []
+        for inicio in range(0, len(ids), LOTE_IN):
+            produtos.extend(Produto.query.filter(Produto.id.in_(ids[inicio:inicio + LOTE_IN])).all())
+        produtos_dict = {d['id']: d for d in Produto.serializar_lista(produtos)}
+        return [v.to_dict(produtos_dict.get(v.produto_id)) for v in visualizacoes]
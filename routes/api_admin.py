@@ -0,0 +1,68 @@
+# routes/api_admin.py
+# API de administração do catálogo (operações em massa)
+
+import io
+import time
+from flask import Blueprint, request, jsonify, session
+from services.importacao import (
+    ErroImportacao, LOTE_IMPORTACAO, formato_do_arquivo, importar_produtos, ler_registros, linhas_exportacao
+)
+from services.operacoes_admin import MAXIMO_OPERACOES_LOTE, executar_lote
+from services.streaming import resposta_linhas
+from utils import api_admin_required
+
+api_admin = Blueprint('api_admin', __name__, url_prefix='/api/admin')
+
+@api_admin.route('/produtos/importar', methods=['POST'])
+@api_admin_required
+def importar_produtos_api():
+    """Importa produtos de um CSV/JSONL enviado como arquivo ('arquivo') ou
+    no corpo da requisição (?formato=csv|jsonl)"""
+    arquivo = request.files.get('arquivo')
+    try:
+        if arquivo:
+            formato = formato_do_arquivo(arquivo.filename or '', request.values.get('formato'))
+            fluxo = arquivo.stream
+        else:
+            formato = formato_do_arquivo('', request.args.get('formato', 'jsonl'))
+            fluxo = request.stream
+    except ErroImportacao as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    lote = request.values.get('lote', LOTE_IMPORTACAO, type=int)
+    inicio = time.perf_counter()
+    texto = io.TextIOWrapper(fluxo, encoding='utf-8-sig', newline='')
+    resumo = importar_produtos(ler_registros(texto, formato), tamanho_lote=max(1, lote))
+    resumo['duracao_s'] = round(time.perf_counter() - inicio, 3)
+    return jsonify({'success': True, **resumo})
+
+@api_admin.route('/produtos/exportar', methods=['GET'])
+@api_admin_required
+def exportar_produtos_api():
+    """Exporta o catálogo em streaming (?formato=jsonl|csv)"""
+    try:
+        formato = formato_do_arquivo('', request.args.get('formato', 'jsonl'))
+    except ErroImportacao as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    return resposta_linhas(lambda: linhas_exportacao(formato), mimetype, f'produtos.{formato}')
+
+@api_admin.route('/lote', methods=['POST'])
+@api_admin_required
+def operacoes_em_lote():
+    """Executa várias operações do painel SQL numa só transação.
+
+    Corpo: {"operacoes": [{"tabela": "produto"|"usuario", "acao": "criar"|
+    "atualizar"|"excluir"|"duplicar", "id": ..., "dados": {...}}, ...],
+    "atomico": false}. Responde o resultado e o tempo de cada operação."""
+    data = request.get_json(silent=True) or {}
+    operacoes = data.get('operacoes')
+    if not isinstance(operacoes, list) or not operacoes:
+        return jsonify({'success': False, 'error': 'operacoes deve ser uma lista não vazia'}), 400
+    if len(operacoes) > MAXIMO_OPERACOES_LOTE:
+        return jsonify({
+            'success': False, 'error': f'Máximo de {MAXIMO_OPERACOES_LOTE} operações por lote'
+        }), 413
+
+    return jsonify(executar_lote(operacoes, session['user_id'], atomico=bool(data.get('atomico'))))
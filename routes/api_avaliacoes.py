@@ -6,11 +6,15 @@ from extensions import db
 from models.avaliacao import Avaliacao
 from models.produto import Produto
 from models.usuario import Usuario
+from services.condicional import condicional
+from services.instrumentacao import orcamento_consultas
 from utils import login_required
 
 api_avaliacoes = Blueprint('api_avaliacoes', __name__, url_prefix='/api/avaliacoes')
 
 @api_avaliacoes.route('/produto/<int:produto_id>', methods=['GET'])
+@orcamento_consultas(5)
+@condicional('avaliacao', 'usuario', 'produto')
 def get_avaliacoes_produto(produto_id):
     """Lista avaliações de um produto"""
     produto = Produto.query.get(produto_id)
@@ -20,7 +24,7 @@ def get_avaliacoes_produto(produto_id):
     avaliacoes = Avaliacao.query.filter_by(produto_id=produto_id)\
                                .order_by(Avaliacao.data_criacao.desc()).all()
 
-    return jsonify([avaliacao.to_dict() for avaliacao in avaliacoes])
+    return jsonify(Avaliacao.serializar_lista(avaliacoes))
 
 @api_avaliacoes.route('/', methods=['POST'])
 @login_required
@@ -60,6 +64,7 @@ def create_avaliacao():
     )
 
     db.session.add(avaliacao)
+    Produto.ajustar_avaliacoes(produto_id, nota, 1)
     db.session.commit()
 
     return jsonify(avaliacao.to_dict()), 201
@@ -82,6 +87,8 @@ def update_avaliacao(id):
         nota = data['nota']
         if nota < 1 or nota > 5:
             return jsonify({'error': 'Nota deve ser entre 1 e 5'}), 400
+        if nota != avaliacao.nota:
+            Produto.ajustar_avaliacoes(avaliacao.produto_id, nota - avaliacao.nota, 0)
         avaliacao.nota = nota
 
     if 'comentario' in data:
@@ -104,6 +111,7 @@ def delete_avaliacao(id):
         return jsonify({'error': 'Acesso negado'}), 403
 
     db.session.delete(avaliacao)
+    Produto.ajustar_avaliacoes(avaliacao.produto_id, -avaliacao.nota, -1)
     db.session.commit()
     return jsonify({'success': True})
 
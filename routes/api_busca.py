@@ -5,12 +5,23 @@ from flask import Blueprint, request, jsonify
 from extensions import db
 from models.produto import Produto
 from models.categoria import Categoria
+from services.busca_texto import filtrar_texto, ordem_relevancia
+from services.paginacao import ORDENACOES, CursorInvalido, ordenar, paginar_por_cursor
+from services.projecoes import LISTAGEM_PRODUTOS, SUGESTOES_PRODUTOS
+from services.cache import cache_respostas
+from services.condicional import condicional
+from services.instrumentacao import orcamento_consultas
+from services.autocomplete import indice_autocomplete
+from services.contador_visualizacoes import TABELA_CONTAGENS
+from utils import api_admin_required
 from sqlalchemy import or_, and_, func
 import json
 
 api_busca = Blueprint('api_busca', __name__, url_prefix='/api/busca')
 
 @api_busca.route('/produtos', methods=['GET'])
+@orcamento_consultas(7)
+@condicional('produto', 'usuario', 'categoria', 'produto_categoria', TABELA_CONTAGENS)
 def buscar_produtos():
     """Busca e filtra produtos"""
     # Parâmetros de busca
@@ -18,21 +29,20 @@ def buscar_produtos():
     categoria_id = request.args.get('categoria_id', type=int)
     preco_min = request.args.get('preco_min', type=float)
     preco_max = request.args.get('preco_max', type=float)
-    ordenacao = request.args.get('ordenacao', 'nome')  # nome, preco_asc, preco_desc, recentes, populares
+    ordenacao = request.args.get('ordenacao', 'nome')  # nome, preco_asc, preco_desc, recentes, populares, relevancia
     pagina = request.args.get('pagina', 1, type=int)
     por_pagina = request.args.get('por_pagina', 12, type=int)
+    # Paginação por cursor: ativada pela presença de ?cursor= (vazio na primeira página)
+    modo_cursor = 'cursor' in request.args
+    incluir_total = request.args.get('incluir_total', '0') in ('1', 'true')
 
     # Base query
     produtos_query = Produto.query.filter_by(ativo=True)
 
-    # Filtro de texto
+    # Filtro de texto (FTS5 quando disponível, LIKE caso contrário)
+    ranqueado = False
     if query:
-        produtos_query = produtos_query.filter(
-            or_(
-                Produto.nome.ilike(f'%{query}%'),
-                Produto.descricao.ilike(f'%{query}%')
-            )
-        )
+        produtos_query, ranqueado = filtrar_texto(produtos_query, query)
 
     # Filtro de categoria
     if categoria_id:
@@ -48,43 +58,57 @@ def buscar_produtos():
     if preco_max is not None:
         produtos_query = produtos_query.filter(Produto.preco <= preco_max)
 
-    # Ordenação
-    if ordenacao == 'preco_asc':
-        produtos_query = produtos_query.order_by(Produto.preco.asc())
-    elif ordenacao == 'preco_desc':
-        produtos_query = produtos_query.order_by(Produto.preco.desc())
-    elif ordenacao == 'recentes':
-        produtos_query = produtos_query.order_by(Produto.data_criacao.desc())
-    elif ordenacao == 'populares':
-        produtos_query = produtos_query.order_by(Produto.visualizacoes.desc())
-    else:  # nome
-        produtos_query = produtos_query.order_by(Produto.nome.asc())
-
-    # Paginação
-    total = produtos_query.count()
-    produtos = produtos_query.offset((pagina - 1) * por_pagina).limit(por_pagina).all()
-
-    # Estatísticas
-    stats = {
-        'total': total,
-        'paginas': (total + por_pagina - 1) // por_pagina,
-        'pagina_atual': pagina,
-        'por_pagina': por_pagina
-    }
+    # O total de resultados fica em cache por combinação de filtros
+    chave_contagem = f'contagem_busca:{query}:{categoria_id}:{preco_min}:{preco_max}'
+    tabelas_contagem = ('produto', 'categoria', 'produto_categoria')
 
-    # Faixas de preço disponíveis
-    precos = db.session.query(
-        func.min(Produto.preco).label('min'),
-        func.max(Produto.preco).label('max')
-    ).filter(Produto.ativo == True).first()
+    # Colunas da listagem, sem hidratar os modelos (a contagem usa a query original)
+    linhas_query = LISTAGEM_PRODUTOS.aplicar(produtos_query)
 
-    faixas_preco = {
-        'min': precos.min or 0,
-        'max': precos.max or 0
-    }
+    if modo_cursor:
+        if ordenacao not in ORDENACOES:
+            return jsonify({'error': f'Ordenação {ordenacao} não suporta paginação por cursor'}), 400
+        try:
+            produtos, proximo_cursor = paginar_por_cursor(
+                linhas_query, ordenacao, request.args.get('cursor'), por_pagina
+            )
+        except CursorInvalido as e:
+            return jsonify({'error': str(e)}), 400
+
+        stats = {
+            'por_pagina': por_pagina,
+            'proximo_cursor': proximo_cursor,
+            'tem_mais': proximo_cursor is not None
+        }
+        if incluir_total:
+            stats['total'] = cache_respostas.obter_ou_calcular(
+                chave_contagem, tabelas_contagem, produtos_query.count
+            )
+    else:
+        total = cache_respostas.obter_ou_calcular(chave_contagem, tabelas_contagem, produtos_query.count)
+
+        # Ordenação
+        if ordenacao == 'relevancia' and ranqueado:
+            linhas_query = linhas_query.order_by(ordem_relevancia(), Produto.id)
+        else:
+            linhas_query = ordenar(linhas_query, ordenacao if ordenacao in ORDENACOES else 'nome')
+
+        # Paginação
+        produtos = linhas_query.offset((pagina - 1) * por_pagina).limit(por_pagina).all()
+
+        # Estatísticas
+        stats = {
+            'total': total,
+            'paginas': (total + por_pagina - 1) // por_pagina,
+            'pagina_atual': pagina,
+            'por_pagina': por_pagina
+        }
+
+    # Faixas de preço disponíveis
+    faixas_preco = cache_respostas.obter_ou_calcular('faixas_preco', ('produto',), calcular_faixas_preco)
 
     return jsonify({
-        'produtos': [produto.to_dict() for produto in produtos],
+        'produtos': LISTAGEM_PRODUTOS.serializar_lista(produtos),
         'stats': stats,
         'faixas_preco': faixas_preco,
         'filtros_aplicados': {
@@ -96,7 +120,20 @@ def buscar_produtos():
         }
     })
 
+def calcular_faixas_preco():
+    """Menor e maior preço entre os produtos ativos"""
+    precos = db.session.query(
+        func.min(Produto.preco).label('min'),
+        func.max(Produto.preco).label('max')
+    ).filter(Produto.ativo == True).first()
+
+    return {
+        'min': precos.min or 0,
+        'max': precos.max or 0
+    }
+
 @api_busca.route('/sugestoes', methods=['GET'])
+@condicional('produto')
 def sugestoes_busca():
     """Sugestões de busca baseadas em produtos existentes"""
     query = request.args.get('q', '').strip()
@@ -105,28 +142,17 @@ def sugestoes_busca():
     if not query or len(query) < 2:
         return jsonify([])
 
-    # Buscar produtos que contenham a query
-    produtos = Produto.query.filter(
-        and_(
-            Produto.ativo == True,
-            or_(
-                Produto.nome.ilike(f'%{query}%'),
-                Produto.descricao.ilike(f'%{query}%')
-            )
-        )
-    ).limit(limite).all()
+    # Buscar produtos que contenham a query, os mais relevantes primeiro
+    produtos_query, _ = filtrar_texto(
+        Produto.query.filter(Produto.ativo == True), query, ordenar_por_relevancia=True
+    )
+    linhas = SUGESTOES_PRODUTOS.aplicar(produtos_query).limit(limite).all()
 
     sugestoes = []
-    for produto in produtos:
+    for sugestao in SUGESTOES_PRODUTOS.serializar_lista(linhas):
         # Destacar o texto encontrado
-        nome_destacado = produto.nome.replace(query, f'<mark>{query}</mark>')
-        sugestoes.append({
-            'id': produto.id,
-            'nome': produto.nome,
-            'nome_destacado': nome_destacado,
-            'preco': produto.preco,
-            'imagem': produto.imagem
-        })
+        sugestao['nome_destacado'] = sugestao['nome'].replace(query, f'<mark>{query}</mark>')
+        sugestoes.append(sugestao)
 
     return jsonify(sugestoes)
 
@@ -139,18 +165,20 @@ def autocomplete():
     if not query or len(query) < 1:
         return jsonify([])
 
-    # Buscar nomes de produtos que começam com a query
-    produtos = Produto.query.filter(
-        and_(
-            Produto.ativo == True,
-            Produto.nome.ilike(f'{query}%')
-        )
-    ).order_by(Produto.nome).limit(limite).all()
+    # Nomes de produtos que começam com a query, a partir do índice em memória
+    return jsonify(indice_autocomplete.buscar(query, limite))
 
-    resultados = [produto.nome for produto in produtos]
-    return jsonify(resultados)
+@api_busca.route('/autocomplete/verificar', methods=['GET'])
+@api_admin_required
+def verificar_autocomplete():
+    """Compara o índice de autocomplete com o banco (?corrigir=1 reconstrói)"""
+    corrigir = request.args.get('corrigir', '0') in ('1', 'true')
+    return jsonify(indice_autocomplete.verificar(corrigir=corrigir))
 
 @api_busca.route('/destaques', methods=['GET'])
+@orcamento_consultas(3)
+@condicional('produto', 'usuario', TABELA_CONTAGENS)
+@cache_respostas.resposta('produto', 'usuario', TABELA_CONTAGENS)
 def produtos_destaques():
     """Produtos em destaque"""
     produtos = Produto.query.filter_by(
@@ -158,18 +186,23 @@ def produtos_destaques():
         destaque=True
     ).order_by(Produto.data_criacao.desc()).limit(8).all()
 
-    return jsonify([produto.to_dict() for produto in produtos])
+    return jsonify(Produto.serializar_lista(produtos))
 
 @api_busca.route('/populares', methods=['GET'])
+@orcamento_consultas(4)
+@condicional('produto', 'usuario', TABELA_CONTAGENS)
+@cache_respostas.resposta('produto', 'usuario', TABELA_CONTAGENS)
 def produtos_populares():
     """Produtos mais visualizados"""
     produtos = Produto.query.filter_by(ativo=True)\
                            .order_by(Produto.visualizacoes.desc())\
                            .limit(8).all()
 
-    return jsonify([produto.to_dict() for produto in produtos])
+    return jsonify(Produto.serializar_lista(produtos))
 
 @api_busca.route('/recomendados/<int:produto_id>', methods=['GET'])
+@orcamento_consultas(5)
+@condicional('produto', 'usuario', 'produto_categoria', TABELA_CONTAGENS)
 def produtos_recomendados(produto_id):
     """Produtos recomendados baseados em um produto"""
     produto = Produto.query.get(produto_id)
@@ -190,4 +223,4 @@ def produtos_recomendados(produto_id):
         )
     ).order_by(Produto.visualizacoes.desc()).limit(4).all()
 
-    return jsonify([p.to_dict() for p in recomendados])
\ No newline at end of file
+    return jsonify(Produto.serializar_lista(recomendados))
\ No newline at end of file
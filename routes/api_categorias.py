@@ -3,16 +3,24 @@
 
 from flask import Blueprint, request, jsonify
 from extensions import db
-from models.categoria import Categoria
+from models.categoria import Categoria, produto_categoria
 from models.produto import Produto
+from services.cache import cache_respostas
+from services.condicional import condicional
+from services.contador_visualizacoes import TABELA_CONTAGENS
+from services.instrumentacao import orcamento_consultas
+from services.streaming import pedido_stream, resposta_stream, serializar_em_blocos
 
 api_categorias = Blueprint('api_categorias', __name__, url_prefix='/api/categorias')
 
 @api_categorias.route('/', methods=['GET'])
+@orcamento_consultas(4)
+@condicional('categoria', 'produto_categoria')
+@cache_respostas.resposta('categoria', 'produto_categoria')
 def get_categorias():
     """Lista todas as categorias"""
     categorias = Categoria.query.order_by(Categoria.ordem).all()
-    return jsonify([categoria.to_dict() for categoria in categorias])
+    return jsonify(Categoria.serializar_lista(categorias))
 
 @api_categorias.route('/', methods=['POST'])
 def create_categoria():
@@ -72,19 +80,32 @@ def delete_categoria(id):
     if not categoria:
         return jsonify({'error': 'Categoria não encontrada'}), 404
 
+    # Remove as associações numa instrução só; assim o ORM não precisa
+    # carregar todos os produtos da categoria para apagá-las uma a uma
+    db.session.execute(db.delete(produto_categoria).where(produto_categoria.c.categoria_id == id))
     db.session.delete(categoria)
     db.session.commit()
     return jsonify({'success': True})
 
 @api_categorias.route('/<int:id>/produtos', methods=['GET'])
+@orcamento_consultas(4)
+@condicional('categoria', 'produto_categoria', 'produto', 'usuario', TABELA_CONTAGENS)
 def get_categoria_produtos(id):
     """Lista produtos de uma categoria"""
     categoria = Categoria.query.get(id)
     if not categoria:
         return jsonify({'error': 'Categoria não encontrada'}), 404
 
+    if pedido_stream():
+        def produtos_da_categoria():
+            produtos_query = Produto.query.join(
+                produto_categoria, produto_categoria.c.produto_id == Produto.id
+            ).filter(produto_categoria.c.categoria_id == id)
+            return serializar_em_blocos(produtos_query, Produto.serializar_lista)
+        return resposta_stream(produtos_da_categoria)
+
     produtos = categoria.produtos
-    return jsonify([produto.to_dict() for produto in produtos])
+    return jsonify(Produto.serializar_lista(produtos))
 
 @api_categorias.route('/<int:categoria_id>/produtos/<int:produto_id>', methods=['POST'])
 def add_produto_categoria(categoria_id, produto_id):
@@ -97,8 +118,7 @@ def add_produto_categoria(categoria_id, produto_id):
     if not produto:
         return jsonify({'error': 'Produto não encontrado'}), 404
 
-    if produto not in categoria.produtos:
-        categoria.produtos.append(produto)
+    if Categoria.adicionar_produto(categoria_id, produto_id):
         db.session.commit()
 
     return jsonify({'success': True})
@@ -114,8 +134,7 @@ def remove_produto_categoria(categoria_id, produto_id):
     if not produto:
         return jsonify({'error': 'Produto não encontrado'}), 404
 
-    if produto in categoria.produtos:
-        categoria.produtos.remove(produto)
+    if Categoria.remover_produto(categoria_id, produto_id):
         db.session.commit()
 
     return jsonify({'success': True})
\ No newline at end of file
@@ -11,13 +11,40 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
 from models.produto import Produto
+from services.cache import cache_respostas
+from services.condicional import condicional
+from services.contador_visualizacoes import TABELA_CONTAGENS
+from services.instrumentacao import orcamento_consultas
+from services.paginacao import CursorInvalido, paginar_requisicao, pedido_paginado
+from services.projecoes import LISTAGEM_PRODUTOS
+from services.streaming import pedido_stream, resposta_stream, serializar_em_blocos
 
 api_produtos = Blueprint('api_produtos', __name__, url_prefix='/api/produtos')
 
 @api_produtos.route('/', methods=['GET'])
+@orcamento_consultas(4)
+@condicional('produto', 'usuario', TABELA_CONTAGENS)
+@cache_respostas.resposta('produto', 'usuario', TABELA_CONTAGENS)
 def get_produtos():
-    produtos = Produto.query.all()
-    return jsonify([produto.to_dict() for produto in produtos])
+    # Sem ?cursor=/?limite= mantém o formato antigo (lista completa)
+    if pedido_paginado(request.args):
+        try:
+            produtos, proximo_cursor = paginar_requisicao(LISTAGEM_PRODUTOS.aplicar(Produto.query), request.args)
+        except CursorInvalido as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'produtos': LISTAGEM_PRODUTOS.serializar_lista(produtos),
+            'proximo_cursor': proximo_cursor,
+            'tem_mais': proximo_cursor is not None
+        })
+
+    if pedido_stream():
+        return resposta_stream(lambda: serializar_em_blocos(
+            LISTAGEM_PRODUTOS.aplicar(Produto.query), LISTAGEM_PRODUTOS.serializar_lista
+        ))
+
+    produtos = LISTAGEM_PRODUTOS.aplicar(Produto.query).all()
+    return jsonify(LISTAGEM_PRODUTOS.serializar_lista(produtos))
 
 @api_produtos.route('/', methods=['POST'])
 def add_produto():
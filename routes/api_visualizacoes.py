@@ -6,11 +6,16 @@ from extensions import db
 from models.visualizacao import Visualizacao
 from models.produto import Produto
 from models.usuario import Usuario
-from utils import login_required
+from services.contador_visualizacoes import contador_visualizacoes
+from services.fila_visualizacoes import FilaCheia, fila_visualizacoes
+from utils import api_admin_required, login_required
 from datetime import datetime, timedelta
 
 api_visualizacoes = Blueprint('api_visualizacoes', __name__, url_prefix='/api/visualizacoes')
 
+# Máximo de eventos aceitos por requisição em /lote
+MAXIMO_EVENTOS_LOTE = 500
+
 @api_visualizacoes.route('/', methods=['GET'])
 @login_required
 def get_visualizacoes():
@@ -21,7 +26,7 @@ def get_visualizacoes():
                                      .order_by(Visualizacao.data_visualizacao.desc())\
                                      .limit(50).all()
 
-    return jsonify([visualizacao.to_dict() for visualizacao in visualizacoes])
+    return jsonify(Visualizacao.serializar_lista(visualizacoes))
 
 @api_visualizacoes.route('/produto/<int:produto_id>', methods=['POST'])
 @login_required
@@ -59,11 +64,10 @@ def registrar_visualizacao(produto_id):
         )
 
         db.session.add(visualizacao)
-
-        # Incrementar contador de visualizações do produto
-        produto.visualizacoes += 1
-
         db.session.commit()
+
+        # Incrementar contador de visualizações do produto (gravação adiada)
+        contador_visualizacoes.incrementar(produto_id)
         return jsonify({'success': True, 'action': 'created'})
 
 @api_visualizacoes.route('/recentes', methods=['GET'])
@@ -90,7 +94,7 @@ def get_recentes():
         .order_by(Visualizacao.data_visualizacao.desc())\
         .limit(20).all()
 
-    return jsonify([v.to_dict() for v in visualizacoes])
+    return jsonify(Visualizacao.serializar_lista(visualizacoes))
 
 @api_visualizacoes.route('/limpar', methods=['DELETE'])
 @login_required
@@ -119,4 +123,50 @@ def atualizar_tempo(produto_id):
         db.session.commit()
         return jsonify({'success': True})
 
-    return jsonify({'error': 'Visualização não encontrada'}), 404
\ No newline at end of file
+    return jsonify({'error': 'Visualização não encontrada'}), 404
+
+@api_visualizacoes.route('/lote', methods=['POST'])
+@login_required
+def registrar_lote():
+    """Recebe vários eventos de visualização/tempo e os enfileira para gravação em lote
+
+    Corpo: {"eventos": [{"produto_id": 1, "tipo": "visualizacao" | "tempo", "tempo": 5}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    eventos = data.get('eventos')
+    if not isinstance(eventos, list) or not eventos:
+        return jsonify({'error': 'eventos deve ser uma lista não vazia'}), 400
+    if len(eventos) > MAXIMO_EVENTOS_LOTE:
+        return jsonify({'error': f'Máximo de {MAXIMO_EVENTOS_LOTE} eventos por requisição'}), 400
+
+    validos = []
+    for evento in eventos:
+        if not isinstance(evento, dict):
+            continue
+        produto_id = evento.get('produto_id')
+        tipo = evento.get('tipo', 'visualizacao')
+        tempo = evento.get('tempo', 0)
+        if not isinstance(produto_id, int) or tipo not in ('visualizacao', 'tempo'):
+            continue
+        if not isinstance(tempo, int) or tempo < 0:
+            continue
+        validos.append({'produto_id': produto_id, 'tipo': tipo, 'tempo': tempo})
+
+    try:
+        fila_visualizacoes.enfileirar(session['user_id'], validos)
+    except FilaCheia:
+        resposta = jsonify({'error': 'Fila de visualizações cheia, tente novamente', 'retry_after': 5})
+        resposta.headers['Retry-After'] = '5'
+        return resposta, 503
+
+    return jsonify({
+        'success': True,
+        'aceitos': len(validos),
+        'ignorados': len(eventos) - len(validos)
+    }), 202
+
+@api_visualizacoes.route('/fila', methods=['GET'])
+@api_admin_required
+def metricas_fila():
+    """Métricas da fila de eventos de visualização (profundidade, rejeições, flushes)"""
+    return jsonify(fila_visualizacoes.metricas())
@@ -0,0 +1,140 @@
+# scripts/verificar_lotes.py
+# Verificação do lote do painel SQL (/api/admin/lote) contra cache e ETags
+#
+# Cada item do lote roda num SAVEPOINT, e o SQLAlchemy dispara os eventos de
+# commit/rollback da sessão também para eles. O script confere, num banco
+# SQLite temporário e pelo test client, que um lote atômico desfeito não deixa
+# rastro (versões das tabelas, índice do autocomplete) e que a escrita
+# seguinte muda a listagem e a ETag de /api/produtos. Também confere que as
+# edições gravam todos os campos editáveis e que um campo que não é editável
+# faz o item falhar. Termina com código 1 se alguma verificação falhar.
+#
+# Uso: python scripts/verificar_lotes.py
+
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def _nomes(resposta):
+    return {produto['nome'] for produto in resposta.get_json()}
+
+
+def _lote(cliente, operacoes, atomico=False):
+    return cliente.post('/api/admin/lote', json={'operacoes': operacoes, 'atomico': atomico}).get_json()
+
+
+def verificar():
+    arquivo = tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False)
+    arquivo.close()
+
+    # O app lê a URI na importação: aponta para o banco temporário antes
+    os.environ['DATABASE_URL'] = 'sqlite:///' + arquivo.name
+
+    import app as aplicacao
+    from app import app, db, Produto, Usuario
+    from services.autocomplete import indice_autocomplete
+    from services.fila_visualizacoes import fila_visualizacoes
+
+    app.config['TESTING'] = True
+    problemas = []
+
+    def conferir(condicao, mensagem):
+        if not condicao:
+            problemas.append(mensagem)
+
+    try:
+        aplicacao.create_db_and_add_samples()
+        with app.app_context():
+            admin = Usuario(nome='Admin', email='verificacao-lotes@example.com', senha='x', idade=30, is_admin=True)
+            db.session.add(admin)
+            db.session.commit()
+            admin_id = admin.id
+
+        cliente = app.test_client()
+        with cliente.session_transaction() as sessao:
+            sessao['user_id'] = admin_id
+
+        # Carrega o índice do autocomplete antes dos lotes
+        cliente.get('/api/busca/autocomplete?q=fa')
+        antes = cliente.get('/api/produtos')
+        etag_antes = antes.headers['ETag']
+
+        # Lote atômico com um item que falha: nada dele pode ficar
+        resumo = _lote(cliente, [
+            {'tabela': 'produto', 'acao': 'criar', 'dados': {'nome': 'Fantasma', 'preco': 1}},
+            {'tabela': 'produto', 'acao': 'excluir', 'id': 999999},
+        ], atomico=True)
+        conferir(resumo['desfeito'], 'lote atômico com falha não foi desfeito')
+        depois_lote = cliente.get('/api/produtos')
+        conferir('Fantasma' not in _nomes(depois_lote), 'produto de lote desfeito aparece na listagem')
+        sugestoes = cliente.get('/api/busca/autocomplete?q=fantasma').get_json()
+        conferir(not sugestoes, f'autocomplete sugere produto de lote desfeito: {sugestoes}')
+
+        # A escrita seguinte precisa mudar a listagem e a ETag
+        cliente.post('/api/produto', json={'nome': 'Real', 'preco': 2})
+        depois = cliente.get('/api/produtos')
+        conferir('Real' in _nomes(depois), 'produto criado depois do lote desfeito não aparece na listagem')
+        conferir(depois.headers['ETag'] != etag_antes, 'ETag não mudou depois da escrita')
+        revalidacao = cliente.get('/api/produtos', headers={'If-None-Match': etag_antes})
+        conferir(revalidacao.status_code == 200, f'ETag antiga ainda responde {revalidacao.status_code}')
+
+        # Lote parcial: o item que deu certo vale mesmo com outro falhando
+        _lote(cliente, [
+            {'tabela': 'produto', 'acao': 'criar', 'dados': {'nome': 'Parcial', 'preco': 1}},
+            {'tabela': 'produto', 'acao': 'excluir', 'id': 999999},
+        ])
+        parcial = cliente.get('/api/produtos')
+        conferir('Parcial' in _nomes(parcial), 'item aplicado de lote parcial não aparece na listagem')
+        conferir(parcial.headers['ETag'] != depois.headers['ETag'], 'ETag não mudou depois do lote parcial')
+        sugestoes = cliente.get('/api/busca/autocomplete?q=parcial').get_json()
+        conferir(sugestoes == ['Parcial'], f'autocomplete não sugere o item aplicado do lote parcial: {sugestoes}')
+
+        with app.app_context():
+            relatorio = indice_autocomplete.verificar()
+        conferir(relatorio['consistente'], f'índice do autocomplete inconsistente: {relatorio}')
+
+        # Edição do painel: todos os campos editáveis são gravados
+        with app.app_context():
+            produto_id = db.session.execute(db.select(Produto.id).filter_by(nome='Real')).scalar()
+            usuario = Usuario(nome='Comum', email='verificacao-comum@example.com', senha='x', idade=20)
+            db.session.add(usuario)
+            db.session.commit()
+            usuario_id = usuario.id
+        editaveis = cliente.get('/api/tables/produto').get_json()['editaveis']
+        conferir('visualizacoes' not in editaveis and 'ativo' in editaveis,
+                 f'campos editáveis de produto inesperados: {editaveis}')
+        resumo = _lote(cliente, [
+            {'tabela': 'produto', 'acao': 'atualizar', 'id': produto_id, 'dados': {
+                'destaque': True, 'ativo': False, 'proprietario_id': usuario_id}},
+            {'tabela': 'usuario', 'acao': 'atualizar', 'id': usuario_id, 'dados': {
+                'is_admin': True, 'foto_perfil': 'outra.png'}},
+            {'tabela': 'produto', 'acao': 'atualizar', 'id': produto_id, 'dados': {'visualizacoes': 99}},
+        ])
+        sucessos = [item['success'] for item in resumo['resultados']]
+        conferir(sucessos == [True, True, False], f'resultado das edições inesperado: {resumo["resultados"]}')
+        with app.app_context():
+            produto = db.session.get(Produto, produto_id)
+            usuario = db.session.get(Usuario, usuario_id)
+            conferir((produto.destaque, produto.ativo, produto.proprietario_id) == (True, False, usuario_id),
+                     'edição de produto não gravou destaque/ativo/proprietario_id')
+            conferir((usuario.is_admin, usuario.foto_perfil) == (True, 'outra.png'),
+                     'edição de usuário não gravou is_admin/foto_perfil')
+            conferir(produto.visualizacoes != 99, 'campo não editável foi gravado')
+    finally:
+        fila_visualizacoes.encerrar()
+        os.unlink(arquivo.name)
+
+    if problemas:
+        for problema in problemas:
+            print(f'FALHA {problema}')
+        return 1
+    print('Lotes, listagem e ETags consistentes.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(verificar())
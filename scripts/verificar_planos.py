@@ -0,0 +1,195 @@
+# scripts/verificar_planos.py
+# Verificação dos planos de consulta das rotas de busca, visualizações e avaliações
+#
+# Cria um banco SQLite temporário com o esquema completo (índices e FTS5),
+# popula alguns dados, executa cada rota de routes/api_busca.py,
+# routes/api_visualizacoes.py e routes/api_avaliacoes.py pelo test client e
+# captura todos os comandos SQL emitidos. Cada comando passa por
+# EXPLAIN QUERY PLAN; o script termina com código 1 se alguma consulta fizer
+# varredura completa de uma tabela grande (SCAN sem índice). Como o app roda
+# em TESTING, uma rota que passe do seu orçamento de consultas
+# (@orcamento_consultas, services/instrumentacao.py) também interrompe o script.
+#
+# Uso: python scripts/verificar_planos.py [-v]
+
+import os
+import re
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Tabelas que crescem com o uso e nunca devem ser varridas por inteiro
+TABELAS_QUENTES = {'produto', 'avaliacao', 'visualizacao', 'produto_categoria', 'usuario'}
+
+_VARREDURA = re.compile(r'^SCAN (\w+)(.*)$')
+
+
+def _requisicoes(produto_id, categoria_id):
+    """Rotas exercitadas, cobrindo os ramos de filtro/ordenação de cada uma.
+    {avaliacao_id} é preenchido com o id devolvido pelo POST de avaliação."""
+    busca = [
+        ('GET', '/api/busca/produtos', None),
+        ('GET', '/api/busca/produtos?q=teclado', None),
+        ('GET', '/api/busca/produtos?q=teclado&ordenacao=relevancia', None),
+        ('GET', f'/api/busca/produtos?categoria_id={categoria_id}', None),
+        ('GET', '/api/busca/produtos?preco_min=10&preco_max=500', None),
+    ]
+    for ordenacao in ('nome', 'preco_asc', 'preco_desc', 'recentes', 'populares'):
+        busca.append(('GET', f'/api/busca/produtos?ordenacao={ordenacao}&pagina=2&por_pagina=5', None))
+        busca.append(('GET', f'/api/busca/produtos?ordenacao={ordenacao}&cursor=&por_pagina=5&incluir_total=1', None))
+    busca += [
+        ('GET', '/api/busca/sugestoes?q=mouse', None),
+        ('GET', '/api/busca/autocomplete?q=mo', None),
+        ('GET', '/api/busca/destaques', None),
+        ('GET', '/api/busca/populares', None),
+        ('GET', f'/api/busca/recomendados/{produto_id}', None),
+    ]
+    visualizacoes = [
+        ('POST', f'/api/visualizacoes/produto/{produto_id}', {'tempo': 3}),
+        ('POST', f'/api/visualizacoes/produto/{produto_id}', {'tempo': 2}),
+        ('PUT', f'/api/visualizacoes/tempo/{produto_id}', {'tempo': 5}),
+        ('POST', '/api/visualizacoes/lote', {'eventos': [
+            {'produto_id': produto_id, 'tempo': 1},
+            {'produto_id': produto_id + 1, 'tipo': 'tempo', 'tempo': 4},
+        ]}),
+        ('GET', '/api/visualizacoes/', None),
+        ('GET', '/api/visualizacoes/recentes', None),
+        ('DELETE', '/api/visualizacoes/limpar', None),
+    ]
+    avaliacoes = [
+        ('GET', f'/api/avaliacoes/produto/{produto_id}', None),
+        ('POST', '/api/avaliacoes/', {'produto_id': produto_id + 2, 'nota': 4, 'comentario': 'Bom'}),
+        ('PUT', '/api/avaliacoes/{avaliacao_id}', {'nota': 2}),
+        ('POST', '/api/avaliacoes/{avaliacao_id}/util', None),
+        ('DELETE', '/api/avaliacoes/{avaliacao_id}', None),
+    ]
+    return busca, visualizacoes, avaliacoes
+
+
+def _popular(db, modelos, quantidade=60):
+    Produto, Usuario, Categoria, Avaliacao, Visualizacao = modelos
+    usuarios = [
+        Usuario(nome=f'Usuário {i}', email=f'usuario{i}@example.com', senha='x', idade=30, is_admin=(i == 0))
+        for i in range(5)
+    ]
+    categorias = [Categoria(nome=f'Categoria {i}', ordem=i) for i in range(3)]
+    db.session.add_all(usuarios + categorias)
+    db.session.flush()
+
+    nomes = ['Teclado', 'Mouse', 'Monitor', 'Headset', 'Cadeira']
+    produtos = []
+    for i in range(quantidade):
+        produto = Produto(
+            nome=f'{nomes[i % len(nomes)]} {i}', preco=10.0 + i * 7, descricao=f'Descrição do item {i}',
+            proprietario_id=usuarios[i % len(usuarios)].id, destaque=(i % 4 == 0), visualizacoes=i
+        )
+        produto.categorias.append(categorias[i % len(categorias)])
+        produtos.append(produto)
+    db.session.add_all(produtos)
+    db.session.flush()
+
+    for i, produto in enumerate(produtos[:20]):
+        for usuario in usuarios[1:]:
+            db.session.add(Avaliacao(produto_id=produto.id, usuario_id=usuario.id, nota=(i % 5) + 1))
+            db.session.add(Visualizacao(usuario_id=usuario.id, produto_id=produto.id))
+    db.session.commit()
+    return usuarios[0].id, produtos[0].id, categorias[0].id
+
+
+def verificar(verbose=False):
+    arquivo = tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False)
+    arquivo.close()
+
+    # O app lê a URI na importação: aponta para o banco temporário antes
+    os.environ['DATABASE_URL'] = 'sqlite:///' + arquivo.name
+
+    import app as aplicacao
+    from app import app, db, Produto, Usuario, Categoria, Avaliacao, Visualizacao
+    from sqlalchemy import event
+    from services.fila_visualizacoes import fila_visualizacoes
+    from services.contador_visualizacoes import contador_visualizacoes
+
+    app.config['TESTING'] = True
+    # Respostas em cache não chegam ao banco; todas as consultas devem ser analisadas
+    app.config['CACHE_HABILITADO'] = False
+    capturadas = []
+    rota_atual = [None]
+
+    try:
+        aplicacao.create_db_and_add_samples()
+        with app.app_context():
+            admin_id, produto_id, categoria_id = _popular(
+                db, (Produto, Usuario, Categoria, Avaliacao, Visualizacao)
+            )
+
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def capturar(conn, cursor, statement, parameters, context, executemany):
+                if rota_atual[0] is not None:
+                    if executemany:
+                        parameters = parameters[0] if parameters else ()
+                    capturadas.append((rota_atual[0], statement, parameters))
+
+        cliente = app.test_client()
+        with cliente.session_transaction() as sessao:
+            sessao['user_id'] = admin_id
+
+        contexto = {}
+        for grupo in _requisicoes(produto_id, categoria_id):
+            for metodo, url, corpo in grupo:
+                url = url.format(**contexto)
+                rota_atual[0] = f'{metodo} {url}'
+                resposta = cliente.open(url, method=metodo, json=corpo)
+                if resposta.status_code >= 400:
+                    print(f'AVISO {rota_atual[0]} respondeu {resposta.status_code}')
+                elif url == '/api/avaliacoes/' and metodo == 'POST':
+                    contexto['avaliacao_id'] = resposta.get_json()['id']
+                if url.startswith('/api/visualizacoes/lote'):
+                    rota_atual[0] = 'flush da fila de visualizações'
+                    fila_visualizacoes.flush()
+        rota_atual[0] = 'flush do contador de visualizações'
+        contador_visualizacoes.flush()
+        rota_atual[0] = None
+
+        problemas = []
+        with app.app_context():
+            conexao = db.engine.raw_connection()
+            try:
+                cursor = conexao.cursor()
+                for rota, statement, parametros in capturadas:
+                    comando = statement.lstrip().split(None, 1)[0].upper()
+                    if comando not in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+                        continue
+                    cursor.execute('EXPLAIN QUERY PLAN ' + statement, parametros)
+                    detalhes = [linha[3] for linha in cursor.fetchall()]
+                    varreduras = []
+                    for detalhe in detalhes:
+                        encontrado = _VARREDURA.match(detalhe)
+                        if encontrado and encontrado.group(1) in TABELAS_QUENTES and 'USING' not in encontrado.group(2):
+                            varreduras.append(detalhe)
+                    if verbose:
+                        print(f'{rota}\n  {" ".join(statement.split())[:160]}')
+                        for detalhe in detalhes:
+                            print(f'    {detalhe}')
+                    if varreduras:
+                        problemas.append((rota, statement, varreduras))
+            finally:
+                conexao.close()
+    finally:
+        fila_visualizacoes.encerrar()
+        contador_visualizacoes.encerrar()
+        os.unlink(arquivo.name)
+
+    print(f'{len(capturadas)} comandos SQL analisados.')
+    for rota, statement, varreduras in problemas:
+        print(f'\nVARREDURA COMPLETA em {rota}:\n  {" ".join(statement.split())}')
+        for detalhe in varreduras:
+            print(f'    {detalhe}')
+    if not problemas:
+        print('Nenhuma consulta quente faz varredura completa.')
+    return not problemas
+
+
+if __name__ == '__main__':
+    sys.exit(0 if verificar(verbose='-v' in sys.argv) else 1)
@@ -0,0 +1,101 @@
+# scripts/verificar_revalidacao.py
+# Verificação das revalidações (If-None-Match -> 304) com compressão
+#
+# Cria um banco SQLite temporário e, pelo test client, confere que o cliente
+# consegue revalidar tanto os assets pré-comprimidos (services/assets.py, ETag
+# terminada em "-gzip") quanto as respostas comprimidas pelo middleware
+# (services/compressao.py, ETag terminada em ":gzip"), com e sem
+# Accept-Encoding. O script termina com código 1 se alguma revalidação não
+# responder 304.
+#
+# Uso: python scripts/verificar_revalidacao.py
+
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+GZIP = {'Accept-Encoding': 'gzip'}
+SEM_COMPRESSAO = {'Accept-Encoding': 'identity'}
+
+# Asset de texto grande o bastante para ganhar a versão .gz
+ASSET = 'js/sql.js'
+
+
+def _popular(db, Produto, Usuario, quantidade=60):
+    usuario = Usuario(nome='Usuário', email='usuario@example.com', senha='x', idade=30)
+    db.session.add(usuario)
+    db.session.flush()
+    db.session.add_all([
+        Produto(nome=f'Produto {i}', preco=10.0 + i, descricao=f'Descrição do item {i}',
+                proprietario_id=usuario.id)
+        for i in range(quantidade)
+    ])
+    db.session.commit()
+
+
+def _revalidar(cliente, url, cabecalhos, sufixo):
+    """Lista de problemas ao baixar `url` e revalidar com a ETag recebida"""
+    resposta = cliente.get(url, headers=cabecalhos)
+    etag = resposta.headers.get('ETag')
+    if resposta.status_code != 200 or not etag:
+        return [f'{url} {cabecalhos}: esperado 200 com ETag, veio {resposta.status_code} ETag={etag}']
+    problemas = []
+    if sufixo and not etag.endswith(f'{sufixo}"'):
+        problemas.append(f'{url} {cabecalhos}: ETag {etag} sem o sufixo {sufixo}')
+    revalidacao = cliente.get(url, headers={**cabecalhos, 'If-None-Match': etag})
+    if revalidacao.status_code != 304:
+        problemas.append(f'{url} {cabecalhos}: revalidação com {etag} respondeu {revalidacao.status_code}')
+    elif revalidacao.headers.get('ETag') != etag:
+        problemas.append(f'{url} {cabecalhos}: 304 com ETag {revalidacao.headers.get("ETag")}, esperado {etag}')
+    return problemas
+
+
+def verificar():
+    arquivo = tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False)
+    arquivo.close()
+
+    # O app lê a URI na importação: aponta para o banco temporário antes
+    os.environ['DATABASE_URL'] = 'sqlite:///' + arquivo.name
+
+    import app as aplicacao
+    from app import app, db, Produto, Usuario
+    from services.assets import manifesto_assets
+    from services.fila_visualizacoes import fila_visualizacoes
+
+    app.config['TESTING'] = True
+
+    try:
+        aplicacao.create_db_and_add_samples()
+        with app.app_context():
+            _popular(db, Produto, Usuario)
+        with app.test_request_context():
+            url_asset = manifesto_assets.url(ASSET)
+
+        cliente = app.test_client()
+        verificacoes = [
+            (url_asset, GZIP, '-gzip'),              # .gz pré-comprimido
+            (url_asset, SEM_COMPRESSAO, None),
+            ('/api/produtos', GZIP, ':gzip'),        # comprimido pelo middleware
+            ('/api/produtos', SEM_COMPRESSAO, None),
+        ]
+        problemas = []
+        for url, cabecalhos, sufixo in verificacoes:
+            problemas += _revalidar(cliente, url, cabecalhos, sufixo)
+    finally:
+        fila_visualizacoes.encerrar()
+        os.unlink(arquivo.name)
+
+    print(f'{len(verificacoes)} revalidações verificadas.')
+    if problemas:
+        for problema in problemas:
+            print(f'FALHA {problema}')
+        return 1
+    print('Todas as revalidações responderam 304.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(verificar())
@@ -0,0 +1,225 @@
+# services/assets.py
+# Arquivos estáticos com URL versionada pelo conteúdo e pré-compressão
+#
+# asset_url('css/styles.css') (disponível nos templates) devolve
+# /static/css/styles.<hash>.css, em que <hash> vem do conteúdo do arquivo. Como
+# a URL muda sempre que o arquivo muda, ela é servida com
+# "Cache-Control: immutable" e um max-age longo: o navegador não revalida mais
+# CSS, JS e imagens a cada página.
+#
+# Na inicialização (ou com `flask --app app compilar-assets`) os arquivos das
+# pastas de ASSETS_PASTAS são indexados e os de texto ganham versões gzip (e
+# brotli, se o pacote estiver instalado) gravadas em instance/assets. A view
+# `static` escolhe a versão pré-comprimida pelo Accept-Encoding. Arquivos fora
+# dessas pastas são indexados na primeira vez que aparecem num template.
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+from flask import request, send_file, url_for
+from werkzeug.security import safe_join
+from services.imagens import nome_por_conteudo
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+TAMANHO_FINGERPRINT = 12
+COMPRESSIVEIS = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.html')
+_BLOCO_LEITURA = 64 * 1024
+
+# nome.<fingerprint>.ext
+_VERSIONADO = re.compile(r'^(?P<base>.+)\.[0-9a-f]{%d}(?P<ext>\.[^./]+)$' % TAMANHO_FINGERPRINT)
+
+
+def _sha256(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(_BLOCO_LEITURA), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _nome_versionado(nome, fingerprint):
+    base, ext = os.path.splitext(nome)
+    return f'{base}.{fingerprint}{ext}'
+
+
+class Asset:
+    __slots__ = ('nome', 'versionado', 'sha', 'assinatura', 'codificacoes')
+
+    def __init__(self, nome, versionado, sha, assinatura, codificacoes):
+        self.nome = nome
+        self.versionado = versionado
+        self.sha = sha
+        self.assinatura = assinatura      # (mtime, tamanho) quando foi indexado
+        self.codificacoes = codificacoes  # {'br': caminho, 'gzip': caminho}
+
+
+class ManifestoAssets:
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._assets = {}      # nome original -> Asset
+        self._versionados = {}  # nome versionado -> Asset
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_VERSIONADOS', True)
+        app.config.setdefault('ASSETS_PASTAS', ('css', 'js', 'img'))
+        app.config.setdefault('ASSETS_MAX_IDADE', 365 * 24 * 3600)  # segundos
+        app.config.setdefault('ASSETS_COMPRESSAO_MINIMA', 512)      # bytes
+        app.config.setdefault('ASSETS_COMPILAR_NA_INICIALIZACAO', True)
+        app.extensions['assets'] = self
+        self.app = app
+
+        app.jinja_env.globals['asset_url'] = self.url
+        self._servir_padrao = app.view_functions['static']
+        app.view_functions['static'] = self.servir
+
+        if app.config['ASSETS_VERSIONADOS'] and app.config['ASSETS_COMPILAR_NA_INICIALIZACAO']:
+            try:
+                self.compilar()
+            except OSError as e:
+                app.logger.warning(f'Falha ao pré-processar os arquivos estáticos: {e}')
+
+    # Índice -------------------------------------------------------------------
+
+    def _pasta_compressao(self):
+        pasta = os.path.join(self.app.instance_path, 'assets')
+        os.makedirs(pasta, exist_ok=True)
+        return pasta
+
+    def _comprimir(self, caminho, sha, tamanho):
+        _, ext = os.path.splitext(caminho)
+        if ext.lower() not in COMPRESSIVEIS or tamanho < self.app.config['ASSETS_COMPRESSAO_MINIMA']:
+            return {}
+
+        pasta = self._pasta_compressao()
+        codificacoes = {}
+        compressores = [('gzip', '.gz', lambda dados: gzip.compress(dados, 9, mtime=0))]
+        if brotli is not None:
+            compressores.insert(0, ('br', '.br', lambda dados: brotli.compress(dados, quality=11)))
+
+        dados = None
+        for codificacao, sufixo, comprimir in compressores:
+            # Nome pelo hash do conteúdo: vale entre reinícios e deploys
+            destino = os.path.join(pasta, sha + sufixo)
+            if not os.path.exists(destino):
+                if dados is None:
+                    with open(caminho, 'rb') as arquivo:
+                        dados = arquivo.read()
+                comprimido = comprimir(dados)
+                if len(comprimido) >= tamanho:
+                    continue
+                temporario = f'{destino}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(temporario, 'wb') as arquivo:
+                    arquivo.write(comprimido)
+                os.replace(temporario, destino)
+            codificacoes[codificacao] = destino
+        return codificacoes
+
+    def _indexar(self, nome):
+        """Asset atualizado de `nome` (relativo a static/), ou None se não existe"""
+        caminho = safe_join(self.app.static_folder, nome)
+        try:
+            info = os.stat(caminho)
+        except (OSError, TypeError):
+            return None
+        if not stat.S_ISREG(info.st_mode):
+            return None
+        assinatura = (info.st_mtime_ns, info.st_size)
+
+        atual = self._assets.get(nome)
+        if atual is not None and atual.assinatura == assinatura:
+            return atual
+
+        sha = _sha256(caminho)
+        asset = Asset(
+            nome, _nome_versionado(nome, sha[:TAMANHO_FINGERPRINT]), sha, assinatura,
+            self._comprimir(caminho, sha, info.st_size)
+        )
+        with self._lock:
+            if atual is not None:
+                self._versionados.pop(atual.versionado, None)
+            self._assets[nome] = asset
+            self._versionados[asset.versionado] = asset
+        return asset
+
+    def compilar(self):
+        """Indexa e pré-comprime os arquivos de ASSETS_PASTAS; retorna o
+        resumo (arquivos e versões comprimidas)"""
+        resumo = {'arquivos': 0, 'comprimidos': 0}
+        for pasta in self.app.config['ASSETS_PASTAS']:
+            raiz = os.path.join(self.app.static_folder, pasta)
+            for diretorio, _, arquivos in os.walk(raiz):
+                for nome_arquivo in arquivos:
+                    relativo = os.path.relpath(os.path.join(diretorio, nome_arquivo), self.app.static_folder)
+                    asset = self._indexar(relativo.replace(os.sep, '/'))
+                    if asset is not None:
+                        resumo['arquivos'] += 1
+                        resumo['comprimidos'] += len(asset.codificacoes)
+        return resumo
+
+    # Templates ----------------------------------------------------------------
+
+    def _da_aplicacao(self, nome):
+        """Indica se o arquivo está em ASSETS_PASTAS (distribuído com a
+        aplicação). Uploads (pic/, images/) ficam fora do manifesto: cada foto
+        enviada viraria uma entrada nova, sem limite."""
+        return nome.replace('\\', '/').split('/', 1)[0] in self.app.config['ASSETS_PASTAS']
+
+    def url(self, nome):
+        """URL versionada de um arquivo de static/ (a URL normal se o
+        arquivo não existe, não é da aplicação ou o versionamento está
+        desligado)"""
+        if (self.app.config['ASSETS_VERSIONADOS'] and self._da_aplicacao(nome)
+                and not nome_por_conteudo(nome)):
+            asset = self._indexar(nome)
+            if asset is not None:
+                return url_for('static', filename=asset.versionado)
+        return url_for('static', filename=nome)
+
+    # View ---------------------------------------------------------------------
+
+    def _codificacao(self, asset):
+        for codificacao in ('br', 'gzip'):
+            caminho = asset.codificacoes.get(codificacao)
+            if caminho and request.accept_encodings[codificacao] and os.path.exists(caminho):
+                return codificacao, caminho
+        return None, os.path.join(self.app.static_folder, asset.nome)
+
+    def servir(self, filename):
+        asset = self._versionados.get(filename)
+        if asset is None:
+            # Versão antiga de um arquivo que mudou: entrega o atual, sem
+            # cache imutável (a URL antiga não garante mais o conteúdo)
+            antigo = _VERSIONADO.match(filename)
+            if antigo and not os.path.exists(os.path.join(self.app.static_folder, filename)):
+                return self._servir_padrao(filename=antigo.group('base') + antigo.group('ext'))
+            return self._servir_padrao(filename=filename)
+
+        codificacao, caminho = self._codificacao(asset)
+        resposta = send_file(
+            caminho,
+            mimetype=mimetypes.guess_type(asset.nome)[0] or 'application/octet-stream',
+            conditional=True,
+            etag=asset.sha[:TAMANHO_FINGERPRINT] + ('-' + codificacao if codificacao else ''),
+            max_age=self.app.config['ASSETS_MAX_IDADE'],
+        )
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+        if asset.codificacoes:
+            resposta.vary.add('Accept-Encoding')
+        resposta.cache_control.public = True
+        resposta.cache_control.immutable = True
+        return resposta
+
+
+manifesto_assets = ManifestoAssets()
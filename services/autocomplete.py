@@ -0,0 +1,195 @@
+# services/autocomplete.py
+# Índice em memória para o autocomplete de nomes de produtos
+#
+# Mantém uma lista ordenada de (chave normalizada, nome, id) dos produtos
+# ativos e responde consultas por prefixo com busca binária, sem tocar no
+# banco. O índice é carregado na inicialização e atualizado de forma
+# incremental a cada commit que cria, renomeia, desativa ou remove produtos.
+# Escritas de outros processos (outro worker, importar-produtos na CLI) não
+# passam pela sessão deste: quando a versão compartilhada de produto muda por
+# fora (services/versoes_tabelas.py), o índice é recarregado na próxima
+# consulta.
+
+import bisect
+import threading
+import unicodedata
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from extensions import db
+from services.versoes_tabelas import versoes_tabelas
+
+
+def normalizar(texto):
+    """Remove acentos e diferenças de caixa ("Ação" -> "acao")"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().strip()
+
+
+class IndiceAutocomplete:
+    def __init__(self, app=None):
+        self._lock = threading.RLock()
+        self._entradas = []   # lista ordenada de (chave, nome, id)
+        self._por_id = {}     # id -> (chave, nome)
+        self._carregado = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['autocomplete'] = self
+        self._registrar_eventos()
+        versoes_tabelas.ao_alterar_externo(self._alteracao_externa)
+
+    # Consultas -------------------------------------------------------------
+
+    def buscar(self, prefixo, limite=10):
+        """Retorna até `limite` nomes cujo início corresponde ao prefixo"""
+        chave = normalizar(prefixo)
+        if not chave:
+            return []
+        self._garantir_carregado()
+        with self._lock:
+            resultados = []
+            i = bisect.bisect_left(self._entradas, (chave,))
+            while i < len(self._entradas) and len(resultados) < limite:
+                entrada_chave, nome, _ = self._entradas[i]
+                if not entrada_chave.startswith(chave):
+                    break
+                resultados.append(nome)
+                i += 1
+            return resultados
+
+    def __len__(self):
+        return len(self._por_id)
+
+    # Manutenção ------------------------------------------------------------
+
+    def reconstruir(self):
+        """Recarrega o índice inteiro a partir do banco"""
+        from models.produto import Produto
+
+        linhas = db.session.query(Produto.id, Produto.nome).filter(Produto.ativo == True).all()
+        por_id = {id: (normalizar(nome), nome) for id, nome in linhas}
+        entradas = sorted((chave, nome, id) for id, (chave, nome) in por_id.items())
+        with self._lock:
+            self._entradas = entradas
+            self._por_id = por_id
+            self._carregado = True
+
+    def atualizar(self, produto_id, nome, ativo):
+        """Insere, renomeia ou remove (se inativo) um produto do índice"""
+        with self._lock:
+            self.remover(produto_id)
+            if ativo and nome:
+                chave = normalizar(nome)
+                bisect.insort(self._entradas, (chave, nome, produto_id))
+                self._por_id[produto_id] = (chave, nome)
+
+    def remover(self, produto_id):
+        with self._lock:
+            atual = self._por_id.pop(produto_id, None)
+            if atual is None:
+                return
+            chave, nome = atual
+            i = bisect.bisect_left(self._entradas, (chave, nome, produto_id))
+            if i < len(self._entradas) and self._entradas[i][2] == produto_id:
+                del self._entradas[i]
+
+    def verificar(self, corrigir=False):
+        """Compara o índice com o banco e retorna as divergências encontradas.
+
+        Com `corrigir=True` o índice é reconstruído quando houver divergência.
+        """
+        from models.produto import Produto
+
+        self._garantir_carregado()
+        no_banco = dict(db.session.query(Produto.id, Produto.nome).filter(Produto.ativo == True).all())
+        with self._lock:
+            no_indice = {id: nome for id, (_, nome) in self._por_id.items()}
+
+        faltando = sorted(set(no_banco) - set(no_indice))
+        sobrando = sorted(set(no_indice) - set(no_banco))
+        desatualizados = sorted(
+            id for id in set(no_banco) & set(no_indice) if no_banco[id] != no_indice[id]
+        )
+        consistente = not (faltando or sobrando or desatualizados)
+        if corrigir and not consistente:
+            self.reconstruir()
+
+        return {
+            'consistente': consistente,
+            'total_banco': len(no_banco),
+            'total_indice': len(no_indice),
+            'faltando': faltando,
+            'sobrando': sobrando,
+            'desatualizados': desatualizados,
+            'corrigido': corrigir and not consistente
+        }
+
+    def _garantir_carregado(self):
+        versoes_tabelas.sincronizar()
+        if not self._carregado:
+            self.reconstruir()
+
+    def _alteracao_externa(self, tabelas):
+        if 'produto' in tabelas:
+            self._carregado = False  # recarregado na próxima consulta
+
+    # Sincronização com o ORM -----------------------------------------------
+
+    def _registrar_eventos(self):
+        from models.produto import Produto
+
+        def pendentes(session):
+            return session.info.setdefault('autocomplete_pendentes', [])
+
+        @event.listens_for(Produto, 'after_insert')
+        @event.listens_for(Produto, 'after_update')
+        def produto_gravado(mapper, connection, target):
+            sess = object_session(target)
+            if sess is not None:
+                pendentes(sess).append((target.id, target.nome, bool(target.ativo)))
+
+        @event.listens_for(Produto, 'after_delete')
+        def produto_removido(mapper, connection, target):
+            sess = object_session(target)
+            if sess is not None:
+                pendentes(sess).append((target.id, None, False))
+
+        def savepoints(session):
+            return session.info.setdefault('autocomplete_savepoints', {})
+
+        @event.listens_for(db.session, 'after_transaction_create')
+        def abrir_savepoint(session, transaction):
+            if transaction.nested:
+                savepoints(session)[transaction] = len(pendentes(session))
+
+        # Um SAVEPOINT desfeito (item de lote com erro) descarta só o que foi
+        # registrado dentro dele
+        @event.listens_for(db.session, 'after_soft_rollback')
+        def desfazer_savepoint(session, transacao_anterior):
+            if transacao_anterior.nested:
+                inicio = savepoints(session).pop(transacao_anterior, None)
+                if inicio is not None:
+                    del pendentes(session)[inicio:]
+
+        # As alterações só entram no índice depois do commit da transação
+        # externa (after_commit também dispara ao liberar um SAVEPOINT)
+        @event.listens_for(db.session, 'after_commit')
+        def aplicar(session):
+            if session.in_nested_transaction():
+                return
+            session.info.pop('autocomplete_savepoints', None)
+            if not self._carregado:
+                session.info.pop('autocomplete_pendentes', None)
+                return
+            for produto_id, nome, ativo in session.info.pop('autocomplete_pendentes', []):
+                self.atualizar(produto_id, nome, ativo)
+
+        @event.listens_for(db.session, 'after_rollback')
+        def descartar(session):
+            if session.in_nested_transaction():
+                return
+            session.info.pop('autocomplete_savepoints', None)
+            session.info.pop('autocomplete_pendentes', None)
+
+indice_autocomplete = IndiceAutocomplete()
@@ -0,0 +1,126 @@
+# services/busca_texto.py
+# Índice de texto completo (SQLite FTS5) para a busca de produtos
+#
+# A tabela virtual produto_fts usa o próprio produto como conteúdo externo e é
+# mantida por triggers, então qualquer escrita (ORM, SQL direto ou em lote)
+# fica sincronizada. O tokenizer unicode61 com remove_diacritics ignora
+# acentos: "acao" encontra "Ação". Quando o FTS5 não está disponível as rotas
+# continuam usando o LIKE.
+
+import re
+from extensions import db
+from sqlalchemy.exc import OperationalError
+
+FTS_TABELA = 'produto_fts'
+
+# Peso das colunas no bm25: nome vale mais que descrição
+PESO_NOME = 10.0
+PESO_DESCRICAO = 1.0
+
+_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABELA} USING fts5(
+        nome, descricao,
+        content='produto', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABELA}_ai AFTER INSERT ON produto BEGIN
+        INSERT INTO {FTS_TABELA}(rowid, nome, descricao) VALUES (new.id, new.nome, new.descricao);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABELA}_ad AFTER DELETE ON produto BEGIN
+        INSERT INTO {FTS_TABELA}({FTS_TABELA}, rowid, nome, descricao) VALUES ('delete', old.id, old.nome, old.descricao);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABELA}_au AFTER UPDATE OF nome, descricao ON produto BEGIN
+        INSERT INTO {FTS_TABELA}({FTS_TABELA}, rowid, nome, descricao) VALUES ('delete', old.id, old.nome, old.descricao);
+        INSERT INTO {FTS_TABELA}(rowid, nome, descricao) VALUES (new.id, new.nome, new.descricao);
+    END""",
+]
+
+# Cache de disponibilidade por URL do banco
+_disponivel = {}
+
+# Tabela "solta" (fora do metadata, ignorada pelo create_all) para montar consultas
+produto_fts = db.table(FTS_TABELA, db.column('rowid'))
+
+
+def criar_indice_fts(reconstruir=False):
+    """Cria a tabela FTS5 e os triggers de sincronização, se possível.
+
+    Popula o índice quando ele é criado agora (ou quando `reconstruir=True`).
+    Retorna True se o índice está disponível.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        _disponivel[str(db.engine.url)] = False
+        return False
+
+    try:
+        with db.engine.begin() as conn:
+            existia = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABELA,)
+            ).first() is not None
+            for ddl in _DDL:
+                conn.exec_driver_sql(ddl)
+            if reconstruir or not existia:
+                conn.exec_driver_sql(f"INSERT INTO {FTS_TABELA}({FTS_TABELA}) VALUES ('rebuild')")
+    except OperationalError:
+        # SQLite compilado sem FTS5
+        _disponivel[str(db.engine.url)] = False
+        return False
+
+    _disponivel[str(db.engine.url)] = True
+    return True
+
+
+def fts_disponivel():
+    """Indica se o índice FTS5 existe no banco atual"""
+    chave = str(db.engine.url)
+    if chave not in _disponivel:
+        if db.engine.dialect.name != 'sqlite':
+            _disponivel[chave] = False
+        else:
+            with db.engine.connect() as conn:
+                _disponivel[chave] = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABELA,)
+                ).first() is not None
+    return _disponivel[chave]
+
+
+def expressao_fts(texto):
+    """Converte o texto digitado numa expressão MATCH segura.
+
+    Cada palavra vira um termo entre aspas com busca por prefixo, combinados
+    com AND implícito. Retorna None se não houver palavras.
+    """
+    termos = re.findall(r'\w+', texto, flags=re.UNICODE)
+    if not termos:
+        return None
+    return ' '.join('"' + termo.replace('"', '""') + '"*' for termo in termos)
+
+
+def filtrar_texto(produtos_query, texto, ordenar_por_relevancia=False):
+    """Aplica o filtro de texto a uma query de Produto.
+
+    Usa o índice FTS5 quando disponível (opcionalmente ordenando por bm25) e
+    cai para o LIKE em nome/descrição caso contrário. Retorna (query, usou_fts).
+    """
+    from models.produto import Produto
+
+    expressao = expressao_fts(texto)
+    if expressao is None or not fts_disponivel():
+        return produtos_query.filter(
+            db.or_(
+                Produto.nome.ilike(f'%{texto}%'),
+                Produto.descricao.ilike(f'%{texto}%')
+            )
+        ), False
+
+    produtos_query = produtos_query.join(produto_fts, produto_fts.c.rowid == Produto.id)\
+                                   .filter(db.literal_column(FTS_TABELA).op('MATCH')(expressao))
+    if ordenar_por_relevancia:
+        produtos_query = produtos_query.order_by(ordem_relevancia())
+    return produtos_query, True
+
+
+def ordem_relevancia():
+    """Expressão de ordenação por bm25 (menor = mais relevante); só é válida
+    em queries já filtradas por filtrar_texto com FTS"""
+    return db.func.bm25(db.literal_column(FTS_TABELA), PESO_NOME, PESO_DESCRICAO)
@@ -0,0 +1,193 @@
+# services/cache.py
+# Cache de respostas para endpoints de catálogo (muita leitura, pouca escrita)
+#
+# As chaves combinam endpoint, argumentos normalizados da query string e a
+# "geração" de cada tabela da qual a resposta depende. Um commit que altera a
+# tabela incrementa a geração (via services/versoes_tabelas.py), então as
+# entradas antigas deixam de ser encontradas e saem pelo LRU/TTL. As gerações
+# ficam no próprio backend: com um backend compartilhado entre processos a
+# invalidação vale para todos. Com o LRU em memória, escritas de outros
+# processos chegam pelas versões gravadas no banco, relidas antes de cada
+# consulta ao cache (no máximo a cada VERSOES_INTERVALO segundos).
+#
+# O backend padrão é um LRU com TTL em memória; outro armazenamento pode ser
+# usado implementando BackendCache e definindo CACHE_BACKEND.
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, request, make_response
+from services.versoes_tabelas import versoes_tabelas
+
+
+class BackendCache:
+    """Interface mínima de armazenamento do cache"""
+
+    def obter(self, chave):
+        """Valor armazenado ou None"""
+        raise NotImplementedError
+
+    def definir(self, chave, valor, ttl):
+        raise NotImplementedError
+
+    def incrementar(self, chave):
+        """Incrementa um contador inteiro (sem expiração) e retorna o novo valor"""
+        raise NotImplementedError
+
+    def obter_contador(self, chave):
+        """Valor atual de um contador criado por incrementar (0 se não existir)"""
+        return self.obter(chave) or 0
+
+    def limpar(self):
+        raise NotImplementedError
+
+
+class CacheMemoria(BackendCache):
+    """LRU com TTL por entrada, local ao processo"""
+
+    def __init__(self, max_itens=1024):
+        self.max_itens = max_itens
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()
+        self._contadores = {}
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def definir(self, chave, valor, ttl):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def incrementar(self, chave):
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + 1
+            return self._contadores[chave]
+
+    def obter_contador(self, chave):
+        with self._lock:
+            return self._contadores.get(chave, 0)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class CacheRespostas:
+    def __init__(self, app=None):
+        self.app = None
+        self.backend = None
+        self._lock = threading.Lock()
+        self._metricas = {'hits': 0, 'misses': 0, 'armazenados': 0, 'invalidacoes': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_HABILITADO', True)
+        app.config.setdefault('CACHE_TTL', 60)          # segundos
+        app.config.setdefault('CACHE_MAX_ITENS', 1024)
+        app.config.setdefault('CACHE_BACKEND', None)    # instância de BackendCache
+        self.app = app
+        self.backend = app.config['CACHE_BACKEND'] or CacheMemoria(app.config['CACHE_MAX_ITENS'])
+        app.extensions['cache_respostas'] = self
+        versoes_tabelas.ao_alterar(self.invalidar)
+
+    # Invalidação -------------------------------------------------------------
+
+    def invalidar(self, tabelas):
+        """Descarta (logicamente) tudo o que depende das tabelas dadas"""
+        for tabela in tabelas:
+            self.backend.incrementar(f'geracao:{tabela}')
+        self._contar('invalidacoes', len(tabelas))
+
+    def limpar(self):
+        self.backend.limpar()
+
+    def _geracoes(self, tabelas):
+        versoes_tabelas.sincronizar()
+        return '.'.join(str(self.backend.obter_contador(f'geracao:{t}')) for t in tabelas)
+
+    # Uso ---------------------------------------------------------------------
+
+    def obter_ou_calcular(self, chave, tabelas, calcular, ttl=None):
+        """Valor em cache para `chave` ou o resultado de `calcular()`"""
+        if not self.app.config['CACHE_HABILITADO']:
+            return calcular()
+
+        chave_completa = f'valor:{chave}:{self._geracoes(tabelas)}'
+        valor = self.backend.obter(chave_completa)
+        if valor is not None:
+            self._contar('hits')
+            return valor
+
+        self._contar('misses')
+        valor = calcular()
+        self.backend.definir(chave_completa, valor, ttl or self.app.config['CACHE_TTL'])
+        self._contar('armazenados')
+        return valor
+
+    def resposta(self, *tabelas, ttl=None):
+        """Decorador: guarda respostas 200 da view, por endpoint e argumentos"""
+        def decorador(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.app.config['CACHE_HABILITADO'] or request.method != 'GET':
+                    return view(*args, **kwargs)
+
+                argumentos = '&'.join(
+                    f'{k}={v}' for k, v in sorted(request.args.items(multi=True))
+                )
+                rota = '&'.join(f'{k}={v}' for k, v in sorted(kwargs.items()))
+                chave = f'resposta:{request.endpoint}:{rota}?{argumentos}:{self._geracoes(tabelas)}'
+
+                armazenada = self.backend.obter(chave)
+                if armazenada is not None:
+                    self._contar('hits')
+                    corpo, status, mimetype = armazenada
+                    return Response(corpo, status=status, mimetype=mimetype)
+
+                self._contar('misses')
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code == 200 and not resposta.is_streamed:
+                    self.backend.definir(
+                        chave,
+                        (resposta.get_data(), resposta.status_code, resposta.mimetype),
+                        ttl or self.app.config['CACHE_TTL']
+                    )
+                    self._contar('armazenados')
+                return resposta
+            return wrapper
+        return decorador
+
+    # Métricas ----------------------------------------------------------------
+
+    def _contar(self, nome, quantidade=1):
+        with self._lock:
+            self._metricas[nome] += quantidade
+
+    def metricas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+        consultas = metricas['hits'] + metricas['misses']
+        metricas['taxa_acerto'] = round(metricas['hits'] / consultas, 3) if consultas else 0
+        if isinstance(self.backend, CacheMemoria):
+            metricas['itens'] = len(self.backend)
+        return metricas
+
+
+cache_respostas = CacheRespostas()
@@ -0,0 +1,250 @@
+# services/compressao.py
+# Compressão das respostas (gzip ou brotli) como middleware WSGI
+#
+# Comprime as respostas de tipos textuais (JSON, NDJSON, HTML, CSV...) a
+# partir de COMPRESSAO_MINIMA bytes, com a codificação escolhida pelo
+# Accept-Encoding (brotli só se o pacote estiver instalado). Imagens e
+# respostas que já têm Content-Encoding (ex.: os assets pré-comprimidos)
+# passam direto.
+#
+# Respostas com Content-Length são comprimidas de uma vez. Respostas em
+# streaming (sem Content-Length) são comprimidas à medida que os blocos saem,
+# com um flush a cada COMPRESSAO_BLOCO_STREAM bytes para que o cliente receba
+# os dados aos poucos; só o início é retido até se saber se a resposta passa
+# do tamanho mínimo.
+#
+# A ETag de uma resposta comprimida aqui ganha o sufixo ":gzip"/":br" (o corpo
+# é outro). O sufixo é retirado do If-None-Match antes de a aplicação vê-lo,
+# então as verificações de ETag das rotas continuam valendo. O ":" não aparece
+# nas ETags da aplicação: as dos assets pré-comprimidos (services/assets.py)
+# terminam em "-gzip"/"-br" e chegam intactas à aplicação.
+
+import re
+import zlib
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_options_header, quote_etag, unquote_etag
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = (
+    'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml',
+    'image/svg+xml', 'text/',
+)
+_SUFIXO_ETAG = re.compile(r':(?:gzip|br)"')
+
+
+class _Gzip:
+    def __init__(self, nivel):
+        self._objeto = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, dados):
+        return self._objeto.compress(dados)
+
+    def flush(self):
+        return self._objeto.flush(zlib.Z_SYNC_FLUSH)
+
+    def finalizar(self):
+        return self._objeto.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, nivel):
+        self._objeto = brotli.Compressor(quality=nivel)
+
+    def comprimir(self, dados):
+        return self._objeto.process(dados)
+
+    def flush(self):
+        return self._objeto.flush()
+
+    def finalizar(self):
+        return self._objeto.finish()
+
+
+def _comprimivel(tipo):
+    return any(tipo == t or (t.endswith('/') and tipo.startswith(t)) for t in TIPOS_COMPRIMIVEIS)
+
+
+class MiddlewareCompressao:
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.config = config
+
+    def _codificacao(self, environ):
+        aceitas = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and aceitas['br'] > 0:
+            return 'br'
+        if aceitas['gzip'] > 0:
+            return 'gzip'
+        return None
+
+    def _compressor(self, codificacao):
+        if codificacao == 'br':
+            return _Brotli(self.config['COMPRESSAO_NIVEL_BROTLI'])
+        return _Gzip(self.config['COMPRESSAO_NIVEL_GZIP'])
+
+    def __call__(self, environ, start_response):
+        if not self.config['COMPRESSAO_HABILITADA']:
+            return self.wsgi_app(environ, start_response)
+
+        codificacao = self._codificacao(environ)
+        # ETag de versão comprimida vale para a mesma resposta sem compressão
+        sufixo_pedido = False
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and _SUFIXO_ETAG.search(if_none_match):
+            environ['HTTP_IF_NONE_MATCH'] = _SUFIXO_ETAG.sub('"', if_none_match)
+            sufixo_pedido = True
+
+        resposta = {}
+
+        def capturar(status, headers, exc_info=None):
+            if exc_info and resposta:
+                raise exc_info[1].with_traceback(exc_info[2])
+            resposta['status'], resposta['headers'] = status, Headers(headers)
+            return resposta.setdefault('escritos', []).append
+
+        corpo = self.wsgi_app(environ, capturar)
+        if 'status' in resposta and not resposta.get('escritos'):
+            # Caso comum: cabeçalhos já conhecidos. Sem compressão o corpo
+            # original é devolvido como está (preserva o wsgi.file_wrapper)
+            decisao = self._decidir(environ, resposta, codificacao, sufixo_pedido)
+            if decisao != 'comprimir':
+                start_response(resposta['status'], resposta['headers'].to_wsgi_list())
+                return corpo
+        return self._responder(environ, start_response, corpo, resposta, codificacao, sufixo_pedido)
+
+    def _responder(self, environ, start_response, corpo, resposta, codificacao, sufixo_pedido):
+        iterador = iter(corpo)
+        try:
+            # A aplicação pode chamar start_response só no primeiro bloco
+            pendentes = list(resposta.get('escritos', ()))
+            if 'status' not in resposta:
+                pendentes.extend(self._ate_iniciar(iterador, resposta))
+            status, headers = resposta['status'], resposta['headers']
+
+            decisao = resposta.get('decisao') or self._decidir(environ, resposta, codificacao, sufixo_pedido)
+            if decisao != 'comprimir':
+                start_response(status, headers.to_wsgi_list())
+                yield from pendentes
+                yield from iterador
+                return
+
+            # Retém o início até saber se a resposta passa do mínimo; com
+            # Content-Length o corpo já está em memória e é lido inteiro
+            minimo = self.config['COMPRESSAO_MINIMA']
+            if 'Content-Length' in headers:
+                minimo = float('inf')
+            tamanho = sum(len(b) for b in pendentes)
+            terminou = False
+            while tamanho < minimo:
+                bloco = next(iterador, None)
+                if bloco is None:
+                    terminou = True
+                    break
+                pendentes.append(bloco)
+                tamanho += len(bloco)
+
+            if terminou and tamanho < self.config['COMPRESSAO_MINIMA']:
+                start_response(status, headers.to_wsgi_list())
+                yield from pendentes
+                return
+
+            compressor = self._compressor(codificacao)
+            headers['Content-Encoding'] = codificacao
+            self._sufixar_etag(headers, codificacao)
+            headers.remove('Content-Length')
+            if terminou:
+                dados = compressor.comprimir(b''.join(pendentes)) + compressor.finalizar()
+                headers['Content-Length'] = str(len(dados))
+                start_response(status, headers.to_wsgi_list())
+                yield dados
+                return
+
+            start_response(status, headers.to_wsgi_list())
+            yield from self._em_streaming(compressor, pendentes, iterador)
+        finally:
+            if hasattr(corpo, 'close'):
+                corpo.close()
+
+    def _ate_iniciar(self, iterador, resposta):
+        for bloco in iterador:
+            if 'status' in resposta:
+                return [bloco]
+        return []
+
+    def _decidir(self, environ, resposta, codificacao, sufixo_pedido):
+        resposta['decisao'] = decisao = self._avaliar(
+            environ, resposta['status'], resposta['headers'], codificacao
+        )
+        if decisao == 'nao_modificado' and sufixo_pedido and codificacao:
+            self._sufixar_etag(resposta['headers'], codificacao)
+        return decisao
+
+    def _avaliar(self, environ, status, headers, codificacao):
+        codigo = int(status.split(' ', 1)[0])
+        if codigo == 304:
+            return 'nao_modificado'
+        tipo, _ = parse_options_header(headers.get('Content-Type', ''))
+        if not _comprimivel(tipo):
+            return 'ignorar'
+        if (codigo < 200 or codigo in (204, 206) or environ.get('REQUEST_METHOD') == 'HEAD'
+                or 'Content-Encoding' in headers
+                or 'no-transform' in headers.get('Cache-Control', '')):
+            return 'ignorar'
+
+        # A resposta depende do Accept-Encoding mesmo quando não é comprimida
+        vary = headers.get('Vary', '')
+        if 'accept-encoding' not in vary.lower():
+            headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+
+        if codificacao is None:
+            return 'ignorar'
+        tamanho = headers.get('Content-Length')
+        if tamanho is not None and int(tamanho) < self.config['COMPRESSAO_MINIMA']:
+            return 'ignorar'
+        return 'comprimir'
+
+    def _sufixar_etag(self, headers, codificacao):
+        etag = headers.get('ETag')
+        if etag:
+            valor, fraca = unquote_etag(etag)
+            headers['ETag'] = quote_etag(f'{valor}:{codificacao}', weak=fraca)
+
+    def _em_streaming(self, compressor, pendentes, iterador):
+        bloco_stream = self.config['COMPRESSAO_BLOCO_STREAM']
+        desde_flush = 0
+        for bloco in _encadear(pendentes, iterador):
+            saida = compressor.comprimir(bloco)
+            desde_flush += len(bloco)
+            if desde_flush >= bloco_stream:
+                saida += compressor.flush()
+                desde_flush = 0
+            if saida:
+                yield saida
+        yield compressor.finalizar()
+
+
+def _encadear(pendentes, iterador):
+    yield from pendentes
+    yield from iterador
+
+
+class CompressaoRespostas:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESSAO_HABILITADA', True)
+        app.config.setdefault('COMPRESSAO_MINIMA', 1024)             # bytes
+        app.config.setdefault('COMPRESSAO_NIVEL_GZIP', 6)            # 1 (rápido) a 9
+        app.config.setdefault('COMPRESSAO_NIVEL_BROTLI', 4)          # 0 a 11
+        app.config.setdefault('COMPRESSAO_BLOCO_STREAM', 64 * 1024)  # bytes entre flushes
+        app.extensions['compressao'] = self
+        app.wsgi_app = MiddlewareCompressao(app.wsgi_app, app.config)
+
+
+compressao_respostas = CompressaoRespostas()
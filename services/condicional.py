@@ -0,0 +1,68 @@
+# services/condicional.py
+# GET condicional (ETag / Last-Modified) para as APIs JSON
+#
+# A ETag não vem do corpo da resposta: ela combina a versão de cada tabela da
+# qual a rota depende (services/versoes_tabelas.py, gravada no banco e
+# compartilhada pelos processos), o momento da última alteração e a URL
+# pedida. Por isso o If-None-Match é respondido com 304 antes de a view
+# consultar o catálogo ou serializar qualquer coisa.
+#
+# Last-Modified tem resolução de um segundo: duas escritas no mesmo segundo
+# teriam o mesmo valor. Por isso o cabeçalho só é enviado depois que o segundo
+# da última alteração terminou (como faz o Apache); até lá o cliente revalida
+# só pela ETag.
+
+import zlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import Response, request, make_response
+from services.versoes_tabelas import versoes_tabelas
+
+
+def etag_atual(tabelas):
+    """ETag (sem aspas) da URL atual para as versões das tabelas dadas"""
+    versoes = '.'.join(str(v) for v in versoes_tabelas.versoes(*tabelas))
+    # O momento da alteração distingue versões de bancos diferentes (ex.: recriado)
+    marca = int(versoes_tabelas.ultima_modificacao(*tabelas).timestamp() * 1e6)
+    url = zlib.crc32(request.full_path.encode('utf-8'))
+    return f'{versoes}-{marca:x}-{url:08x}'
+
+
+def _nao_modificado(etag, modificado_em):
+    # If-None-Match tem precedência; If-Modified-Since só vale sem ele
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return modificado_em.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _cabecalhos(resposta, etag, modificado_em):
+    resposta.set_etag(etag)
+    segundo = modificado_em.replace(microsecond=0)
+    if segundo < datetime.now(timezone.utc).replace(microsecond=0):
+        resposta.last_modified = segundo
+    # O navegador guarda a resposta mas sempre revalida
+    resposta.cache_control.no_cache = True
+    return resposta
+
+
+def condicional(*tabelas):
+    """Decorador: responde 304 quando o cliente já tem a versão atual"""
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            etag = etag_atual(tabelas)
+            modificado_em = versoes_tabelas.ultima_modificacao(*tabelas).replace(tzinfo=timezone.utc)
+            if _nao_modificado(etag, modificado_em):
+                return _cabecalhos(Response(status=304), etag, modificado_em)
+
+            resposta = make_response(view(*args, **kwargs))
+            if resposta.status_code == 200:
+                _cabecalhos(resposta, etag, modificado_em)
+            return resposta
+        return wrapper
+    return decorador
@@ -0,0 +1,102 @@
+# services/contador_visualizacoes.py
+# Contador de visualizações com escrita adiada (write-behind)
+#
+# Cada visualização de produto só incrementa um contador em memória. Um
+# thread em segundo plano grava o acumulado periodicamente, ou antes disso
+# quando o número de incrementos pendentes atinge o limite, com um único
+# executemany de "visualizacoes = visualizacoes + :n". Os pendentes são
+# gravados também no encerramento do processo.
+#
+# Com VISUALIZACOES_BUFFER = False cada visualização é gravada na hora, com o
+# mesmo UPDATE atômico (sem leitura-modificação-escrita).
+#
+# Gravar contagens não muda a versão de produto: a versão alterada é a da
+# pseudo-tabela TABELA_CONTAGENS. Dependem dela (cache e ETag) só as rotas
+# que devolvem a contagem ou ordenam por ela (listagens de produtos, busca,
+# destaques, populares, recomendados, produtos da categoria e o painel SQL);
+# as demais (categorias, sugestões, avaliações...) não são invalidadas a
+# cada flush.
+
+import threading
+from collections import Counter
+from extensions import db
+from services.flush_periodico import FlushPeriodico
+from services.versoes_tabelas import versoes_tabelas
+from sqlalchemy import text
+
+TABELA_CONTAGENS = 'produto_visualizacoes'
+
+_SQL_INCREMENTO = text(
+    'UPDATE produto SET visualizacoes = COALESCE(visualizacoes, 0) + :n WHERE id = :id'
+)
+
+
+class ContadorVisualizacoes(FlushPeriodico):
+    nome_thread = 'flush-visualizacoes'
+
+    def __init__(self, app=None):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._pendentes = Counter()
+        self._total_pendente = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('VISUALIZACOES_BUFFER', True)
+        app.config.setdefault('VISUALIZACOES_FLUSH_INTERVALO', 5.0)  # segundos
+        app.config.setdefault('VISUALIZACOES_FLUSH_LIMITE', 500)     # incrementos pendentes
+        self._registrar(app, 'contador_visualizacoes')
+
+    def intervalo(self):
+        return self.app.config['VISUALIZACOES_FLUSH_INTERVALO']
+
+    def incrementar(self, produto_id, quantidade=1):
+        """Registra `quantidade` visualizações de um produto"""
+        if not self.app.config['VISUALIZACOES_BUFFER']:
+            self._gravar({produto_id: quantidade})
+            return
+
+        with self._lock:
+            self._pendentes[produto_id] += quantidade
+            self._total_pendente += quantidade
+            atingiu_limite = self._total_pendente >= self.app.config['VISUALIZACOES_FLUSH_LIMITE']
+
+        self._iniciar_thread()
+        if atingiu_limite:
+            self.flush()
+
+    def pendentes(self, produto_id=None):
+        """Incrementos ainda não gravados (de um produto ou no total)"""
+        with self._lock:
+            if produto_id is None:
+                return self._total_pendente
+            return self._pendentes.get(produto_id, 0)
+
+    def flush(self):
+        """Grava imediatamente todos os incrementos pendentes"""
+        with self._lock:
+            lote, self._pendentes = self._pendentes, Counter()
+            self._total_pendente = 0
+        if not lote:
+            return 0
+
+        try:
+            self._gravar(lote)
+        except Exception as e:
+            # Devolve os incrementos ao buffer para a próxima tentativa
+            with self._lock:
+                self._pendentes.update(lote)
+                self._total_pendente += sum(lote.values())
+            self.app.logger.warning(f'Falha ao gravar visualizações pendentes: {e}')
+            return 0
+        return len(lote)
+
+    def _gravar(self, lote):
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(_SQL_INCREMENTO, [{'id': id, 'n': n} for id, n in lote.items()])
+        versoes_tabelas.marcar(TABELA_CONTAGENS)
+
+
+contador_visualizacoes = ContadorVisualizacoes()
@@ -0,0 +1,42 @@
+# services/esquema.py
+# Atualização incremental do esquema SQLite
+#
+# O projeto não usa migrações: db.create_all() cria apenas tabelas ausentes.
+# Este módulo complementa o create_all adicionando colunas e índices novos dos
+# modelos em bancos já existentes.
+
+from extensions import db
+from sqlalchemy import inspect
+
+
+def atualizar_esquema():
+    """Adiciona colunas e índices declarados nos modelos que ainda não existem
+    no banco.
+
+    Retorna a lista de pares (tabela, coluna) adicionados.
+    """
+    inspetor = inspect(db.engine)
+    tabelas_existentes = set(inspetor.get_table_names())
+    adicionadas = []
+
+    with db.engine.begin() as conn:
+        for tabela in db.metadata.sorted_tables:
+            if tabela.name not in tabelas_existentes:
+                continue
+            colunas_existentes = {c['name'] for c in inspetor.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in colunas_existentes:
+                    continue
+                tipo = coluna.type.compile(dialect=db.engine.dialect)
+                ddl = f'ALTER TABLE "{tabela.name}" ADD COLUMN "{coluna.name}" {tipo}'
+                if coluna.server_default is not None:
+                    ddl += f' DEFAULT {coluna.server_default.arg}'
+                    if not coluna.nullable:
+                        ddl += ' NOT NULL'
+                conn.exec_driver_sql(ddl)
+                adicionadas.append((tabela.name, coluna.name))
+
+            for indice in tabela.indexes:
+                indice.create(bind=conn, checkfirst=True)
+
+    return adicionadas
@@ -0,0 +1,221 @@
+# services/fila_visualizacoes.py
+# Fila em memória para eventos de visualização recebidos em lote
+#
+# Os eventos (visualização e tempo de permanência) são agrupados por
+# (usuario_id, produto_id, janela de 30 minutos) e gravados periodicamente:
+# uma consulta busca a última visualização de cada par, e as escritas saem em
+# dois executemany (INSERT das visualizações novas e UPDATE do tempo das
+# existentes). Assim o rastreamento não disputa o writer do SQLite com o
+# restante da aplicação a cada evento.
+
+import threading
+import time
+from datetime import datetime, timedelta
+from extensions import db
+from models.produto import Produto, LOTE_IN
+from models.visualizacao import Visualizacao
+from services.contador_visualizacoes import contador_visualizacoes
+from services.flush_periodico import FlushPeriodico
+from services.versoes_tabelas import versoes_tabelas
+from sqlalchemy import text
+
+# Visualizações do mesmo usuário/produto dentro desta janela são uma só
+JANELA = timedelta(minutes=30)
+
+_SQL_TEMPO = text(
+    'UPDATE visualizacao SET tempo_visualizacao = COALESCE(tempo_visualizacao, 0) + :tempo WHERE id = :id'
+)
+
+
+class FilaCheia(Exception):
+    pass
+
+
+class FilaVisualizacoes(FlushPeriodico):
+    nome_thread = 'flush-fila-visualizacoes'
+
+    def __init__(self, app=None):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._pendentes = {}
+        self._metricas = {
+            'eventos_recebidos': 0,
+            'eventos_coalescidos': 0,
+            'eventos_rejeitados': 0,
+            'eventos_descartados': 0,
+            'visualizacoes_inseridas': 0,
+            'visualizacoes_atualizadas': 0,
+            'flushes': 0,
+            'falhas_flush': 0,
+            'profundidade_maxima': 0,
+            'ultimo_flush_ms': None
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('VISUALIZACOES_FILA_MAXIMO', 10000)      # chaves agrupadas pendentes
+        app.config.setdefault('VISUALIZACOES_FILA_INTERVALO', 2.0)     # segundos
+        app.config.setdefault('VISUALIZACOES_FILA_LIMITE_FLUSH', 2000)  # chaves que antecipam o flush
+        self._registrar(app, 'fila_visualizacoes')
+
+    def intervalo(self):
+        return self.app.config['VISUALIZACOES_FILA_INTERVALO']
+
+    def enfileirar(self, usuario_id, eventos, agora=None):
+        """Agrupa eventos já validados: dicts com produto_id, tipo ('visualizacao'
+        ou 'tempo') e tempo (segundos). Lança FilaCheia se não houver espaço."""
+        agora = agora or datetime.utcnow()
+        janela = int(agora.timestamp() // JANELA.total_seconds())
+
+        with self._lock:
+            novas_chaves = {(usuario_id, e['produto_id'], janela) for e in eventos} - self._pendentes.keys()
+            if len(self._pendentes) + len(novas_chaves) > self.app.config['VISUALIZACOES_FILA_MAXIMO']:
+                self._metricas['eventos_rejeitados'] += len(eventos)
+                raise FilaCheia('Fila de visualizações cheia')
+
+            for evento in eventos:
+                chave = (usuario_id, evento['produto_id'], janela)
+                item = self._pendentes.get(chave)
+                if item is None:
+                    item = self._pendentes[chave] = {'visualizacao': False, 'tempo': 0, 'data': agora}
+                else:
+                    self._metricas['eventos_coalescidos'] += 1
+                if evento['tipo'] == 'visualizacao':
+                    item['visualizacao'] = True
+                item['tempo'] += evento.get('tempo', 0)
+
+            self._metricas['eventos_recebidos'] += len(eventos)
+            profundidade = len(self._pendentes)
+            self._metricas['profundidade_maxima'] = max(self._metricas['profundidade_maxima'], profundidade)
+
+        self._iniciar_thread()
+        if profundidade >= self.app.config['VISUALIZACOES_FILA_LIMITE_FLUSH']:
+            self.flush()
+
+    def metricas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['profundidade'] = len(self._pendentes)
+        metricas['capacidade'] = self.app.config['VISUALIZACOES_FILA_MAXIMO']
+        return metricas
+
+    def flush(self):
+        """Grava os eventos agrupados; em caso de erro eles voltam para a fila"""
+        with self._lock:
+            lote, self._pendentes = self._pendentes, {}
+        if not lote:
+            return 0
+
+        inicio = time.perf_counter()
+        try:
+            inseridas, atualizadas, descartados, incrementos = self._gravar(lote)
+        except Exception as e:
+            with self._lock:
+                for chave, item in lote.items():
+                    atual = self._pendentes.setdefault(chave, item)
+                    if atual is not item:
+                        atual['visualizacao'] = atual['visualizacao'] or item['visualizacao']
+                        atual['tempo'] += item['tempo']
+                self._metricas['falhas_flush'] += 1
+            self.app.logger.warning(f'Falha ao gravar fila de visualizações: {e}')
+            return 0
+
+        for produto_id, quantidade in incrementos.items():
+            contador_visualizacoes.incrementar(produto_id, quantidade)
+
+        with self._lock:
+            self._metricas['flushes'] += 1
+            self._metricas['visualizacoes_inseridas'] += inseridas
+            self._metricas['visualizacoes_atualizadas'] += atualizadas
+            self._metricas['eventos_descartados'] += descartados
+            self._metricas['ultimo_flush_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+        return len(lote)
+
+    def _gravar(self, lote):
+        """Aplica um lote agrupado; retorna (inseridas, atualizadas, descartados,
+        incrementos por produto)"""
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                produto_ids = list({p for _, p, _ in lote})
+                usuario_ids = list({u for u, _, _ in lote})
+                existentes = set()
+                for inicio in range(0, len(produto_ids), LOTE_IN):
+                    bloco = produto_ids[inicio:inicio + LOTE_IN]
+                    existentes.update(conn.execute(
+                        db.select(Produto.id).where(Produto.id.in_(bloco))
+                    ).scalars())
+
+                # Última visualização de cada par usuário/produto do lote
+                ultimas = {}
+                for inicio in range(0, len(usuario_ids), LOTE_IN):
+                    bloco = usuario_ids[inicio:inicio + LOTE_IN]
+                    recentes = db.select(
+                        Visualizacao.usuario_id,
+                        Visualizacao.produto_id,
+                        db.func.max(Visualizacao.data_visualizacao).label('ultima')
+                    ).where(
+                        Visualizacao.usuario_id.in_(bloco),
+                        Visualizacao.produto_id.in_(produto_ids)
+                    ).group_by(Visualizacao.usuario_id, Visualizacao.produto_id).subquery()
+                    linhas = conn.execute(
+                        db.select(
+                            Visualizacao.id, Visualizacao.usuario_id,
+                            Visualizacao.produto_id, Visualizacao.data_visualizacao
+                        ).join(recentes, db.and_(
+                            Visualizacao.usuario_id == recentes.c.usuario_id,
+                            Visualizacao.produto_id == recentes.c.produto_id,
+                            Visualizacao.data_visualizacao == recentes.c.ultima
+                        ))
+                    )
+                    for id, usuario_id, produto_id, data in linhas:
+                        ultimas[(usuario_id, produto_id)] = {'id': id, 'data': data, 'tempo': 0}
+
+                novas = []
+                incrementos = {}
+                descartados = 0
+                for chave in sorted(lote, key=lambda c: (c[0], c[1], c[2])):
+                    usuario_id, produto_id, _ = chave
+                    item = lote[chave]
+                    if produto_id not in existentes:
+                        descartados += 1
+                        continue
+
+                    par = (usuario_id, produto_id)
+                    ultima = ultimas.get(par)
+                    recente = ultima is not None and ultima['data'] > item['data'] - JANELA
+                    if item['visualizacao'] and not recente:
+                        nova = {
+                            'usuario_id': usuario_id,
+                            'produto_id': produto_id,
+                            'data_visualizacao': item['data'],
+                            'tempo_visualizacao': item['tempo']
+                        }
+                        novas.append(nova)
+                        # Eventos seguintes do mesmo par somam nesta linha nova
+                        ultimas[par] = {'id': None, 'data': item['data'], 'tempo': 0, 'nova': nova}
+                        incrementos[produto_id] = incrementos.get(produto_id, 0) + 1
+                    elif ultima is not None:
+                        if ultima['id'] is None:
+                            ultima['nova']['tempo_visualizacao'] += item['tempo']
+                        else:
+                            ultima['tempo'] += item['tempo']
+                    else:
+                        # Tempo de permanência sem nenhuma visualização registrada
+                        descartados += 1
+
+                atualizacoes = [
+                    {'id': u['id'], 'tempo': u['tempo']}
+                    for u in ultimas.values() if u['id'] is not None and u['tempo']
+                ]
+                if novas:
+                    conn.execute(db.insert(Visualizacao.__table__), novas)
+                if atualizacoes:
+                    conn.execute(_SQL_TEMPO, atualizacoes)
+        if novas or atualizacoes:
+            versoes_tabelas.marcar('visualizacao')
+
+        return len(novas), len(atualizacoes), descartados, incrementos
+
+
+fila_visualizacoes = FilaVisualizacoes()
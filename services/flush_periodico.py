@@ -0,0 +1,52 @@
+# services/flush_periodico.py
+# Base para buffers em memória gravados periodicamente por um thread
+
+import atexit
+import threading
+
+
+class FlushPeriodico:
+    """Mantém um thread daemon que chama `flush()` a cada `intervalo()` segundos.
+
+    O thread é iniciado sob demanda (no primeiro dado recebido) e `encerrar()`
+    é registrado no atexit para gravar o que estiver pendente.
+    """
+
+    nome_thread = 'flush-periodico'
+
+    def __init__(self):
+        self.app = None
+        self._thread = None
+        self._parar = threading.Event()
+        self._lock_thread = threading.Lock()
+
+    def _registrar(self, app, nome_extensao):
+        app.extensions[nome_extensao] = self
+        self.app = app
+        atexit.register(self.encerrar)
+
+    def intervalo(self):
+        raise NotImplementedError
+
+    def flush(self):
+        raise NotImplementedError
+
+    def encerrar(self):
+        """Para o thread de gravação e grava o que estiver pendente"""
+        self._parar.set()
+        if self.app is not None:
+            self.flush()
+
+    def _iniciar_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock_thread:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name=self.nome_thread, daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo()):
+            self.flush()
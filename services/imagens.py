@@ -0,0 +1,335 @@
+# services/imagens.py
+# Pipeline das imagens enviadas (produtos e fotos de perfil)
+#
+# O original é gravado com um nome derivado do conteúdo (sha256): o mesmo
+# arquivo enviado duas vezes ocupa um único lugar no disco e, como um nome
+# nunca muda de conteúdo, a URL pode ser cacheada como imutável. A requisição
+# só grava o original; as variantes em WebP de tamanho fixo são geradas por um
+# pool de threads em segundo plano. Quando terminam, o produto recebe o
+# imagem_hash (to_dict passa a expor as URLs das variantes) e a foto de perfil
+# passa a apontar para a variante reduzida.
+#
+# O Pillow é opcional: sem ele as imagens continuam gravadas por conteúdo,
+# sem validação nem variantes (as URLs das variantes caem no original).
+
+import atexit
+import glob
+import hashlib
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import request
+from extensions import db
+from services.versoes_tabelas import versoes_tabelas
+
+try:
+    from PIL import Image, ImageOps
+    PILLOW_DISPONIVEL = True
+except ImportError:  # pragma: no cover - depende do ambiente
+    Image = ImageOps = None
+    PILLOW_DISPONIVEL = False
+
+# Variantes: nome -> (largura, altura, recortar). Sem recorte a imagem só é
+# reduzida para caber na caixa, mantendo a proporção.
+VARIANTES_PRODUTO = {
+    'thumb': (160, 160, True),
+    'card': (480, 480, False),
+    'full': (1600, 1600, False),
+}
+VARIANTES_PERFIL = {
+    'perfil': (256, 256, True),
+}
+
+PASTA_PRODUTOS = 'images'
+PASTA_PERFIL = 'pic'
+TAMANHO_HASH = 32  # caracteres hexadecimais do sha256 usados no nome
+_BLOCO_LEITURA = 64 * 1024
+
+# Nomes gerados pelo pipeline: <hash>.<ext> ou <hash>_<variante>.webp
+NOME_POR_CONTEUDO = re.compile(r'^[0-9a-f]{%d}(_[a-z]+)?\.[a-z0-9]+$' % TAMANHO_HASH)
+
+
+class ErroImagem(ValueError):
+    pass
+
+
+def nome_por_conteudo(nome_arquivo):
+    """Indica se o arquivo foi gravado pelo pipeline (conteúdo imutável)"""
+    return bool(NOME_POR_CONTEUDO.match(os.path.basename(nome_arquivo or '')))
+
+
+def _hash_do_nome(nome_arquivo):
+    nome = os.path.basename(nome_arquivo or '')
+    return nome[:TAMANHO_HASH] if nome_por_conteudo(nome) else None
+
+
+def urls_variantes(imagem, imagem_hash):
+    """URLs das variantes de uma imagem de produto. Enquanto as variantes não
+    existem (ou se a imagem foi trocada por outra) todas apontam para o
+    original."""
+    if imagem and imagem_hash and _hash_do_nome(imagem) == imagem_hash:
+        return {
+            variante: f'/static/{PASTA_PRODUTOS}/{imagem_hash}_{variante}.webp'
+            for variante in VARIANTES_PRODUTO
+        }
+    return {variante: imagem for variante in VARIANTES_PRODUTO}
+
+
+def _hash_arquivo(arquivo):
+    sha = hashlib.sha256()
+    arquivo.stream.seek(0)
+    for bloco in iter(lambda: arquivo.stream.read(_BLOCO_LEITURA), b''):
+        sha.update(bloco)
+    arquivo.stream.seek(0)
+    return sha.hexdigest()[:TAMANHO_HASH]
+
+
+def _validar(arquivo):
+    if not PILLOW_DISPONIVEL:
+        return
+    try:
+        with Image.open(arquivo.stream) as imagem:
+            imagem.verify()
+    except Exception:
+        raise ErroImagem('Arquivo não é uma imagem válida')
+    finally:
+        arquivo.stream.seek(0)
+
+
+def _gravar_atomico(caminho, gravar):
+    # Grava num temporário e renomeia: quem lê nunca vê um arquivo pela metade
+    temporario = f'{caminho}.{uuid.uuid4().hex}.tmp'
+    try:
+        gravar(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _gerar_variantes(caminho_original, pasta, imagem_hash, variantes, qualidade):
+    """Gera as variantes que ainda não existem no disco"""
+    faltando = {
+        nome: medidas for nome, medidas in variantes.items()
+        if not os.path.exists(os.path.join(pasta, f'{imagem_hash}_{nome}.webp'))
+    }
+    if not faltando:
+        return
+
+    with Image.open(caminho_original) as original:
+        original.seek(0)  # GIF animado: primeiro quadro
+        imagem = ImageOps.exif_transpose(original)
+        imagem = imagem.convert('RGBA' if 'A' in imagem.getbands() or 'transparency' in imagem.info else 'RGB')
+
+        for nome, (largura, altura, recortar) in faltando.items():
+            if recortar:
+                variante = ImageOps.fit(imagem, (largura, altura), Image.LANCZOS)
+            else:
+                variante = imagem.copy()
+                variante.thumbnail((largura, altura), Image.LANCZOS)
+            _gravar_atomico(
+                os.path.join(pasta, f'{imagem_hash}_{nome}.webp'),
+                lambda destino: variante.save(destino, 'WEBP', quality=qualidade, method=4)
+            )
+
+
+class ProcessadorImagens:
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGENS_WORKERS', 2)          # 0 processa na própria requisição
+        app.config.setdefault('IMAGENS_QUALIDADE_WEBP', 80)
+        app.config.setdefault('IMAGENS_CACHE_MAX_IDADE', 365 * 24 * 3600)  # segundos
+        app.extensions['processador_imagens'] = self
+        self.app = app
+        app.after_request(self._cache_uploads)
+        atexit.register(self.encerrar)
+        if not PILLOW_DISPONIVEL:
+            app.logger.warning(
+                'Pillow não instalado (pip install Pillow): as imagens enviadas serão gravadas '
+                'sem validação nem variantes WebP'
+            )
+
+    # Gravação do original -----------------------------------------------------
+
+    def _pasta(self, subpasta):
+        pasta = os.path.join(self.app.static_folder, subpasta)
+        os.makedirs(pasta, exist_ok=True)
+        return pasta
+
+    def _salvar(self, arquivo, subpasta):
+        _validar(arquivo)
+        imagem_hash = _hash_arquivo(arquivo)
+        _, ext = os.path.splitext(arquivo.filename.lower())
+        nome = f'{imagem_hash}{ext or ".png"}'
+        caminho = os.path.join(self._pasta(subpasta), nome)
+        # Mesmo conteúdo já gravado: reaproveita o arquivo existente
+        if not os.path.exists(caminho):
+            _gravar_atomico(caminho, arquivo.save)
+        return nome, imagem_hash
+
+    def salvar_imagem_produto(self, arquivo):
+        """Grava o original; retorna (url, hash)"""
+        nome, imagem_hash = self._salvar(arquivo, PASTA_PRODUTOS)
+        return f'/static/{PASTA_PRODUTOS}/{nome}', imagem_hash
+
+    def salvar_foto_perfil(self, arquivo):
+        """Grava o original; retorna (nome do arquivo em static/pic, hash)"""
+        return self._salvar(arquivo, PASTA_PERFIL)
+
+    # Variantes em segundo plano -----------------------------------------------
+
+    def processar_produto(self, produto_id, url, imagem_hash):
+        """Agenda as variantes da imagem do produto (chamar após o commit)"""
+        self._agendar(self._processar_produto, produto_id, url, imagem_hash)
+
+    def processar_foto_perfil(self, usuario_id, nome, imagem_hash):
+        """Agenda a variante da foto de perfil (chamar após o commit)"""
+        self._agendar(self._processar_foto_perfil, usuario_id, nome, imagem_hash)
+
+    def _agendar(self, tarefa, *args):
+        if not PILLOW_DISPONIVEL:
+            return
+        if self.app.config['IMAGENS_WORKERS'] <= 0:
+            self._executar(tarefa, *args)
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.app.config['IMAGENS_WORKERS'], thread_name_prefix='imagens'
+                )
+            self._executor.submit(self._executar, tarefa, *args)
+
+    def _executar(self, tarefa, *args):
+        try:
+            with self.app.app_context():
+                tarefa(*args)
+        except Exception as e:
+            self.app.logger.warning(f'Falha ao gerar variantes da imagem {args}: {e}')
+
+    def _processar_produto(self, produto_id, url, imagem_hash):
+        from models.produto import Produto
+
+        pasta = self._pasta(PASTA_PRODUTOS)
+        _gerar_variantes(
+            os.path.join(pasta, os.path.basename(url)), pasta, imagem_hash,
+            VARIANTES_PRODUTO, self.app.config['IMAGENS_QUALIDADE_WEBP']
+        )
+        # Só marca se o produto ainda usa essa imagem
+        with db.engine.begin() as conn:
+            alterados = conn.execute(
+                db.update(Produto.__table__)
+                .where(Produto.__table__.c.id == produto_id, Produto.__table__.c.imagem == url)
+                .values(imagem_hash=imagem_hash)
+            ).rowcount
+        if alterados:
+            versoes_tabelas.marcar('produto')
+
+    def _processar_foto_perfil(self, usuario_id, nome, imagem_hash):
+        from models.usuario import Usuario
+
+        pasta = self._pasta(PASTA_PERFIL)
+        _gerar_variantes(
+            os.path.join(pasta, nome), pasta, imagem_hash,
+            VARIANTES_PERFIL, self.app.config['IMAGENS_QUALIDADE_WEBP']
+        )
+        with db.engine.begin() as conn:
+            alterados = conn.execute(
+                db.update(Usuario.__table__)
+                .where(Usuario.__table__.c.id == usuario_id, Usuario.__table__.c.foto_perfil == nome)
+                .values(foto_perfil=f'{imagem_hash}_perfil.webp')
+            ).rowcount
+        if alterados:
+            versoes_tabelas.marcar('usuario')
+
+    def encerrar(self):
+        """Espera as variantes já agendadas (também chamado no atexit)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    # Remoção ------------------------------------------------------------------
+
+    def arquivos_da_imagem(self, url, produto_id):
+        """Caminhos a remover do disco quando o produto deixa de usar `url`.
+        Um arquivo pode ser compartilhado (mesmo conteúdo, ou o placeholder):
+        só sai se nenhum outro produto usa a mesma imagem."""
+        from models.produto import Produto
+
+        if not url or not url.startswith(f'/static/{PASTA_PRODUTOS}/'):
+            return []
+        compartilhada = db.session.query(
+            Produto.query.filter(Produto.imagem == url, Produto.id != produto_id).exists()
+        ).scalar()
+        if compartilhada:
+            return []
+
+        pasta = os.path.join(self.app.static_folder, PASTA_PRODUTOS)
+        nome = os.path.basename(url)
+        imagem_hash = _hash_do_nome(nome)
+        if imagem_hash is None:
+            return [os.path.join(pasta, nome)]
+        return [os.path.join(pasta, nome)] + [
+            os.path.join(pasta, f'{imagem_hash}_{variante}.webp') for variante in VARIANTES_PRODUTO
+        ]
+
+    def arquivos_da_foto_perfil(self, nome, usuario_id):
+        """Caminhos a remover do disco quando o usuário troca a foto `nome`:
+        o original e a variante reduzida, que passam a ser a mesma foto no
+        banco. Fotos de nome fixo (default.png, uploads antigos) ficam, e a
+        foto só sai se nenhum outro usuário usa a mesma imagem."""
+        from models.usuario import Usuario
+
+        imagem_hash = _hash_do_nome(nome)
+        if imagem_hash is None:
+            return []
+
+        pasta = os.path.join(self.app.static_folder, PASTA_PERFIL)
+        nomes = [
+            arquivo for arquivo in glob.glob(f'{imagem_hash}*', root_dir=pasta)
+            if _hash_do_nome(arquivo) == imagem_hash
+        ]
+        compartilhada = db.session.query(
+            Usuario.query.filter(Usuario.foto_perfil.in_(nomes), Usuario.id != usuario_id).exists()
+        ).scalar()
+        if compartilhada:
+            return []
+        return [os.path.join(pasta, arquivo) for arquivo in nomes]
+
+    # Cache --------------------------------------------------------------------
+
+    def _cache_uploads(self, resposta):
+        if request.endpoint != 'static' or resposta.status_code not in (200, 304):
+            return resposta
+        nome = request.view_args.get('filename') or ''
+        if nome_por_conteudo(nome):
+            # Arquivos por conteúdo nunca mudam: o navegador não precisa revalidar
+            resposta.cache_control.public = True
+            resposta.cache_control.max_age = self.app.config['IMAGENS_CACHE_MAX_IDADE']
+            resposta.cache_control.immutable = True
+            resposta.cache_control.no_cache = None
+        elif nome.split('/', 1)[0] in (PASTA_PERFIL, PASTA_PRODUTOS):
+            # Uploads com nome antigo (fixo) podem ser trocados no lugar:
+            # guardados, mas sempre revalidados pela ETag/Last-Modified
+            resposta.cache_control.public = True
+            resposta.cache_control.no_cache = True
+        return resposta
+
+
+def remover_arquivos(caminhos):
+    for caminho in caminhos:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+processador_imagens = ProcessadorImagens()
@@ -0,0 +1,291 @@
+# services/importacao.py
+# Importação e exportação de produtos em massa (CSV ou JSONL)
+#
+# A importação lê o arquivo em streaming e grava em blocos: cada bloco é uma
+# transação com um INSERT ... ON CONFLICT(nome) DO UPDATE em executemany
+# (upsert pelo nome, que é único), a criação das categorias que ainda não
+# existem e as associações produto/categoria. Linhas inválidas são contadas e
+# ignoradas sem derrubar o restante do arquivo.
+#
+# Campos aceitos: nome e preco (obrigatórios); descricao, imagem, destaque,
+# ativo e categorias (opcionais). No CSV as categorias vêm separadas por "|";
+# no JSONL podem ser uma lista ou o mesmo texto separado por "|". Campos
+# opcionais ausentes não sobrescrevem o valor de um produto já existente, e
+# as categorias importadas são acrescentadas às que o produto já tem.
+
+import csv
+import json
+from extensions import db
+from models.categoria import Categoria, produto_categoria
+from models.produto import Produto, LOTE_IN
+from services.autocomplete import indice_autocomplete
+from services.versoes_tabelas import versoes_tabelas
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+FORMATOS = ('csv', 'jsonl')
+LOTE_IMPORTACAO = 5000
+MAXIMO_ERROS_LISTADOS = 100
+SEPARADOR_CATEGORIAS = '|'
+
+_VERDADEIROS = {'1', 'true', 'sim', 's', 'yes', 'y'}
+_FALSOS = {'0', 'false', 'nao', 'não', 'n', 'no'}
+
+
+class ErroImportacao(ValueError):
+    pass
+
+
+def formato_do_arquivo(nome_arquivo, formato=None):
+    """Formato explícito ou deduzido da extensão (.csv / .jsonl / .ndjson)"""
+    if formato is None:
+        extensao = nome_arquivo.rsplit('.', 1)[-1].lower() if '.' in nome_arquivo else ''
+        formato = 'jsonl' if extensao in ('jsonl', 'ndjson') else extensao
+    if formato not in FORMATOS:
+        raise ErroImportacao(f'Formato não suportado: {formato} (use csv ou jsonl)')
+    return formato
+
+
+# Leitura ---------------------------------------------------------------------
+
+def ler_registros(arquivo, formato):
+    """Gera (número da linha, dict) a partir de um arquivo texto já aberto"""
+    if formato == 'csv':
+        leitor = csv.DictReader(arquivo)
+        for registro in leitor:
+            yield leitor.line_num, registro
+        return
+
+    for numero, linha in enumerate(arquivo, start=1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError as e:
+            yield numero, ErroImportacao(f'JSON inválido: {e}')
+            continue
+        yield numero, registro if isinstance(registro, dict) else ErroImportacao('Linha não é um objeto JSON')
+
+
+def _booleano(valor, campo):
+    if valor is None or isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if not texto:
+        return None
+    if texto in _VERDADEIROS:
+        return True
+    if texto in _FALSOS:
+        return False
+    raise ErroImportacao(f'Valor inválido para {campo}: {valor}')
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def normalizar_registro(registro):
+    """Valida um registro lido e devolve (linha do upsert, nomes de categorias)"""
+    nome = _texto(registro.get('nome'))
+    if not nome:
+        raise ErroImportacao('nome é obrigatório')
+    if len(nome) > Produto.nome.type.length:
+        raise ErroImportacao(f'nome com mais de {Produto.nome.type.length} caracteres')
+    try:
+        preco = float(registro.get('preco'))
+    except (TypeError, ValueError):
+        raise ErroImportacao('preco ausente ou inválido')
+    if preco < 0:
+        raise ErroImportacao('preco negativo')
+
+    categorias = registro.get('categorias') or []
+    if isinstance(categorias, str):
+        categorias = categorias.split(SEPARADOR_CATEGORIAS)
+    categorias = [c for c in (_texto(c) for c in categorias) if c]
+
+    linha = {
+        'nome': nome,
+        'preco': preco,
+        'descricao': _texto(registro.get('descricao')),
+        'imagem': _texto(registro.get('imagem')),
+        'destaque': _booleano(registro.get('destaque'), 'destaque'),
+        'ativo': _booleano(registro.get('ativo'), 'ativo'),
+    }
+    return linha, categorias
+
+
+# Gravação --------------------------------------------------------------------
+
+def _comando_upsert():
+    tabela = Produto.__table__
+    valor = db.bindparam
+    comando = sqlite_insert(tabela).values(
+        nome=valor('nome'),
+        preco=valor('preco'),
+        descricao=valor('descricao'),
+        imagem=valor('imagem'),
+        destaque=db.func.coalesce(valor('destaque'), False),
+        ativo=db.func.coalesce(valor('ativo'), True),
+    )
+    # Opcionais ausentes (NULL) mantêm o valor atual do produto
+    return comando.on_conflict_do_update(
+        index_elements=[tabela.c.nome],
+        set_={
+            'preco': comando.excluded.preco,
+            'descricao': db.func.coalesce(comando.excluded.descricao, tabela.c.descricao),
+            'imagem': db.func.coalesce(comando.excluded.imagem, tabela.c.imagem),
+            'destaque': db.func.coalesce(valor('destaque'), tabela.c.destaque),
+            'ativo': db.func.coalesce(valor('ativo'), tabela.c.ativo),
+        }
+    )
+
+
+def _ids_por_nome(conn, coluna_id, coluna_nome, nomes):
+    ids = {}
+    nomes = list(nomes)
+    for inicio in range(0, len(nomes), LOTE_IN):
+        bloco = nomes[inicio:inicio + LOTE_IN]
+        ids.update((nome, id) for id, nome in conn.execute(
+            db.select(coluna_id, coluna_nome).where(coluna_nome.in_(bloco))
+        ))
+    return ids
+
+
+def _gravar_bloco(conn, upsert, linhas, categorias_por_produto, ids_categorias):
+    """Grava um bloco (já sem nomes repetidos); retorna categorias criadas"""
+    conn.execute(upsert, list(linhas.values()))
+
+    nomes_categorias = {c for nomes in categorias_por_produto.values() for c in nomes}
+    novas = [{'nome': nome} for nome in nomes_categorias if nome not in ids_categorias]
+    if novas:
+        conn.execute(
+            sqlite_insert(Categoria.__table__).on_conflict_do_nothing(index_elements=['nome']), novas
+        )
+        ids_categorias.update(_ids_por_nome(
+            conn, Categoria.id, Categoria.nome, [c['nome'] for c in novas]
+        ))
+
+    if categorias_por_produto:
+        ids_produtos = _ids_por_nome(conn, Produto.id, Produto.nome, categorias_por_produto)
+        associacoes = [
+            {'produto_id': ids_produtos[nome], 'categoria_id': ids_categorias[categoria]}
+            for nome, categorias in categorias_por_produto.items()
+            for categoria in categorias
+        ]
+        conn.execute(sqlite_insert(produto_categoria).on_conflict_do_nothing(), associacoes)
+    return len(novas)
+
+
+def importar_produtos(registros, tamanho_lote=LOTE_IMPORTACAO, progresso=None):
+    """Importa os registros de ler_registros em transações de `tamanho_lote`.
+
+    `progresso(resumo)` é chamado após cada bloco gravado. Retorna o resumo:
+    lidos, gravados, invalidos, categorias_criadas, blocos e erros (os
+    primeiros MAXIMO_ERROS_LISTADOS, com o número da linha)."""
+    resumo = {'lidos': 0, 'gravados': 0, 'invalidos': 0, 'categorias_criadas': 0, 'blocos': 0, 'erros': []}
+    upsert = _comando_upsert()
+    with db.engine.connect() as conn:
+        ids_categorias = dict((nome, id) for id, nome in conn.execute(db.select(Categoria.id, Categoria.nome)))
+
+    def gravar(linhas, categorias_por_produto):
+        with db.engine.begin() as conn:
+            resumo['categorias_criadas'] += _gravar_bloco(
+                conn, upsert, linhas, categorias_por_produto, ids_categorias
+            )
+        resumo['gravados'] += len(linhas)
+        resumo['blocos'] += 1
+        if progresso:
+            progresso(resumo)
+
+    # Nomes repetidos dentro do bloco: vale o último (o upsert não aceita o
+    # mesmo nome duas vezes num executemany sem ambiguidade de ordem)
+    linhas, categorias_por_produto = {}, {}
+    try:
+        for numero, registro in registros:
+            resumo['lidos'] += 1
+            try:
+                if isinstance(registro, Exception):
+                    raise registro
+                linha, categorias = normalizar_registro(registro)
+            except ErroImportacao as e:
+                resumo['invalidos'] += 1
+                if len(resumo['erros']) < MAXIMO_ERROS_LISTADOS:
+                    resumo['erros'].append({'linha': numero, 'erro': str(e)})
+                continue
+
+            linhas[linha['nome']] = linha
+            if categorias:
+                categorias_por_produto.setdefault(linha['nome'], set()).update(categorias)
+            if len(linhas) >= tamanho_lote:
+                gravar(linhas, categorias_por_produto)
+                linhas, categorias_por_produto = {}, {}
+
+        if linhas:
+            gravar(linhas, categorias_por_produto)
+    finally:
+        # Escritas feitas direto no engine: índice do autocomplete e versões
+        # (cache/ETags) precisam ser atualizados explicitamente. A versão fica
+        # no banco, então um import pela CLI também chega aos workers do
+        # servidor, que recarregam o autocomplete e descartam o cache
+        if resumo['blocos']:
+            indice_autocomplete.reconstruir()
+            versoes_tabelas.marcar('produto', 'categoria', 'produto_categoria')
+    return resumo
+
+
+# Exportação ------------------------------------------------------------------
+
+CAMPOS_EXPORTACAO = ('id', 'nome', 'preco', 'descricao', 'imagem', 'destaque', 'ativo', 'categorias')
+
+
+def _categorias_do_bloco(conn, produto_ids):
+    categorias = {}
+    linhas = conn.execute(
+        db.select(produto_categoria.c.produto_id, Categoria.nome)
+        .join(Categoria, Categoria.id == produto_categoria.c.categoria_id)
+        .where(produto_categoria.c.produto_id.in_(produto_ids))
+        .order_by(produto_categoria.c.produto_id, Categoria.nome)
+    )
+    for produto_id, nome in linhas:
+        categorias.setdefault(produto_id, []).append(nome)
+    return categorias
+
+
+def exportar_registros(tamanho_bloco=LOTE_IN):
+    """Gera um dict por produto (ordem de id), lendo o catálogo em blocos"""
+    tabela = Produto.__table__
+    colunas = [tabela.c[campo] for campo in CAMPOS_EXPORTACAO if campo != 'categorias']
+    with db.engine.connect() as conn:
+        resultado = conn.execution_options(yield_per=tamanho_bloco).execute(
+            db.select(*colunas).order_by(tabela.c.id)
+        )
+        # Consulta das categorias em outra conexão: o cursor acima segue aberto
+        with db.engine.connect() as conn_categorias:
+            for bloco in resultado.partitions():
+                categorias = _categorias_do_bloco(conn_categorias, [linha.id for linha in bloco])
+                for linha in bloco:
+                    registro = dict(linha._mapping)
+                    registro['categorias'] = categorias.get(linha.id, [])
+                    yield registro
+
+
+def linhas_exportacao(formato, tamanho_bloco=LOTE_IN):
+    """Gera o texto exportado (CSV com cabeçalho ou JSONL), linha a linha"""
+    if formato == 'jsonl':
+        for registro in exportar_registros(tamanho_bloco):
+            yield json.dumps(registro, ensure_ascii=False) + '\n'
+        return
+
+    class _Linha:
+        def write(self, texto):
+            return texto
+    escritor = csv.writer(_Linha())
+    yield escritor.writerow(CAMPOS_EXPORTACAO)
+    for registro in exportar_registros(tamanho_bloco):
+        registro['categorias'] = SEPARADOR_CATEGORIAS.join(registro['categorias'])
+        registro['destaque'] = int(bool(registro['destaque']))
+        registro['ativo'] = int(bool(registro['ativo']))
+        yield escritor.writerow([registro[campo] for campo in CAMPOS_EXPORTACAO])
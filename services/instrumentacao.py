@@ -0,0 +1,189 @@
+# services/instrumentacao.py
+# Contagem e tempo das consultas SQL por requisição
+#
+# Os eventos before/after_cursor_execute do engine registram cada comando
+# enviado ao banco na contagem ativa: a da requisição (aberta no
+# before_request) e as de blocos `with contar_consultas():`. No final da
+# requisição o resumo sai no cabeçalho Server-Timing (visível nas
+# ferramentas do navegador) e num log estruturado em JSON, com os comandos
+# mais lentos.
+#
+# Orçamento: CONSULTAS_ORCAMENTO vale para todas as rotas e
+# @orcamento_consultas(n) para uma rota específica. Acima do orçamento a
+# requisição gera um aviso no log; com CONSULTAS_ORCAMENTO_ESTRITO (padrão:
+# ligado em TESTING) levanta OrcamentoExcedido, o que derruba o teste ou o
+# script que fez a requisição.
+
+import heapq
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from extensions import db
+from sqlalchemy import event
+
+_ativas = ContextVar('contagens_consultas', default=())
+
+TAMANHO_SQL_LOG = 300  # caracteres de cada comando lento no log
+
+
+class OrcamentoExcedido(AssertionError):
+    pass
+
+
+class ContagemConsultas:
+    """Número de comandos, tempo total no banco e os `maximo_lentas` mais lentos"""
+
+    def __init__(self, maximo_lentas=5):
+        self.total = 0
+        self.tempo_ms = 0.0
+        self._maximo_lentas = maximo_lentas
+        self._lentas = []  # heap de (ms, ordem, sql)
+
+    def registrar(self, statement, ms):
+        self.total += 1
+        self.tempo_ms += ms
+        item = (ms, self.total, statement)
+        if len(self._lentas) < self._maximo_lentas:
+            heapq.heappush(self._lentas, item)
+        elif ms > self._lentas[0][0]:
+            heapq.heapreplace(self._lentas, item)
+
+    @property
+    def lentas(self):
+        return [
+            {'ms': round(ms, 2), 'sql': ' '.join(sql.split())[:TAMANHO_SQL_LOG]}
+            for ms, _, sql in sorted(self._lentas, reverse=True)
+        ]
+
+    def resumo(self):
+        return {'consultas': self.total, 'db_ms': round(self.tempo_ms, 2), 'lentas': self.lentas}
+
+
+@contextmanager
+def contar_consultas(maximo=None, maximo_lentas=5):
+    """Conta os comandos SQL executados no bloco:
+
+        with contar_consultas(maximo=3) as contagem:
+            cliente.get('/api/produtos')
+        contagem.total, contagem.tempo_ms, contagem.lentas
+
+    Com `maximo`, levanta OrcamentoExcedido se o bloco passar dele."""
+    contagem = ContagemConsultas(maximo_lentas)
+    token = _ativas.set(_ativas.get() + (contagem,))
+    try:
+        yield contagem
+    finally:
+        _ativas.reset(token)
+    if maximo is not None and contagem.total > maximo:
+        raise OrcamentoExcedido(f'{contagem.total} consultas (máximo {maximo})')
+
+
+def orcamento_consultas(maximo):
+    """Decorador: orçamento de consultas da rota (substitui CONSULTAS_ORCAMENTO)"""
+    def decorador(view):
+        view.orcamento_consultas = maximo
+        return view
+    return decorador
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    if _ativas.get():
+        conn.info.setdefault('instrumentacao_inicio', []).append(time.perf_counter())
+
+
+def _depois(conn, cursor, statement, parameters, context, executemany):
+    ativas = _ativas.get()
+    inicios = conn.info.get('instrumentacao_inicio')
+    if not ativas or not inicios:
+        return
+    ms = (time.perf_counter() - inicios.pop()) * 1000
+    for contagem in ativas:
+        contagem.registrar(statement, ms)
+
+
+class InstrumentacaoConsultas:
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CONSULTAS_INSTRUMENTACAO', True)
+        app.config.setdefault('CONSULTAS_ORCAMENTO', None)          # consultas por requisição
+        app.config.setdefault('CONSULTAS_ORCAMENTO_ESTRITO', None)  # None = igual a TESTING
+        app.config.setdefault('CONSULTAS_LENTA_MS', 100.0)          # comando lento gera aviso
+        app.config.setdefault('CONSULTAS_MAXIMO_LENTAS', 5)         # comandos listados no log
+        app.extensions['instrumentacao_consultas'] = self
+        self.app = app
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', _antes)
+        event.listen(engine, 'after_cursor_execute', _depois)
+
+        app.before_request(self._iniciar)
+        app.after_request(self._finalizar)
+        app.teardown_request(self._encerrar)
+
+    def _iniciar(self):
+        if not self.app.config['CONSULTAS_INSTRUMENTACAO']:
+            return
+        contagem = ContagemConsultas(self.app.config['CONSULTAS_MAXIMO_LENTAS'])
+        g.instrumentacao = (contagem, _ativas.set(_ativas.get() + (contagem,)), time.perf_counter())
+
+    def _encerrar(self, erro=None):
+        # Se o after_request não rodou (exceção), a contagem é fechada aqui
+        estado = g.pop('instrumentacao', None)
+        if estado is not None:
+            _ativas.reset(estado[1])
+
+    def _orcamento(self):
+        view = self.app.view_functions.get(request.endpoint)
+        return getattr(view, 'orcamento_consultas', self.app.config['CONSULTAS_ORCAMENTO'])
+
+    def _finalizar(self, resposta):
+        estado = g.pop('instrumentacao', None)
+        if estado is None:
+            return resposta
+        contagem, token, inicio = estado
+        _ativas.reset(token)
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        resposta.headers.add(
+            'Server-Timing',
+            f'db;desc="{contagem.total} consultas";dur={contagem.tempo_ms:.2f}, app;dur={total_ms:.2f}'
+        )
+
+        orcamento = self._orcamento()
+        excedido = orcamento is not None and contagem.total > orcamento
+        lenta = contagem._lentas and max(contagem._lentas)[0] >= self.app.config['CONSULTAS_LENTA_MS']
+        registro = {
+            'evento': 'consultas_requisicao',
+            'metodo': request.method,
+            'rota': request.endpoint,
+            'caminho': request.path,
+            'status': resposta.status_code,
+            'total_ms': round(total_ms, 2),
+            **contagem.resumo(),
+        }
+        if orcamento is not None:
+            registro['orcamento'] = orcamento
+        mensagem = json.dumps(registro, ensure_ascii=False)
+        if excedido or lenta:
+            self.app.logger.warning(mensagem)
+        else:
+            self.app.logger.info(mensagem)
+
+        estrito = self.app.config['CONSULTAS_ORCAMENTO_ESTRITO']
+        if estrito is None:
+            estrito = self.app.testing
+        if excedido and estrito:
+            raise OrcamentoExcedido(
+                f'{request.method} {request.path}: {contagem.total} consultas (orçamento {orcamento})'
+            )
+        return resposta
+
+
+instrumentacao_consultas = InstrumentacaoConsultas()
@@ -0,0 +1,128 @@
+# services/json_rapido.py
+# Provedor JSON do Flask com orjson (opcional)
+#
+# Com o pacote orjson instalado, jsonify, request.get_json e as respostas em
+# streaming (app.json.dumps) passam a usar o orjson, que serializa listas
+# grandes de dicts (/api/produtos, /api/tables) várias vezes mais rápido que
+# o módulo json. Sem o pacote, ou com JSON_RAPIDO_HABILITADO=False, o mesmo
+# provedor usa o json da biblioteca padrão.
+#
+# Os dois caminhos usam as mesmas convenções:
+#   - chaves ordenadas (como o provedor padrão do Flask);
+#   - forma compacta (sem espaços) quando não há indentação;
+#   - texto em UTF-8, sem escapes \uXXXX (o orjson não tem ensure_ascii);
+#   - datetime, date e time em ISO 8601 (o provedor padrão do Flask usaria o
+#     formato de data HTTP), Decimal e UUID como texto, dataclasses como dict
+#     e objetos com __html__ (Markup) pelo HTML.
+# Para textos, inteiros, booleanos, None, datas e floats sem expoente a saída
+# é igual byte a byte. Floats com expoente saem em outra grafia (orjson 1e16,
+# json 1e+16, mesmo valor) e NaN/Infinity viram null no orjson (o json
+# escreve NaN, que não é JSON válido). As ETags das rotas não dependem do
+# corpo (services/condicional.py), então não mudam com o backend.
+# Chamadas com opções que o orjson não tem (indentação diferente de 2, cls,
+# ...) e valores que ele recusa (inteiros acima de 64 bits) caem no json.
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+ORJSON_DISPONIVEL = orjson is not None
+
+
+def _padrao(valor):
+    """Tipos que nem o json nem o orjson serializam sozinhos"""
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, (decimal.Decimal, uuid.UUID)):
+        return str(valor)
+    if dataclasses.is_dataclass(valor) and not isinstance(valor, type):
+        return dataclasses.asdict(valor)
+    if hasattr(valor, '__html__'):
+        return str(valor.__html__())
+    raise TypeError(f'Objeto do tipo {type(valor).__name__} não é serializável em JSON')
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    ensure_ascii = False
+    default = staticmethod(_padrao)
+
+    def __init__(self, app, rapido=True):
+        super().__init__(app)
+        self.rapido = rapido and ORJSON_DISPONIVEL
+
+    def _opcoes_orjson(self, kwargs):
+        """Opções do orjson equivalentes aos kwargs de json.dumps, ou None se
+        algum deles não tiver equivalente"""
+        kwargs = dict(kwargs)
+        opcoes = orjson.OPT_NON_STR_KEYS
+        if kwargs.pop('sort_keys', self.sort_keys):
+            opcoes |= orjson.OPT_SORT_KEYS
+        indentacao = kwargs.pop('indent', None)
+        separadores = kwargs.pop('separators', None)
+        if indentacao == 2 and separadores in (None, (',', ': ')):
+            opcoes |= orjson.OPT_INDENT_2
+        elif indentacao is not None or separadores not in (None, (',', ':')):
+            return None
+        if kwargs.pop('ensure_ascii', self.ensure_ascii) or kwargs.pop('default', self.default) is not self.default:
+            return None
+        return None if kwargs else opcoes
+
+    def _dumps_bytes(self, obj, **kwargs):
+        if self.rapido:
+            opcoes = self._opcoes_orjson(kwargs)
+            if opcoes is not None:
+                try:
+                    return orjson.dumps(obj, default=_padrao, option=opcoes)
+                except orjson.JSONEncodeError:
+                    pass  # o json dá a mesma saída ou o erro definitivo
+        return self._dumps_padrao(obj, **kwargs).encode()
+
+    def _dumps_padrao(self, obj, **kwargs):
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        if kwargs.get('indent') is None:
+            kwargs.setdefault('separators', (',', ':'))  # compacto, como o orjson
+        return json.dumps(obj, **kwargs)
+
+    def dumps(self, obj, **kwargs):
+        if self.rapido:
+            return self._dumps_bytes(obj, **kwargs).decode()
+        return self._dumps_padrao(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.rapido and not kwargs:
+            return orjson.loads(s)  # orjson.JSONDecodeError é um ValueError
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """Como no provedor padrão, mas monta o corpo direto em bytes"""
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            corpo = self._dumps_bytes(obj, indent=2)
+        else:
+            corpo = self._dumps_bytes(obj, separators=(',', ':'))
+        return self._app.response_class(corpo + b'\n', mimetype=self.mimetype)
+
+
+class JSONRapido:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JSON_RAPIDO_HABILITADO', True)
+        app.json = ProvedorJSON(app, rapido=app.config['JSON_RAPIDO_HABILITADO'])
+        app.extensions['json_rapido'] = self
+
+
+json_rapido = JSONRapido()
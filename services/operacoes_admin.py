@@ -0,0 +1,315 @@
+# services/operacoes_admin.py
+# Operações do painel SQL (criar, atualizar, excluir e duplicar registros)
+# executadas em lote, numa única transação
+#
+# Cada operação roda dentro de um SAVEPOINT: uma falha desfaz só aquele item
+# e o restante do lote segue. Com atomico=True qualquer falha desfaz o lote
+# inteiro. As regras de cada operação são as mesmas das rotas individuais de
+# app.py (/api/produto, /api/usuario, /api/duplicate_record).
+#
+# criar/atualizar só aceitam os campos de CAMPOS_EDITAVEIS: um campo fora da
+# lista faz o item falhar, em vez de ser ignorado em silêncio. O painel
+# recebe a lista em /api/tables/<tabela> (services/tabelas_admin.py) e só
+# mostra esses campos no formulário.
+
+import time
+from werkzeug.security import generate_password_hash
+from extensions import db
+from models.avaliacao import Avaliacao
+from models.newsletter import Newsletter
+from models.produto import Produto
+from models.usuario import Usuario
+from models.visualizacao import Visualizacao
+from services.imagens import processador_imagens, remover_arquivos
+from services.sqlite_perfil import abrir_transacao
+from sqlalchemy.exc import SQLAlchemyError
+
+MAXIMO_OPERACOES_LOTE = 1000
+
+# Nomes aceitos para cada ação (os das rotas antigas também valem)
+ACOES = {
+    'criar': 'criar', 'add': 'criar',
+    'atualizar': 'atualizar', 'update': 'atualizar',
+    'excluir': 'excluir', 'delete': 'excluir',
+    'duplicar': 'duplicar', 'duplicate': 'duplicar',
+}
+
+
+# Campos que o painel pode gravar em cada tabela; os demais que /api/tables
+# expõe (id, visualizacoes, data_criacao) são só leitura
+CAMPOS_EDITAVEIS = {
+    'produto': ('nome', 'preco', 'imagem', 'imagens', 'proprietario_id', 'destaque', 'ativo'),
+    'usuario': ('nome', 'email', 'senha', 'idade', 'endereco', 'telefone', 'foto_perfil', 'is_admin'),
+}
+
+
+class ErroOperacao(ValueError):
+    pass
+
+
+def _conferir_campos(tabela, dados):
+    invalidos = sorted(set(dados) - set(CAMPOS_EDITAVEIS[tabela]))
+    if invalidos:
+        raise ErroOperacao(f'Campos não editáveis: {", ".join(invalidos)}')
+
+
+def _preco(valor):
+    # Aceita número ou texto com vírgula/ponto; vazio vira 0.0
+    try:
+        if valor is None or valor == '':
+            return 0.0
+        if isinstance(valor, (int, float)):
+            return float(valor)
+        return float(str(valor).replace(',', '.'))
+    except ValueError:
+        raise ErroOperacao('Preço inválido')
+
+
+def _booleano(valor):
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in ('1', 'true', 'sim'):
+        return True
+    if texto in ('0', 'false', 'nao', 'não', ''):
+        return False
+    raise ErroOperacao(f'Valor booleano inválido: {valor}')
+
+
+def _proprietario(valor):
+    # Vazio deixa o produto sem proprietário
+    if valor is None or valor == '':
+        return None
+    try:
+        id = int(valor)
+    except (TypeError, ValueError):
+        raise ErroOperacao('proprietario_id inválido')
+    return _obter(Usuario, id, 'Proprietário').id
+
+
+def _obter(modelo, id, descricao):
+    registro = db.session.get(modelo, id) if id is not None else None
+    if not registro:
+        raise ErroOperacao(f'{descricao} não encontrado')
+    return registro
+
+
+def _email_livre(email, atual=None):
+    if email != atual and Usuario.query.filter_by(email=email).first():
+        raise ErroOperacao('Email já cadastrado')
+
+
+# Produto ---------------------------------------------------------------------
+
+def criar_produto(dados, proprietario_id):
+    if not dados.get('nome'):
+        raise ErroOperacao('Nome é obrigatório')
+    produto = Produto(nome=dados['nome'], preco=_preco(dados.get('preco')), proprietario_id=proprietario_id)
+    _campos_produto(produto, dados)
+    db.session.add(produto)
+    db.session.flush()
+    return {'id': produto.id}
+
+
+def _campos_produto(produto, dados):
+    """Campos opcionais de criar/atualizar"""
+    if 'imagem' in dados:
+        produto.imagem = dados['imagem']
+    if 'imagens' in dados:
+        produto.imagens = dados['imagens']
+    if 'proprietario_id' in dados:
+        produto.proprietario_id = _proprietario(dados['proprietario_id'])
+    if 'destaque' in dados:
+        produto.destaque = _booleano(dados['destaque'])
+    if 'ativo' in dados:
+        produto.ativo = _booleano(dados['ativo'])
+
+
+def atualizar_produto(id, dados):
+    produto = _obter(Produto, id, 'Produto')
+    if dados.get('nome') is not None:
+        produto.nome = dados['nome']
+    if 'preco' in dados:
+        produto.preco = _preco(dados['preco'])
+    _campos_produto(produto, dados)
+    db.session.flush()
+    return {'id': produto.id}
+
+
+def excluir_produto(id, arquivos_removidos):
+    produto = _obter(Produto, id, 'Produto')
+    Avaliacao.query.filter_by(produto_id=id).delete()
+    Visualizacao.query.filter_by(produto_id=id).delete()
+    # A imagem (e as variantes) só é apagada do disco depois do commit
+    arquivos_removidos.extend(processador_imagens.arquivos_da_imagem(produto.imagem, id))
+    db.session.delete(produto)
+    db.session.flush()
+    return {'id': id}
+
+
+def duplicar_produto(id):
+    produto = _obter(Produto, id, 'Produto')
+    copia = Produto(nome=produto.nome + ' (Cópia)', preco=produto.preco)
+    db.session.add(copia)
+    db.session.flush()
+    return {'id': copia.id}
+
+
+# Usuário ---------------------------------------------------------------------
+
+def criar_usuario(dados):
+    for campo in ('nome', 'email', 'idade'):
+        if dados.get(campo) in (None, ''):
+            raise ErroOperacao('Nome, email e idade são obrigatórios')
+    _email_livre(dados['email'])
+    usuario = Usuario(
+        nome=dados['nome'],
+        email=dados['email'],
+        senha=generate_password_hash(dados.get('senha') or '123456'),
+        idade=int(dados['idade']),
+        endereco=dados.get('endereco'),
+        telefone=dados.get('telefone')
+    )
+    if dados.get('foto_perfil'):
+        usuario.foto_perfil = dados['foto_perfil']
+    if 'is_admin' in dados:
+        usuario.is_admin = _booleano(dados['is_admin'])
+    db.session.add(usuario)
+    db.session.flush()
+    return {'id': usuario.id}
+
+
+def atualizar_usuario(id, dados):
+    usuario = _obter(Usuario, id, 'Usuário')
+    if 'nome' in dados:
+        usuario.nome = dados['nome']
+    if 'email' in dados:
+        _email_livre(dados['email'], usuario.email)
+        usuario.email = dados['email']
+    if 'idade' in dados:
+        usuario.idade = int(dados['idade'])
+    if 'endereco' in dados:
+        usuario.endereco = dados['endereco']
+    if 'telefone' in dados:
+        usuario.telefone = dados['telefone']
+    if 'foto_perfil' in dados:
+        usuario.foto_perfil = dados['foto_perfil'] or 'default.png'
+    if 'is_admin' in dados:
+        usuario.is_admin = _booleano(dados['is_admin'])
+    # Senha vazia mantém a atual
+    if dados.get('senha'):
+        usuario.senha = generate_password_hash(dados['senha'])
+    db.session.flush()
+    return {'id': usuario.id}
+
+
+def excluir_usuario(id, arquivos_removidos):
+    usuario = _obter(Usuario, id, 'Usuário')
+    Produto.descontar_avaliacoes_usuario(id)
+    Avaliacao.query.filter_by(usuario_id=id).delete()
+    Visualizacao.query.filter_by(usuario_id=id).delete()
+    # Os produtos do usuário ficam sem proprietário, como na rota individual
+    Newsletter.query.filter_by(email=usuario.email).delete()
+    db.session.delete(usuario)
+    db.session.flush()
+    return {'id': id}
+
+
+def duplicar_usuario(id):
+    usuario = _obter(Usuario, id, 'Usuário')
+    copia = Usuario(
+        nome=usuario.nome + ' (Cópia)',
+        email=usuario.email.replace('@', '_copy@'),
+        senha=usuario.senha,
+        idade=usuario.idade,
+        endereco=usuario.endereco,
+        telefone=usuario.telefone
+    )
+    db.session.add(copia)
+    db.session.flush()
+    return {'id': copia.id}
+
+
+# Lote ------------------------------------------------------------------------
+
+def _executar(operacao, usuario_id, arquivos_removidos):
+    if not isinstance(operacao, dict):
+        raise ErroOperacao('Operação deve ser um objeto')
+    tabela = operacao.get('tabela')
+    acao = ACOES.get(operacao.get('acao'))
+    id = operacao.get('id')
+    dados = operacao.get('dados') or {}
+    if not isinstance(dados, dict):
+        raise ErroOperacao('dados deve ser um objeto')
+
+    if tabela in CAMPOS_EDITAVEIS and acao in ('criar', 'atualizar'):
+        _conferir_campos(tabela, dados)
+
+    if tabela == 'produto':
+        if acao == 'criar':
+            return criar_produto(dados, usuario_id)
+        if acao == 'atualizar':
+            return atualizar_produto(id, dados)
+        if acao == 'excluir':
+            return excluir_produto(id, arquivos_removidos)
+        if acao == 'duplicar':
+            return duplicar_produto(id)
+    elif tabela == 'usuario':
+        if acao == 'criar':
+            return criar_usuario(dados)
+        if acao == 'atualizar':
+            return atualizar_usuario(id, dados)
+        if acao == 'excluir':
+            return excluir_usuario(id, arquivos_removidos)
+        if acao == 'duplicar':
+            return duplicar_usuario(id)
+    else:
+        raise ErroOperacao(f'Tabela não suportada: {tabela}')
+    raise ErroOperacao(f'Ação não suportada: {operacao.get("acao")}')
+
+
+def executar_lote(operacoes, usuario_id, atomico=False):
+    """Executa as operações numa transação; retorna o resumo com o resultado
+    e o tempo (ms) de cada item"""
+    inicio_lote = time.perf_counter()
+    resultados = []
+    arquivos_removidos = []
+
+    abrir_transacao(db.session)
+    for indice, operacao in enumerate(operacoes):
+        inicio = time.perf_counter()
+        resultado = {'indice': indice}
+        arquivos_item = []
+        try:
+            with db.session.begin_nested():
+                resultado.update(_executar(operacao, usuario_id, arquivos_item))
+            # Só os arquivos de itens gravados saem do disco (depois do commit)
+            arquivos_removidos.extend(arquivos_item)
+            resultado['success'] = True
+        except (ErroOperacao, SQLAlchemyError, ValueError, TypeError) as e:
+            resultado['success'] = False
+            resultado['error'] = str(e.orig) if hasattr(e, 'orig') else str(e)
+        resultado['ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+        resultados.append(resultado)
+
+    falhas = sum(1 for r in resultados if not r['success'])
+    desfeito = atomico and falhas > 0
+    inicio_commit = time.perf_counter()
+    if desfeito:
+        db.session.rollback()
+        arquivos_removidos = []
+    else:
+        db.session.commit()
+    commit_ms = round((time.perf_counter() - inicio_commit) * 1000, 2)
+
+    remover_arquivos(arquivos_removidos)
+
+    return {
+        'success': falhas == 0,
+        'aplicadas': 0 if desfeito else len(resultados) - falhas,
+        'falhas': falhas,
+        'desfeito': desfeito,
+        'resultados': resultados,
+        'commit_ms': commit_ms,
+        'total_ms': round((time.perf_counter() - inicio_lote) * 1000, 2)
+    }
@@ -0,0 +1,134 @@
+# services/paginacao.py
+# Paginação por cursor (keyset) para listagens de produtos
+#
+# Em vez de OFFSET, cada página continua a partir da última linha da página
+# anterior: o cursor opaco guarda o valor da coluna de ordenação e o id dessa
+# linha, e o id serve de desempate estável. O custo de cada página não cresce
+# com a posição no catálogo.
+
+import base64
+import json
+from datetime import datetime
+from extensions import db
+from models.produto import Produto
+
+# ordenacao -> (coluna, descendente)
+ORDENACOES = {
+    'id': (Produto.id, False),
+    'nome': (Produto.nome, False),
+    'preco_asc': (Produto.preco, False),
+    'preco_desc': (Produto.preco, True),
+    'recentes': (Produto.data_criacao, True),
+    'populares': (Produto.visualizacoes, True),
+}
+
+LIMITE_MAXIMO = 100
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def ordenar(produtos_query, ordenacao):
+    """Aplica a ordenação com desempate por id, na mesma direção da coluna"""
+    coluna, descendente = ORDENACOES[ordenacao]
+    if coluna is Produto.id:
+        return produtos_query.order_by(Produto.id.desc() if descendente else Produto.id.asc())
+    if descendente:
+        return produtos_query.order_by(coluna.desc(), Produto.id.desc())
+    return produtos_query.order_by(coluna.asc(), Produto.id.asc())
+
+
+def codificar_chave(ordenacao, valor, ultimo_id):
+    """Cursor opaco para (nome da ordenação, valor da coluna, id)"""
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    bruto = json.dumps([ordenacao, valor, ultimo_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def decodificar_chave(cursor, ordenacao, data=False):
+    """(valor, id) de um cursor de codificar_chave; `data` converte o valor
+    de volta para datetime"""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_ordenacao, valor, ultimo_id = json.loads(bruto)
+        if cursor_ordenacao != ordenacao or not isinstance(ultimo_id, int):
+            raise ValueError
+        if valor is not None and data:
+            valor = datetime.fromisoformat(valor)
+    except (ValueError, TypeError):
+        raise CursorInvalido('Cursor inválido para esta ordenação')
+    return valor, ultimo_id
+
+
+def condicao_apos(coluna, coluna_id, descendente, valor, ultimo_id):
+    """Condição "linha vem depois de (valor, ultimo_id)" ordenando por
+    `coluna` e, no empate, por `coluna_id`, ambas na mesma direção.
+
+    No SQLite NULL é o menor valor: aparece primeiro em ASC e por último em DESC.
+    """
+    if coluna is coluna_id:
+        return coluna_id < ultimo_id if descendente else coluna_id > ultimo_id
+
+    if descendente:
+        if valor is None:
+            return db.and_(coluna.is_(None), coluna_id < ultimo_id)
+        return db.or_(
+            coluna < valor,
+            coluna.is_(None),
+            db.and_(coluna == valor, coluna_id < ultimo_id)
+        )
+
+    if valor is None:
+        return db.or_(coluna.isnot(None), db.and_(coluna.is_(None), coluna_id > ultimo_id))
+    return db.or_(coluna > valor, db.and_(coluna == valor, coluna_id > ultimo_id))
+
+
+def codificar_cursor(ordenacao, produto):
+    coluna, _ = ORDENACOES[ordenacao]
+    return codificar_chave(ordenacao, getattr(produto, coluna.key), produto.id)
+
+
+def decodificar_cursor(cursor, ordenacao):
+    if ordenacao not in ORDENACOES:
+        raise CursorInvalido('Cursor inválido para esta ordenação')
+    return decodificar_chave(cursor, ordenacao, data=ORDENACOES[ordenacao][0] is Produto.data_criacao)
+
+
+def _apos(ordenacao, valor, ultimo_id):
+    coluna, descendente = ORDENACOES[ordenacao]
+    return condicao_apos(coluna, Produto.id, descendente, valor, ultimo_id)
+
+
+def paginar_por_cursor(produtos_query, ordenacao, cursor, limite):
+    """Retorna (produtos, proximo_cursor) para uma query de Produto sem ordenação.
+
+    `cursor` vazio ou None começa do início. Lança CursorInvalido se o cursor
+    não puder ser lido.
+    """
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    if cursor:
+        valor, ultimo_id = decodificar_cursor(cursor, ordenacao)
+        produtos_query = produtos_query.filter(_apos(ordenacao, valor, ultimo_id))
+
+    produtos = ordenar(produtos_query, ordenacao).limit(limite + 1).all()
+    proximo_cursor = None
+    if len(produtos) > limite:
+        produtos = produtos[:limite]
+        proximo_cursor = codificar_cursor(ordenacao, produtos[-1])
+    return produtos, proximo_cursor
+
+
+def pedido_paginado(args):
+    """Indica se a requisição pediu paginação (?cursor= ou ?limite=)"""
+    return 'cursor' in args or 'limite' in args
+
+
+def paginar_requisicao(produtos_query, args, ordenacao_padrao='id', limite_padrao=50):
+    """Pagina por cursor a partir dos parâmetros ordenacao/cursor/limite"""
+    ordenacao = args.get('ordenacao', ordenacao_padrao)
+    if ordenacao not in ORDENACOES:
+        raise CursorInvalido(f'Ordenação {ordenacao} não suporta paginação por cursor')
+    limite = args.get('limite', limite_padrao, type=int)
+    return paginar_por_cursor(produtos_query, ordenacao, args.get('cursor'), limite)
@@ -0,0 +1,109 @@
+# services/projecoes.py
+# Projeções de leitura das listagens de produtos
+#
+# As listagens só transformam produtos em dicts: não precisam de objetos ORM
+# (identity map, rastreamento de alterações, loaders de relacionamento). Cada
+# endpoint declara numa Projecao as colunas que lê; a query de Produto, já
+# filtrada, passa a devolver tuplas (Row) com essas colunas, convertidas
+# direto no dict da resposta. Os proprietários vêm de uma segunda consulta,
+# também só com colunas, pelos ids da página: um LEFT JOIN faria o SQLite
+# buscar o proprietário de todas as linhas antes de ordenar e aplicar o LIMIT
+# quando a ordenação não tem índice.
+#
+# As colunas usadas na ordenação/cursor (services/paginacao.py) mantêm o nome
+# do atributo do modelo, então paginar_por_cursor funciona com as linhas.
+#
+# Uso:
+#     query = LISTAGEM_PRODUTOS.aplicar(Produto.query.filter_by(ativo=True))
+#     produtos = LISTAGEM_PRODUTOS.serializar_lista(query.limit(20).all())
+
+from extensions import db
+from models.produto import LOTE_IN, Produto
+from models.usuario import Usuario
+from services.imagens import urls_variantes
+
+
+class Projecao:
+    """Colunas lidas por um endpoint e a função que monta o dict de cada linha"""
+
+    def __init__(self, colunas, montar):
+        self.colunas = tuple(colunas)
+        self.montar = montar
+
+    def aplicar(self, produtos_query):
+        """Troca as entidades de uma query de Produto pelas colunas da projeção"""
+        return produtos_query.with_entities(*self.colunas)
+
+    def serializar_lista(self, linhas):
+        montar = self.montar
+        return [montar(linha) for linha in linhas]
+
+
+class ProjecaoComProprietario(Projecao):
+    """Projeção cujo dict aninha o proprietário (mesmas chaves de Usuario.to_dict);
+    `montar` recebe a linha e o dict do proprietário (ou None)"""
+
+    def serializar_lista(self, linhas):
+        linhas = list(linhas)
+        proprietarios = _proprietarios({l.proprietario_id for l in linhas if l.proprietario_id is not None})
+        montar = self.montar
+        return [montar(linha, proprietarios.get(linha.proprietario_id)) for linha in linhas]
+
+
+# Listagem completa: o mesmo dict de Produto.to_dict, sem hidratar os modelos
+_CAMPOS_PROPRIETARIO = ('id', 'nome', 'email', 'idade', 'endereco', 'telefone', 'foto_perfil', 'is_admin', 'favoritos')
+_COLUNAS_PROPRIETARIO = tuple(getattr(Usuario, campo) for campo in _CAMPOS_PROPRIETARIO)
+
+
+def _proprietarios(ids):
+    """{id: dict do proprietário} para os ids dados, em blocos de LOTE_IN"""
+    ids = list(ids)
+    proprietarios = {}
+    for inicio in range(0, len(ids), LOTE_IN):
+        linhas = db.session.execute(
+            db.select(*_COLUNAS_PROPRIETARIO).where(Usuario.id.in_(ids[inicio:inicio + LOTE_IN]))
+        )
+        for linha in linhas:
+            proprietarios[linha[0]] = dict(zip(_CAMPOS_PROPRIETARIO, linha))
+    return proprietarios
+
+
+_COLUNAS_LISTAGEM = (
+    Produto.id, Produto.nome, Produto.preco, Produto.descricao, Produto.imagem, Produto.imagens,
+    Produto.imagem_hash, Produto.proprietario_id, Produto.destaque, Produto.ativo, Produto.data_criacao,
+    Produto.visualizacoes, Produto.soma_notas, Produto.total_avaliacoes,
+)
+
+
+def _produto_listagem(linha, proprietario):
+    (id, nome, preco, descricao, imagem, imagens, imagem_hash, proprietario_id, destaque, ativo,
+     data_criacao, visualizacoes, soma_notas, total_avaliacoes) = linha
+    return {
+        'id': id,
+        'nome': nome,
+        'preco': preco,
+        'descricao': descricao,
+        'imagem': imagem,
+        'imagens': imagens,  # já é lista (models/tipos.py)
+        'imagens_variantes': urls_variantes(imagem, imagem_hash),
+        'proprietario_id': proprietario_id,
+        'destaque': destaque,
+        'ativo': ativo,
+        'data_criacao': data_criacao.isoformat() if data_criacao else None,
+        'visualizacoes': visualizacoes,
+        'proprietario': proprietario,  # dict compartilhado pelos produtos do mesmo dono
+        'media_avaliacao': Produto.media_avaliacao(soma_notas, total_avaliacoes),
+        'total_avaliacoes': total_avaliacoes or 0
+    }
+
+
+LISTAGEM_PRODUTOS = ProjecaoComProprietario(_COLUNAS_LISTAGEM, _produto_listagem)
+
+
+# Sugestões da busca: só o que a lista suspensa mostra
+def _produto_sugestao(linha):
+    id, nome, preco, imagem = linha
+    return {'id': id, 'nome': nome, 'preco': preco, 'imagem': imagem}
+
+
+SUGESTOES_PRODUTOS = Projecao((Produto.id, Produto.nome, Produto.preco, Produto.imagem), _produto_sugestao)
@@ -0,0 +1,44 @@
+# services/sqlite_perfil.py
+# Aplica os PRAGMAs do perfil de configuração a cada conexão SQLite
+#
+# PRAGMAs como cache_size, busy_timeout e synchronous valem por conexão, então
+# precisam ser reaplicados sempre que o pool abre uma conexão nova.
+
+from extensions import db
+from sqlalchemy import event
+
+
+def configurar_sqlite(app):
+    """Registra o listener de conexão com os PRAGMAs de app.config['SQLITE_PRAGMAS']"""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    # journal_mode primeiro: os demais podem depender dele (ex.: synchronous)
+    ordem = sorted(pragmas.items(), key=lambda item: item[0] != 'journal_mode')
+
+    @event.listens_for(engine, 'connect')
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for nome, valor in ordem:
+                cursor.execute(f'PRAGMA {nome} = {valor}')
+        finally:
+            cursor.close()
+
+
+def abrir_transacao(session):
+    """Garante uma transação SQLite de fato aberta na conexão da sessão.
+
+    O driver sqlite3 só emite BEGIN antes de INSERT/UPDATE/DELETE; um
+    SAVEPOINT aberto antes disso inicia a transação sozinho e o RELEASE dele
+    grava tudo. Chame antes de session.begin_nested() quando os savepoints
+    precisarem ser desfeitos junto com a transação externa."""
+    conexao = session.connection()
+    if conexao.dialect.name != 'sqlite':
+        return
+    dbapi_connection = conexao.connection.dbapi_connection
+    if not dbapi_connection.in_transaction:
+        conexao.exec_driver_sql('BEGIN')
@@ -0,0 +1,115 @@
+# services/streaming.py
+# Respostas JSON em streaming para coleções grandes
+#
+# Em vez de montar a lista inteira de dicts e serializar tudo de uma vez, as
+# linhas são lidas do banco em blocos (yield_per) e cada elemento é escrito
+# assim que é serializado: como array JSON ("[", itens separados por vírgula,
+# "]") ou como NDJSON (um objeto por linha). O pico de memória fica limitado
+# ao tamanho do bloco, qualquer que seja o tamanho da tabela.
+#
+# O corpo é gerado depois que a view retornou, quando o contexto da requisição
+# (e a sessão dela) já foi encerrado. Por isso as rotas passam funções que
+# criam as consultas, chamadas dentro de um contexto de aplicação próprio do
+# streaming: consultas e carregamentos em lote usam a mesma sessão.
+#
+# O streaming é opcional: ?stream=1 devolve o mesmo array JSON da rota
+# normal; ?stream=ndjson devolve NDJSON. O formato fica na URL (e não no
+# Accept) para que cache de respostas e ETags continuem valendo por URL.
+
+from flask import Response, current_app, request
+
+LOTE_STREAM = 500
+MIMETYPE_NDJSON = 'application/x-ndjson'
+
+
+def formato_ndjson():
+    """Indica se o cliente pediu NDJSON"""
+    return request.args.get('stream') == 'ndjson'
+
+
+def pedido_stream():
+    """Indica se a requisição pediu resposta em streaming"""
+    return request.args.get('stream', '').lower() in ('1', 'true', 'ndjson')
+
+
+def em_blocos(query, tamanho=LOTE_STREAM):
+    """Percorre a consulta com yield_per, entregando listas de até `tamanho`
+    objetos (cada bloco pode ser serializado em lote e depois descartado)"""
+    bloco = []
+    for item in query.yield_per(tamanho):
+        bloco.append(item)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def serializar_em_blocos(query, serializar_lista, tamanho=LOTE_STREAM):
+    """Gera os dicts de cada objeto da consulta, serializando bloco a bloco"""
+    for bloco in em_blocos(query, tamanho):
+        yield from serializar_lista(bloco)
+
+
+def _array(itens, dumps):
+    yield '['
+    primeiro = True
+    for item in itens:
+        yield dumps(item) if primeiro else ',' + dumps(item)
+        primeiro = False
+    yield ']'
+
+
+def _ndjson(itens, dumps):
+    for item in itens:
+        yield dumps(item) + '\n'
+
+
+def _transmitir(app, gerar):
+    # Contexto próprio enquanto o corpo é gerado; a sessão é removida no final
+    with app.app_context():
+        yield from gerar(app.json.dumps)
+
+
+def resposta_stream(itens, ndjson=None):
+    """Response que escreve os dicts gerados por `itens()` à medida que saem"""
+    if ndjson is None:
+        ndjson = formato_ndjson()
+    app = current_app._get_current_object()
+    if ndjson:
+        return Response(_transmitir(app, lambda dumps: _ndjson(itens(), dumps)), mimetype=MIMETYPE_NDJSON)
+    return Response(_transmitir(app, lambda dumps: _array(itens(), dumps)), mimetype='application/json')
+
+
+def resposta_stream_secoes(secoes, ndjson=None):
+    """Como resposta_stream, para um objeto cujos valores são listas:
+    `secoes` é uma sequência de (chave, itens). Em NDJSON cada linha vira
+    {"tabela": chave, "registro": item}."""
+    if ndjson is None:
+        ndjson = formato_ndjson()
+    app = current_app._get_current_object()
+
+    if ndjson:
+        def gerar(dumps):
+            for chave, itens in secoes:
+                for item in itens():
+                    yield dumps({'tabela': chave, 'registro': item}) + '\n'
+        return Response(_transmitir(app, gerar), mimetype=MIMETYPE_NDJSON)
+
+    def gerar(dumps):
+        yield '{'
+        for indice, (chave, itens) in enumerate(secoes):
+            yield ('' if indice == 0 else ',') + dumps(chave) + ':'
+            yield from _array(itens(), dumps)
+        yield '}'
+    return Response(_transmitir(app, gerar), mimetype='application/json')
+
+
+def resposta_linhas(linhas, mimetype, nome_arquivo=None):
+    """Response com o texto gerado por `linhas()` (ex.: CSV), como anexo se
+    `nome_arquivo` for dado"""
+    app = current_app._get_current_object()
+    resposta = Response(_transmitir(app, lambda dumps: linhas()), mimetype=mimetype)
+    if nome_arquivo:
+        resposta.headers['Content-Disposition'] = f'attachment; filename={nome_arquivo}'
+    return resposta
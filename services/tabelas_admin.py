@@ -0,0 +1,183 @@
+# services/tabelas_admin.py
+# Consulta paginada das tabelas do painel SQL
+#
+# Usa SELECTs do Core só com as colunas pedidas (sem montar objetos do ORM),
+# com filtros por igualdade, busca textual, ordenação e paginação no banco.
+# O total de registros de cada combinação de filtros fica no cache de
+# respostas e é invalidado quando a tabela muda.
+#
+# A paginação segue por cursor (?cursor=, devolvido em proximo_cursor), que
+# continua da última linha vista em vez de pular as anteriores com OFFSET; o
+# ?pagina= continua aceito só até PAGINA_MAXIMA. A busca usa índices: o FTS5
+# no nome do produto e prefixo (LIKE 'texto%', índices NOCASE) no nome e no
+# e-mail do usuário.
+
+from extensions import db
+from models.produto import Produto
+from models.usuario import Usuario
+from services.busca_texto import FTS_TABELA, expressao_fts, fts_disponivel, produto_fts
+from services.cache import cache_respostas
+from services.operacoes_admin import CAMPOS_EDITAVEIS
+from services.paginacao import CursorInvalido, codificar_chave, condicao_apos, decodificar_chave
+
+POR_PAGINA_PADRAO = 50
+POR_PAGINA_MAXIMO = 200
+PAGINA_MAXIMA = 20  # além disso, só por cursor
+TTL_TOTAL = 30  # segundos
+
+# Colunas expostas por tabela (senha e favoritos nunca saem daqui)
+TABELAS_ADMIN = {
+    'produto': (Produto.__table__, (
+        'id', 'nome', 'preco', 'imagem', 'proprietario_id', 'destaque', 'ativo',
+        'visualizacoes', 'data_criacao'
+    )),
+    'usuario': (Usuario.__table__, (
+        'id', 'nome', 'email', 'idade', 'endereco', 'telefone', 'foto_perfil', 'is_admin'
+    )),
+}
+
+# Colunas consideradas pela busca textual (?q=)
+COLUNAS_BUSCA = {
+    'produto': ('nome',),
+    'usuario': ('nome', 'email'),
+}
+
+# Parâmetros da query string que não são filtros de coluna
+_PARAMETROS = {'colunas', 'ordenar', 'q', 'pagina', 'por_pagina', 'cursor'}
+
+
+class ConsultaInvalida(ValueError):
+    pass
+
+
+def _colunas(tabela, permitidas, pedido):
+    if not pedido:
+        return [tabela.c[nome] for nome in permitidas]
+    nomes = [nome.strip() for nome in pedido.split(',') if nome.strip()]
+    invalidas = [nome for nome in nomes if nome not in permitidas]
+    if invalidas:
+        raise ConsultaInvalida(f'Colunas inválidas: {", ".join(invalidas)}')
+    # id sempre presente: o painel edita e exclui por ele
+    if 'id' not in nomes:
+        nomes.insert(0, 'id')
+    return [tabela.c[nome] for nome in nomes]
+
+
+def _filtros(nome_tabela, tabela, permitidas, args):
+    condicoes = []
+    chave = []
+    for nome, valor in sorted(args.items()):
+        if nome in _PARAMETROS:
+            continue
+        if nome not in permitidas:
+            raise ConsultaInvalida(f'Filtro inválido: {nome}')
+        coluna = tabela.c[nome]
+        if isinstance(coluna.type, db.Boolean):
+            valor = valor.lower() in ('1', 'true', 'sim')
+        condicoes.append(coluna == valor)
+        chave.append(f'{nome}={valor}')
+
+    busca = (args.get('q') or '').strip()
+    if busca:
+        condicoes.append(_busca(nome_tabela, tabela, busca))
+        chave.append(f'q={busca}')
+    return condicoes, '&'.join(chave)
+
+
+def _busca(nome_tabela, tabela, busca):
+    colunas = COLUNAS_BUSCA[nome_tabela]
+    if nome_tabela == 'produto':
+        expressao = expressao_fts(busca)
+        if expressao is not None and fts_disponivel():
+            # Palavras com prefixo, só na coluna do nome do índice FTS
+            return tabela.c.id.in_(
+                db.select(produto_fts.c.rowid).where(
+                    db.literal_column(FTS_TABELA).op('MATCH')(f'{{{" ".join(colunas)}}} : ({expressao})')
+                )
+            )
+        return db.or_(*[tabela.c[nome].ilike(f'%{busca}%') for nome in colunas])
+
+    # Prefixo como parâmetro único (sem concatenação no SQL), para o SQLite
+    # poder usar os índices NOCASE no LIKE
+    padrao = busca.replace('/', '//').replace('%', '/%').replace('_', '/_') + '%'
+    return db.or_(*[tabela.c[nome].like(padrao, escape='/') for nome in colunas])
+
+
+def _ordenacao(tabela, permitidas, pedido):
+    """(nome do pedido, coluna, descendente) da ordenação pedida"""
+    pedido = (pedido or 'id').strip()
+    descendente = pedido.startswith('-')
+    nome = pedido.lstrip('-')
+    if nome not in permitidas:
+        raise ConsultaInvalida(f'Ordenação inválida: {pedido}')
+    return pedido, tabela.c[nome], descendente
+
+
+def consultar_tabela(nome_tabela, args):
+    """Página de uma tabela do painel a partir dos parâmetros da requisição:
+    colunas=a,b  ordenar=campo|-campo  q=texto  <coluna>=valor
+    cursor=<proximo_cursor da página anterior> ou pagina=1  por_pagina=50"""
+    if nome_tabela not in TABELAS_ADMIN:
+        raise ConsultaInvalida(f'Tabela não suportada: {nome_tabela}')
+    tabela, permitidas = TABELAS_ADMIN[nome_tabela]
+
+    colunas = _colunas(tabela, permitidas, args.get('colunas'))
+    condicoes, chave_filtros = _filtros(nome_tabela, tabela, permitidas, args)
+    ordenacao, coluna_ordem, descendente = _ordenacao(tabela, permitidas, args.get('ordenar'))
+    por_pagina = min(max(1, args.get('por_pagina', POR_PAGINA_PADRAO, type=int)), POR_PAGINA_MAXIMO)
+
+    ordem = [coluna_ordem.desc() if descendente else coluna_ordem.asc()]
+    if coluna_ordem is not tabela.c.id:
+        ordem.append(tabela.c.id.desc() if descendente else tabela.c.id.asc())
+    # O valor da coluna ordenada monta o próximo cursor, mesmo fora de ?colunas=
+    selecionadas = colunas if coluna_ordem in colunas else colunas + [coluna_ordem]
+    consulta = db.select(*selecionadas).where(*condicoes).order_by(*ordem).limit(por_pagina + 1)
+
+    cursor = args.get('cursor')
+    if cursor:
+        try:
+            valor, ultimo_id = decodificar_chave(
+                cursor, ordenacao, data=isinstance(coluna_ordem.type, db.DateTime)
+            )
+        except CursorInvalido as e:
+            raise ConsultaInvalida(str(e))
+        consulta = consulta.where(condicao_apos(coluna_ordem, tabela.c.id, descendente, valor, ultimo_id))
+        pagina = None
+    else:
+        pagina = max(1, args.get('pagina', 1, type=int))
+        if pagina > PAGINA_MAXIMA:
+            raise ConsultaInvalida(
+                f'Página acima de {PAGINA_MAXIMA}: avance com o cursor (proximo_cursor)'
+            )
+        consulta = consulta.offset((pagina - 1) * por_pagina)
+
+    linhas = db.session.execute(consulta).mappings().all()
+    proximo_cursor = None
+    if len(linhas) > por_pagina:
+        linhas = linhas[:por_pagina]
+        ultima = linhas[-1]
+        proximo_cursor = codificar_chave(ordenacao, ultima[coluna_ordem.name], ultima['id'])
+    # datetimes saem em ISO 8601 pelo provedor JSON (services/json_rapido.py)
+    nomes = [coluna.name for coluna in colunas]
+    registros = [{nome: linha[nome] for nome in nomes} for linha in linhas]
+
+    def contar():
+        return db.session.execute(
+            db.select(db.func.count()).select_from(tabela).where(*condicoes)
+        ).scalar()
+
+    total = cache_respostas.obter_ou_calcular(
+        f'admin_total:{nome_tabela}?{chave_filtros}', (nome_tabela,), contar, ttl=TTL_TOTAL
+    )
+    return {
+        'tabela': nome_tabela,
+        'colunas': [coluna.name for coluna in colunas],
+        # Campos que o painel pode gravar por /api/admin/lote
+        'editaveis': [nome for nome in permitidas if nome in CAMPOS_EDITAVEIS[nome_tabela]],
+        'registros': registros,
+        'pagina': pagina,
+        'por_pagina': por_pagina,
+        'proximo_cursor': proximo_cursor,
+        'total': total,
+        'paginas': (total + por_pagina - 1) // por_pagina
+    }
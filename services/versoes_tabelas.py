@@ -0,0 +1,238 @@
+# services/versoes_tabelas.py
+# Versão por tabela, incrementada a cada commit que altera a tabela
+#
+# Os eventos da sessão registram quais tabelas foram tocadas (inserções,
+# alterações e exclusões pelo ORM, além de UPDATE/DELETE em massa) e, antes
+# do commit, incrementam a versão de cada uma na tabela versao_tabela, na
+# mesma transação da escrita. Escritas feitas direto no engine, fora da
+# sessão, devem chamar versoes_tabelas.marcar(...) logo depois do commit.
+#
+# Como as versões ficam no banco, uma escrita feita por outro worker ou por um
+# comando da CLI (importar-produtos, recalcular-avaliacoes) também muda as
+# ETags e invalida o cache deste processo. Cada processo guarda uma cópia das
+# versões e a relê do banco no máximo a cada VERSOES_INTERVALO segundos (uma
+# consulta pequena, no máximo uma por requisição); os próprios commits
+# atualizam a cópia na hora. Escritas de outros processos, portanto, aparecem
+# em até VERSOES_INTERVALO segundos.
+#
+# Os ouvintes de ao_alterar são avisados de toda alteração; os de
+# ao_alterar_externo, só das feitas por outros processos.
+
+import threading
+import time
+from datetime import datetime
+from flask import g, has_app_context, has_request_context
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from extensions import db
+from models.versao_tabela import VersaoTabela
+
+# Coleções many-to-many: alterar a coleção altera a tabela de associação
+_ASSOCIACOES = {
+    'produto': ('produto_categoria',),
+    'categoria': ('produto_categoria',),
+}
+
+_VERSOES = VersaoTabela.__table__
+
+
+class VersoesTabelas:
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._versoes = {}        # tabela -> (versão, modificado_em)
+        self._lido_em = None      # time.monotonic() da última leitura do banco
+        self._sincronizado = False
+        self._ouvintes = []
+        self._ouvintes_externos = []
+        self._registrado = False
+        self.iniciado_em = datetime.utcnow()
+
+    def init_app(self, app):
+        app.config.setdefault('VERSOES_INTERVALO', 1.0)  # segundos entre leituras do banco
+        self.app = app
+        app.extensions['versoes_tabelas'] = self
+        if not self._registrado:
+            self._registrar_eventos()
+            self._registrado = True
+
+    # Leitura -------------------------------------------------------------------
+
+    def versao(self, tabela):
+        return self.versoes(tabela)[0]
+
+    def versoes(self, *tabelas):
+        self.sincronizar()
+        with self._lock:
+            return tuple(self._versoes.get(t, (0, None))[0] for t in tabelas)
+
+    def ultima_modificacao(self, *tabelas):
+        """Momento (UTC) da última alteração entre as tabelas dadas; sem
+        registro no banco, o início do processo"""
+        self.sincronizar()
+        with self._lock:
+            datas = [self._versoes[t][1] for t in tabelas if t in self._versoes]
+        return max(datas, default=self.iniciado_em)
+
+    def sincronizar(self, forcar=False):
+        """Relê as versões do banco se a cópia local tiver mais de
+        VERSOES_INTERVALO segundos (e no máximo uma vez por requisição);
+        avisa os ouvintes do que mudou"""
+        if has_request_context():
+            if g.get('versoes_sincronizadas') and not forcar:
+                return
+            g.versoes_sincronizadas = True
+        agora = time.monotonic()
+        with self._lock:
+            if not forcar and self._lido_em is not None \
+                    and agora - self._lido_em < self.app.config['VERSOES_INTERVALO']:
+                return
+            self._lido_em = agora
+        with self._engine().connect() as conn:
+            linhas = conn.execute(db.select(_VERSOES.c.tabela, _VERSOES.c.versao, _VERSOES.c.modificado_em)).all()
+        self._aplicar(linhas, locais=(), leitura=True)
+
+    # Escrita -------------------------------------------------------------------
+
+    def marcar(self, *tabelas):
+        """Registra que as tabelas mudaram (escritas fora da sessão) e avisa
+        os ouvintes"""
+        tabelas = set(tabelas)
+        if not tabelas:
+            return
+        with self._engine().begin() as conn:
+            linhas = self._incrementar(conn, tabelas)
+        self._aplicar(linhas, locais=tabelas)
+
+    def registrar_tabelas(self):
+        """Cria a linha de versão das tabelas do esquema que ainda não têm uma,
+        para que todos os processos partam do mesmo Last-Modified"""
+        agora = datetime.utcnow()
+        with self._engine().begin() as conn:
+            conn.execute(
+                insert_sqlite(_VERSOES).on_conflict_do_nothing(index_elements=['tabela']),
+                [{'tabela': t.name, 'versao': 0, 'modificado_em': agora}
+                 for t in db.metadata.sorted_tables if t is not _VERSOES]
+            )
+
+    def ao_alterar(self, funcao):
+        """Registra `funcao(tabelas)` para ser chamada após cada alteração"""
+        with self._lock:
+            self._ouvintes.append(funcao)
+        return funcao
+
+    def ao_alterar_externo(self, funcao):
+        """Registra `funcao(tabelas)` para alterações feitas por outros processos"""
+        with self._lock:
+            self._ouvintes_externos.append(funcao)
+        return funcao
+
+    def _engine(self):
+        if has_app_context():
+            return db.engine
+        with self.app.app_context():
+            return db.engine
+
+    def _incrementar(self, conn, tabelas):
+        """Incrementa a versão das tabelas na transação de `conn`; retorna as
+        linhas (tabela, versão, modificado_em) gravadas"""
+        agora = datetime.utcnow()
+        comando = insert_sqlite(_VERSOES)
+        comando = comando.on_conflict_do_update(
+            index_elements=['tabela'],
+            set_={'versao': _VERSOES.c.versao + 1, 'modificado_em': comando.excluded.modificado_em}
+        ).returning(_VERSOES.c.tabela, _VERSOES.c.versao, _VERSOES.c.modificado_em)
+        return [
+            conn.execute(comando, {'tabela': tabela, 'versao': 1, 'modificado_em': agora}).one()
+            for tabela in sorted(tabelas)
+        ]
+
+    def _aplicar(self, linhas, locais, leitura=False):
+        """Atualiza a cópia local com as linhas lidas/gravadas. Um salto maior
+        que o incremento deste processo indica escrita de outro processo."""
+        alteradas, externas = set(), set()
+        with self._lock:
+            conhecidas = self._sincronizado  # antes da primeira leitura não há com o que comparar
+            if leitura:
+                self._sincronizado = True
+            for tabela, versao, modificado_em in linhas:
+                anterior = self._versoes.get(tabela)
+                if anterior is not None and versao <= anterior[0]:
+                    continue  # leitura mais antiga que a cópia atual
+                self._versoes[tabela] = (versao, modificado_em)
+                if tabela in locais:
+                    alteradas.add(tabela)
+                if not conhecidas:
+                    continue
+                alteradas.add(tabela)
+                if versao > (anterior[0] if anterior else 0) + (1 if tabela in locais else 0):
+                    externas.add(tabela)
+            ouvintes = list(self._ouvintes)
+            ouvintes_externos = list(self._ouvintes_externos)
+        if alteradas:
+            for ouvinte in ouvintes:
+                ouvinte(alteradas)
+        if externas:
+            for ouvinte in ouvintes_externos:
+                ouvinte(externas)
+
+    # Sincronização com a sessão ---------------------------------------------
+
+    def _registrar_eventos(self):
+        def pendentes(session):
+            return session.info.setdefault('tabelas_alteradas', set())
+
+        def tabelas_da_instancia(instancia):
+            tabela = instancia.__table__.name
+            return (tabela,) + _ASSOCIACOES.get(tabela, ())
+
+        @event.listens_for(db.session, 'after_flush')
+        def registrar_flush(session, flush_context):
+            alteradas = pendentes(session)
+            for instancia in list(session.new) + list(session.dirty) + list(session.deleted):
+                if hasattr(instancia, '__table__'):
+                    alteradas.update(tabelas_da_instancia(instancia))
+
+        @event.listens_for(db.session, 'do_orm_execute')
+        def registrar_em_massa(orm_execute_state):
+            if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+                # Entidades mapeadas ou tabelas Core (ex.: associações many-to-many)
+                mapper = orm_execute_state.bind_mapper
+                tabela = mapper.local_table if mapper is not None else orm_execute_state.statement.table
+                pendentes(orm_execute_state.session).add(tabela.name)
+
+        # before_commit/after_commit/after_rollback também disparam ao liberar
+        # ou desfazer um SAVEPOINT (begin_nested, ex.: cada item de
+        # services/operacoes_admin.py). As versões só mudam no commit da
+        # transação externa; um SAVEPOINT desfeito deixa suas tabelas
+        # pendentes, o que no máximo invalida algo a mais.
+        @event.listens_for(db.session, 'before_commit')
+        def gravar(session):
+            if session.in_nested_transaction():
+                return
+            # O último flush precisa acontecer antes, para registrar as tabelas
+            session.flush()
+            alteradas = session.info.pop('tabelas_alteradas', None)
+            if alteradas:
+                session.info['versoes_gravadas'] = (
+                    alteradas, self._incrementar(session.connection(), alteradas)
+                )
+
+        @event.listens_for(db.session, 'after_commit')
+        def aplicar(session):
+            if session.in_nested_transaction():
+                return
+            gravadas = session.info.pop('versoes_gravadas', None)
+            if gravadas:
+                alteradas, linhas = gravadas
+                self._aplicar(linhas, locais=alteradas)
+
+        @event.listens_for(db.session, 'after_rollback')
+        def descartar(session):
+            if session.in_nested_transaction():
+                return
+            session.info.pop('tabelas_alteradas', None)
+            session.info.pop('versoes_gravadas', None)
+
+
+versoes_tabelas = VersoesTabelas()
@@ -17,7 +17,7 @@
         products = products.map(p => ({
           ...p,
           preco: typeof p.preco === 'string' ? parseFloat(p.preco) : p.preco,
-          img: p.imagem || '/static/images/placeholder.jpeg'
+          img: (p.imagens_variantes && p.imagens_variantes.card) || p.imagem || '/static/images/placeholder.jpeg'
         }));
 
         console.log('Produtos carregados da API:', products);
@@ -155,9 +155,10 @@ function submitModalForm(event) {
     const recordId = data.record_id;
     const action = data.record_id ? 'edit' : 'add';
 
-    // Remover campos especiais do formulário
+    // Remover campos especiais do formulário (o id vai na operação, não nos dados)
     delete data.table_name;
     delete data.record_id;
+    delete data.id;
 
     // Para edição, só enviar campos que foram preenchidos/alterados
     if (action === 'edit') {
@@ -169,55 +170,25 @@ function submitModalForm(event) {
         });
     }
 
-    console.log('Enviando dados:', data, 'para tabela:', table, 'ação:', action);
-
-    const url = action === 'edit' ? `/api/${table}/${recordId}` : `/api/${table}`;
-    const method = action === 'edit' ? 'PUT' : 'POST';
-
-    fetch(url, {
-        method: method,
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(data),
-    })
-    .then(async response => {
-        // Try parsing JSON, but gracefully handle HTML/text errors
-        let result;
-        try {
-            result = await response.json();
-        } catch (e) {
-            const text = await response.text();
-            result = { success: false, error: text || 'Erro desconhecido', status: response.status };
-        }
+    // Edições ficam pendentes e são enviadas junto com as outras alterações
+    // ("Salvar alterações", em /api/admin/lote)
+    if (action === 'edit') {
+        queueOperation({ tabela: table, acao: 'atualizar', id: Number(recordId), dados: data });
+        closeModal();
+        return;
+    }
 
-        if (!response.ok) {
-            if (result && result.login_required) {
-                showNotification('Você precisa estar logado para esta ação', 'error');
-                setTimeout(() => window.location.href = '/login', 1200);
-                return;
-            }
-            showNotification('Erro: ' + (result.message || result.error || 'Resposta inválida do servidor'), 'error');
-            return;
+    sendBatch([{ tabela: table, acao: 'criar', dados: data }], true)
+    .then(result => {
+        const criado = result && result.resultados && result.resultados[0];
+        if (!criado || !criado.success) {
+            return;  // sendBatch já mostrou o erro
         }
-
-        if (result.success) {
-            showNotification(action === 'edit' ? 'Registro atualizado com sucesso!' : 'Registro criado com sucesso!', 'success');
-
-            // Processar imagens pendentes se for um novo registro
-            if (action === 'add' && result.id && Object.keys(pendingImages).length > 0) {
-                processPendingImages(result.id);
-            }
-
-            closeModal();
-            loadTables();
-        } else {
-            showNotification('Erro: ' + (result.message || result.error), 'error');
+        // Processar imagens pendentes do novo registro
+        if (Object.keys(pendingImages).length > 0) {
+            processPendingImages(criado.id);
         }
-    })
-    .catch(error => {
-        console.error('Erro ao enviar formulário:', error);
-        showNotification('Erro ao salvar o registro', 'error');
+        closeModal();
     });
 }
 
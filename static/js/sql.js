@@ -4,14 +4,41 @@ let currentTable = '';
 let currentAction = '';
 let tablesData = {};
 let pendingImages = {}; // Armazenar imagens selecionadas para upload posterior
+// Edições e exclusões ainda não enviadas; vão juntas para /api/admin/lote
+let pendingOperations = [];
+
+// Paginação/busca de cada tabela (feitas no servidor por /api/tables/<tabela>)
+const TABLE_NAMES = ['produto', 'usuario'];
+const PAGE_SIZE = 50;
+let tablesState = {};
+// A página seguinte vem pelo cursor do servidor; `anteriores` guarda os
+// cursores já visitados para voltar
+TABLE_NAMES.forEach(name => {
+    tablesState[name] = { pagina: 1, q: '', total: 0, paginas: 0, cursor: null, anteriores: [], proximo: null };
+});
+
+async function fetchTablePage(tableName) {
+    const state = tablesState[tableName];
+    const params = new URLSearchParams({ por_pagina: PAGE_SIZE });
+    if (state.cursor) params.set('cursor', state.cursor);
+    if (state.q) params.set('q', state.q);
+
+    // Revalida com o servidor (ETag) em vez de forçar um download novo
+    const response = await fetch(`/api/tables/${tableName}?${params}`, { cache: 'no-cache' });
+    if (!response.ok) {
+        throw new Error('Erro ao carregar dados');
+    }
+    const page = await response.json();
+    state.total = page.total;
+    state.paginas = page.paginas;
+    state.proximo = page.proximo_cursor;
+    state.editaveis = page.editaveis || [];
+    tablesData[tableName] = page.registros;
+}
 
 async function loadTables() {
     try {
-        const response = await fetch('/api/tables?' + new Date().getTime());
-        if (!response.ok) {
-            throw new Error('Erro ao carregar dados');
-        }
-        tablesData = await response.json();
+        await Promise.all(TABLE_NAMES.map(fetchTablePage));
         renderTables();
     } catch (error) {
         console.error('Erro ao carregar tabelas:', error);
@@ -33,6 +60,10 @@ function renderTables() {
 
         // Removed the "+ Adicionar" button per request — records are managed via edit/delete only
         tableSection.appendChild(header);
+        tableSection.appendChild(renderBatchToolbar(tableName));
+        if (tablesState[tableName]) {
+            tableSection.appendChild(renderPager(tableName));
+        }
 
         if (tableName === 'produtos') {
             // Layout especial para produtos
@@ -50,9 +81,11 @@ function renderProductsGrid(container, records, tableName) {
     const grid = document.createElement('div');
     grid.className = 'products-grid';
 
-    records.forEach(record => {
+    records.forEach(original => {
+        const record = withPendingChanges(tableName, original);
         const card = document.createElement('div');
         card.className = 'product-card';
+        markPending(card, tableName, record.id);
 
             const fields = Object.entries(record).map(([key, value]) => {
             if (key === 'id') return '';
@@ -96,6 +129,17 @@ function renderTable(container, records, tableName) {
     const headerRow = document.createElement('tr');
 
         if (records.length > 0) {
+        // Seleção para operações em lote
+        const selectTh = document.createElement('th');
+        const selectAll = document.createElement('input');
+        selectAll.type = 'checkbox';
+        selectAll.title = 'Selecionar todos';
+        selectAll.onchange = () => {
+            table.querySelectorAll('tbody .batch-select').forEach(cb => { cb.checked = selectAll.checked; });
+        };
+        selectTh.appendChild(selectAll);
+        headerRow.appendChild(selectTh);
+
         Object.keys(records[0]).forEach(key => {
             // Skip 'favoritos' column (remove from SQL admin view)
             if (key === 'favoritos') return;
@@ -116,8 +160,19 @@ function renderTable(container, records, tableName) {
     // Body
     const tbody = document.createElement('tbody');
 
-    records.forEach(record => {
+    records.forEach(original => {
+        const record = withPendingChanges(tableName, original);
         const row = document.createElement('tr');
+        markPending(row, tableName, record.id);
+
+        const selectTd = document.createElement('td');
+        const selectBox = document.createElement('input');
+        selectBox.type = 'checkbox';
+        selectBox.className = 'batch-select';
+        selectBox.dataset.table = tableName;
+        selectBox.dataset.id = record.id;
+        selectTd.appendChild(selectBox);
+        row.appendChild(selectTd);
 
         Object.entries(record).forEach(([key, value]) => {
             // Skip favorites field entirely in the SQL view
@@ -223,8 +278,8 @@ function openModal(table, action, record = null) {
                 continue;
             }
 
-            // Pular campos que não devem ser editados
-            if (key === 'data_criacao' || key === 'data_visualizacao') {
+            // Só os campos que o lote aceita (o id aparece, só leitura, na edição)
+            if (key !== 'id' && !isEditable(table, key)) {
                 continue;
             }
 
@@ -333,28 +388,8 @@ function closeModal() {
 }
 
 function deleteRecord(table, id) {
-    console.log('Excluindo registro:', table, id);
     if (confirm('Tem certeza que deseja excluir este registro?')) {
-        fetch(`/api/${table}/${id}`, {
-            method: 'DELETE',
-        })
-        .then(response => {
-            console.log('Status da resposta (exclusão):', response.status);
-            return response.json();
-        })
-        .then(result => {
-            console.log('Resultado da exclusão:', result);
-            if (result.success) {
-                showNotification('Registro excluído com sucesso!', 'success');
-                loadTables();
-            } else {
-                showNotification('Erro: ' + (result.message || result.error), 'error');
-            }
-        })
-        .catch(error => {
-            console.error('Erro ao excluir registro:', error);
-            showNotification('Erro ao excluir o registro', 'error');
-        });
+        queueOperation({ tabela: batchTable(table), acao: 'excluir', id: Number(id) });
     }
 }
 
@@ -468,5 +503,216 @@ function processPendingImages(recordId) {
     });
 }
 
+// Paginação e busca ---------------------------------------------------------
+
+function renderPager(tableName) {
+    const state = tablesState[tableName];
+    const pager = document.createElement('div');
+    pager.className = 'table-pager';
+
+    const search = document.createElement('input');
+    search.type = 'search';
+    search.placeholder = 'Buscar...';
+    search.value = state.q;
+    search.onkeydown = (event) => {
+        if (event.key === 'Enter') {
+            state.q = search.value.trim();
+            state.pagina = 1;
+            state.cursor = null;
+            state.anteriores = [];
+            loadTables();
+        }
+    };
+
+    const previous = document.createElement('button');
+    previous.className = 'btn-admin';
+    previous.textContent = '‹ Anterior';
+    previous.disabled = state.pagina <= 1;
+    previous.onclick = () => {
+        state.cursor = state.anteriores.pop() || null;
+        state.pagina -= 1;
+        loadTables();
+    };
+
+    const info = document.createElement('span');
+    info.textContent = `Página ${state.pagina} de ${Math.max(state.paginas, 1)} (${state.total} registros)`;
+
+    const next = document.createElement('button');
+    next.className = 'btn-admin';
+    next.textContent = 'Próxima ›';
+    next.disabled = !state.proximo;
+    next.onclick = () => {
+        state.anteriores.push(state.cursor);
+        state.cursor = state.proximo;
+        state.pagina += 1;
+        loadTables();
+    };
+
+    pager.appendChild(search);
+    pager.appendChild(previous);
+    pager.appendChild(info);
+    pager.appendChild(next);
+    return pager;
+}
+
+// Operações em lote ---------------------------------------------------------
+
+function renderBatchToolbar(tableName) {
+    const toolbar = document.createElement('div');
+    toolbar.className = 'batch-toolbar';
+
+    const duplicateButton = document.createElement('button');
+    duplicateButton.className = 'btn-admin btn-admin-primary';
+    duplicateButton.textContent = 'Duplicar selecionados';
+    duplicateButton.onclick = () => runBatchOnSelected(tableName, 'duplicar');
+
+    const deleteButton = document.createElement('button');
+    deleteButton.className = 'btn-admin btn-admin-danger';
+    deleteButton.textContent = 'Excluir selecionados';
+    deleteButton.onclick = () => {
+        if (confirm('Tem certeza que deseja excluir os registros selecionados?')) {
+            runBatchOnSelected(tableName, 'excluir');
+        }
+    };
+
+    const count = pendingOperations.length;
+    const applyButton = document.createElement('button');
+    applyButton.className = 'btn-admin btn-admin-success';
+    applyButton.textContent = `Salvar alterações (${count})`;
+    applyButton.disabled = count === 0;
+    applyButton.onclick = applyPendingOperations;
+
+    const discardButton = document.createElement('button');
+    discardButton.className = 'btn-admin';
+    discardButton.textContent = 'Descartar alterações';
+    discardButton.disabled = count === 0;
+    discardButton.onclick = () => {
+        pendingOperations = [];
+        renderTables();
+    };
+
+    toolbar.appendChild(duplicateButton);
+    toolbar.appendChild(deleteButton);
+    toolbar.appendChild(applyButton);
+    toolbar.appendChild(discardButton);
+    return toolbar;
+}
+
+// Campos que /api/admin/lote aceita gravar (informados por /api/tables/<tabela>)
+function isEditable(tableName, key) {
+    const state = tablesState[tableName];
+    return Boolean(state && state.editaveis && state.editaveis.includes(key));
+}
+
+// Nome da tabela na API (singular: produto, usuario)
+function batchTable(tableName) {
+    return tableName.endsWith('s') ? tableName.slice(0, -1) : tableName;
+}
+
+function pendingOperation(tableName, id) {
+    const tabela = batchTable(tableName);
+    return pendingOperations.find(op => op.tabela === tabela && op.id === Number(id));
+}
+
+// Registro com as edições pendentes aplicadas, para exibição
+function withPendingChanges(tableName, record) {
+    const operacao = pendingOperation(tableName, record.id);
+    if (!operacao || operacao.acao !== 'atualizar') return record;
+    const dados = Object.assign({}, operacao.dados);
+    delete dados.senha;
+    return Object.assign({}, record, dados);
+}
+
+function markPending(element, tableName, id) {
+    const operacao = pendingOperation(tableName, id);
+    if (!operacao) return;
+    element.title = operacao.acao === 'excluir' ? 'Exclusão pendente' : 'Alteração pendente';
+    element.style.opacity = operacao.acao === 'excluir' ? '0.5' : '';
+    element.style.fontStyle = 'italic';
+}
+
+// Guarda uma edição/exclusão para o próximo "Salvar alterações"; edições do
+// mesmo registro são combinadas e a exclusão substitui a edição
+function queueOperation(operacao) {
+    const existente = pendingOperations.findIndex(op => op.tabela === operacao.tabela && op.id === operacao.id);
+    if (existente === -1) {
+        pendingOperations.push(operacao);
+    } else if (operacao.acao === 'atualizar' && pendingOperations[existente].acao === 'atualizar') {
+        Object.assign(pendingOperations[existente].dados, operacao.dados);
+    } else {
+        pendingOperations[existente] = operacao;
+    }
+    showNotification(`${pendingOperations.length} alterações pendentes — clique em "Salvar alterações" para enviar`, 'success');
+    renderTables();
+}
+
+// Envia as alterações pendentes numa requisição; as que falharem continuam
+// pendentes para nova tentativa
+async function applyPendingOperations() {
+    const operacoes = pendingOperations;
+    if (operacoes.length === 0) return;
+    pendingOperations = [];
+    const result = await sendBatch(operacoes);
+    if (!result || !result.resultados) {
+        pendingOperations = operacoes.concat(pendingOperations);
+        renderTables();
+        return;
+    }
+    const falhas = result.resultados.filter(r => !r.success).map(r => operacoes[r.indice]);
+    pendingOperations = falhas.concat(pendingOperations);
+}
+
+function selectedIds(tableName) {
+    return Array.from(document.querySelectorAll(`.batch-select[data-table="${tableName}"]:checked`))
+        .map(cb => Number(cb.dataset.id));
+}
+
+function runBatchOnSelected(tableName, acao) {
+    const ids = selectedIds(tableName);
+    if (ids.length === 0) {
+        showNotification('Nenhum registro selecionado', 'error');
+        return;
+    }
+    const tabela = batchTable(tableName);
+    sendBatch(ids.map(id => ({ tabela: tabela, acao: acao, id: id })));
+}
+
+// Envia várias operações numa única requisição (uma transação no servidor)
+async function sendBatch(operacoes, atomico = false) {
+    try {
+        const response = await fetch('/api/admin/lote', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ operacoes: operacoes, atomico: atomico })
+        });
+        const result = await response.json();
+        if (!response.ok) {
+            showNotification('Erro: ' + (result.error || 'Resposta inválida do servidor'), 'error');
+            return result;
+        }
+
+        if (result.falhas === 0) {
+            showNotification(`${result.aplicadas} operações aplicadas em ${result.total_ms} ms`, 'success');
+        } else {
+            const primeiraFalha = result.resultados.find(r => !r.success);
+            showNotification(
+                `${result.aplicadas} aplicadas, ${result.falhas} com erro (${primeiraFalha.error})`, 'error'
+            );
+        }
+        loadTables();
+        return result;
+    } catch (error) {
+        console.error('Erro ao executar operações em lote:', error);
+        showNotification('Erro ao executar operações em lote', 'error');
+    }
+}
+
 // Inicialização
-document.addEventListener('DOMContentLoaded', loadTables);
\ No newline at end of file
+document.addEventListener('DOMContentLoaded', loadTables);
+window.addEventListener('beforeunload', (event) => {
+    // Avisar antes de sair com alterações não enviadas
+    if (pendingOperations.length > 0) {
+        event.preventDefault();
+        event.returnValue = '';
+    }
+});
\ No newline at end of file
@@ -15,4 +15,16 @@ def api_login_required(f):
         if 'user_id' not in session:
             return jsonify({'error': 'Usuário não autenticado', 'login_required': True}), 401
         return f(*args, **kwargs)
+    return decorated_function
+
+def api_admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'success': False, 'error': 'Autenticação requerida'}), 401
+        from models.usuario import Usuario
+        user = Usuario.query.get(session['user_id'])
+        if not user or not getattr(user, 'is_admin', False):
+            return jsonify({'success': False, 'error': 'Acesso negado: administrador necessário.'}), 403
+        return f(*args, **kwargs)
     return decorated_function
\ No newline at end of file